@@ -0,0 +1,75 @@
+from datetime import timedelta
+from io import BytesIO
+import timeit
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+
+def make_page(page_size):
+    "A page of incidents shaped like the response of the incident list endpoint"
+    now = timezone.now()
+    results = []
+    for pk in range(page_size):
+        start_time = now - timedelta(minutes=pk)
+        results.append(
+            {
+                "pk": pk,
+                "start_time": start_time.isoformat(),
+                "end_time": "infinity" if pk % 2 else (start_time + timedelta(seconds=30)).isoformat(),
+                "source": {
+                    "pk": 1,
+                    "name": "nav",
+                    "type": {"name": "nav"},
+                    "user": 2,
+                    "base_url": "https://nav.example.org",
+                },
+                "source_incident_id": str(pk),
+                "details_url": f"https://nav.example.org/alerts/{pk}/",
+                "description": f"Netbox {pk} <{pk}> down.",
+                "level": pk % 5 + 1,
+                "ticket_url": "",
+                "metadata": {"interfaces": [f"ge-0/0/{port}" for port in range(4)], "critical": pk % 3 == 0},
+                "tags": [
+                    {"added_by": 2, "added_time": start_time.isoformat(), "tag": f"object=Netbox {pk}"},
+                    {"added_by": 2, "added_time": start_time.isoformat(), "tag": "problem_type=boxDown"},
+                ],
+                "stateful": True,
+                "open": bool(pk % 2),
+                "acked": False,
+            }
+        )
+    return {"next": None, "previous": None, "results": results}
+
+
+class Command(BaseCommand):
+    help = "Compare the speed of the orjson renderer and parser to the stock JSON renderer and parser"
+
+    def add_arguments(self, parser):
+        parser.add_argument("-p", "--page-size", type=int, default=1000, help="Incidents per page. Default 1000")
+        parser.add_argument("-n", "--number", type=int, default=20, help="Pages to render per run. Default 20")
+
+    def handle(self, *args, **options):
+        try:
+            from argus.drf.parsers import ORJSONParser
+            from argus.drf.renderers import ORJSONRenderer
+        except ImproperlyConfigured as e:
+            raise CommandError(e)
+
+        page = make_page(options["page_size"])
+        number = options["number"]
+        body = JSONRenderer().render(page)
+        self.stdout.write(f"Page of {options['page_size']} incidents, {len(body)} bytes")
+        for name, stock, fast in (
+            ("render", lambda: JSONRenderer().render(page), lambda: ORJSONRenderer().render(page)),
+            ("parse", lambda: JSONParser().parse(BytesIO(body)), lambda: ORJSONParser().parse(BytesIO(body))),
+        ):
+            stock_time = min(timeit.repeat(stock, number=number, repeat=3)) / number
+            fast_time = min(timeit.repeat(fast, number=number, repeat=3)) / number
+            self.stdout.write(
+                f"{name}: stock {stock_time * 1000:.2f} ms, orjson {fast_time * 1000:.2f} ms,"
+                f" {stock_time / fast_time:.1f}x faster"
+            )
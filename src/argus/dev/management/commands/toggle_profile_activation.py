@@ -1,6 +1,7 @@
 from django.core.management.base import BaseCommand
 
 from argus.notificationprofile.models import NotificationProfile
+from argus.notificationprofile.routing import invalidate_routing_table
 
 
 class Command(BaseCommand):
@@ -33,3 +34,5 @@ class Command(BaseCommand):
             profile.active = not profile.active
 
         NotificationProfile.objects.bulk_update(objs=profiles, fields=["active"])
+        # bulk_update does not send any signals
+        invalidate_routing_table()
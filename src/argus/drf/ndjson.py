@@ -0,0 +1,61 @@
+"""Parser and renderer for newline-delimited JSON
+
+The parser does not read the whole body at once: it returns an iterator over
+the lines of the body, which are read as they are needed. Every line is
+decoded on its own by the view, so that one bad line does not fail the rest.
+"""
+
+import json
+
+from django.conf import settings
+from rest_framework.parsers import BaseParser
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+
+__all__ = ["NDJSONParser", "NDJSONRenderer", "render_line"]
+
+
+MEDIA_TYPE = "application/x-ndjson"
+
+
+class NDJSONParser(BaseParser):
+    """Parse into an iterator over the lines of the body, as bytes
+
+    A line longer than ``DATA_UPLOAD_MAX_MEMORY_SIZE`` is skipped, and ``None``
+    is yielded in its place.
+    """
+
+    media_type = MEDIA_TYPE
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        return self.iter_lines(stream, getattr(settings, "DATA_UPLOAD_MAX_MEMORY_SIZE", None))
+
+    @staticmethod
+    def iter_lines(stream, max_length=None):
+        size = max_length + 1 if max_length else -1
+        while line := stream.readline(size):
+            if len(line) == size and not line.endswith(b"\n"):
+                # Skip the rest of the line
+                while not line.endswith(b"\n") and (line := stream.readline(size)):
+                    pass
+                yield None
+                continue
+            yield line
+
+
+class NDJSONRenderer(BaseRenderer):
+    "Render one JSON document per line, used for errors before streaming starts"
+
+    media_type = MEDIA_TYPE
+    format = "ndjson"
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return render_line(data)
+
+
+def render_line(data) -> bytes:
+    return json.dumps(data, cls=JSONEncoder, separators=(",", ":")).encode() + b"\n"
@@ -0,0 +1,25 @@
+"""JSON parser using orjson, which is a lot faster than the stock parser
+
+Needs the optional dependency orjson, install with ``pip install
+argus-server[orjson]``.
+"""
+
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+try:
+    import orjson
+except ImportError:
+    raise ImproperlyConfigured("ORJSONParser needs orjson, install it with `pip install argus-server[orjson]`")
+
+
+__all__ = ["ORJSONParser"]
+
+
+class ORJSONParser(JSONParser):
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f"JSON parse error - {exc}")
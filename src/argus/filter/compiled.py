@@ -0,0 +1,20 @@
+"""Filter backend that runs every queryset filter as a single query
+
+Set ``ARGUS_FILTER_BACKEND = "argus.filter.compiled"`` to use it. Everything
+except ``QuerySetFilter`` is the same as in ``argus.filter.default``.
+"""
+
+from .filterwrapper import (  # noqa: F401
+    FilterWrapper,
+    FallbackFilterWrapper,
+    ComplexFilterWrapper,
+    ComplexFallbackFilterWrapper,
+)
+from .compiled_queryset_filters import CompiledQuerySetFilter as QuerySetFilter  # noqa: F401
+from .filters import (  # noqa: F401
+    IncidentFilter,
+    SourceLockedIncidentFilter,
+    INCIDENT_OPENAPI_PARAMETER_DESCRIPTIONS,
+    SOURCE_LOCKED_INCIDENT_OPENAPI_PARAMETER_DESCRIPTIONS,
+)
+from .swappable.serializers import FilterBlobSerializer  # noqa: F401
@@ -22,7 +22,7 @@ def _incidents_with_source_systems(incident_queryset, filterblob: FilterBlobType
 def _incidents_with_tags(incident_queryset, filterblob: FilterBlobType):
     tags_list = filterblob.get("tags", [])
     if tags_list:
-        return incident_queryset.from_tags(*tags_list)
+        return incident_queryset.from_tags(*tags_list).distinct()
     return incident_queryset.distinct()
 
 
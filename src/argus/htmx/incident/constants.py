@@ -7,6 +7,8 @@ __all__ = [
     "DEFAULT_PAGE_SIZE",
     "ALLOWED_PAGE_SIZES",
     "PAGE_SIZE_CHOICES",
+    "COUNT_LIMIT_DEFAULT",
+    "ESTIMATE_COUNT_ABOVE_DEFAULT",
     "INCIDENTS_TABLE_LAYOUT_ALLOWED",
     "INCIDENTS_TABLE_LAYOUT_CHOICES",
     "INCIDENTS_TABLE_LAYOUT_DEFAULT",
@@ -25,6 +27,10 @@ DEFAULT_PAGE_SIZE = getattr(settings, "ARGUS_INCIDENTS_DEFAULT_PAGE_SIZE", 10)
 ALLOWED_PAGE_SIZES = getattr(settings, "ARGUS_INCIDENTS_PAGE_SIZES", [10, 20, 50, 100])
 PAGE_SIZE_CHOICES = tuple((ps, ps) for ps in ALLOWED_PAGE_SIZES)
 
+# Overridden by ARGUS_INCIDENTS_COUNT_LIMIT and ARGUS_INCIDENTS_ESTIMATE_COUNT_ABOVE
+COUNT_LIMIT_DEFAULT = 1000
+ESTIMATE_COUNT_ABOVE_DEFAULT = 100_000
+
 _UPDATE_INTERVAL_FALLBACK = ["never", 5, 30, 60]
 UPDATE_INTERVAL_DEFAULT = getattr(settings, "ARGUS_INCIDENTS_UPDATE_INTERVAL_DEFAULT", 30)
 _UPDATE_INTERVALS = getattr(settings, "ARGUS_INCIDENTS_UPDATE_INTERVALS", _UPDATE_INTERVAL_FALLBACK)
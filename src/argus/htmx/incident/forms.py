@@ -50,3 +50,25 @@ class TimeframeForm(forms.Form):
             }
         ),
     )
+
+
+class SearchForm(forms.Form):
+    search = forms.CharField(
+        required=False,
+        label="Search",
+        widget=forms.TextInput(
+            attrs={
+                "type": "search",
+                "placeholder": "search descriptions...",
+                "class": "input input-primary input-bordered input-sm incident-list-param",
+                "autocomplete": "off",
+                "hx-get": ".",
+                "hx-trigger": "input changed delay:500ms, search",
+                "hx-target": "#table",
+                "hx-swap": "outerHTML",
+                "hx-push-url": "true",
+                "hx-include": ".incident-list-param",
+                "hx-indicator": "#incident-list .htmx-indicator",
+            }
+        ),
+    )
@@ -0,0 +1,212 @@
+"""Keyset pagination and cheap counts for the incident list
+
+Django's ``Paginator`` counts every matching incident and then skips to the
+wanted page with OFFSET, which gets slower the further back the page is and
+the more incidents there are. Here a page is instead found from the last (or
+first) row of the page before it, which the database looks up directly in the
+index on ``(start_time, id)``. The price is that only the first, previous and
+next pages can be linked to.
+
+Counting is made cheap by stopping at a limit, see
+``ARGUS_INCIDENTS_COUNT_LIMIT``, and by estimating the total number of
+incidents from the planner statistics when there are many, see
+``ARGUS_INCIDENTS_ESTIMATE_COUNT_ABOVE``.
+"""
+
+from __future__ import annotations
+
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+import binascii
+from dataclasses import dataclass
+from datetime import datetime
+import json
+from typing import TYPE_CHECKING, Optional
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+
+from .constants import COUNT_LIMIT_DEFAULT, ESTIMATE_COUNT_ABOVE_DEFAULT
+
+if TYPE_CHECKING:
+    from django.db.models import QuerySet
+
+
+__all__ = [
+    "DEFAULT_ORDERING",
+    "InvalidCursor",
+    "KeysetPage",
+    "KeysetPaginator",
+    "Count",
+    "count_limited",
+    "count_total",
+    "estimate_count",
+]
+
+
+DEFAULT_ORDERING = ("-start_time", "-pk")
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(values) -> str:
+    values = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    return urlsafe_b64encode(json.dumps(values, separators=(",", ":")).encode()).decode()
+
+
+def decode_cursor(cursor: str, length: int) -> list:
+    try:
+        values = json.loads(urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, UnicodeError, ValueError):
+        raise InvalidCursor(f"Invalid cursor: {cursor!r}")
+    if not isinstance(values, list) or len(values) != length:
+        raise InvalidCursor(f"Invalid cursor: {cursor!r}")
+    for value in values:
+        if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+            raise InvalidCursor(f"Invalid cursor: {cursor!r}")
+    return values
+
+
+@dataclass
+class KeysetPage:
+    object_list: list
+    has_next: bool
+    has_previous: bool
+    next_cursor: Optional[str] = None
+    previous_cursor: Optional[str] = None
+    query: str = ""
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def key(self) -> str:
+        "Tells pages apart in element ids"
+        return str(self.object_list[0].pk) if self.object_list else "empty"
+
+    @property
+    def next_query(self) -> str:
+        return urlencode({"after": self.next_cursor})
+
+    @property
+    def previous_query(self) -> str:
+        return urlencode({"before": self.previous_cursor})
+
+
+class KeysetPaginator:
+    """Paginate ``queryset`` by ``ordering``, which must be unique per row
+
+    A page is fetched with one query, of at most ``per_page + 1`` rows.
+    """
+
+    def __init__(self, queryset: QuerySet, per_page: int, ordering=DEFAULT_ORDERING):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+        self.fields = tuple((field.lstrip("-"), field.startswith("-")) for field in self.ordering)
+
+    def get_cursor(self, obj) -> str:
+        return encode_cursor([getattr(obj, field) for field, _ in self.fields])
+
+    def seek(self, cursor: str, forward: bool) -> Q:
+        "Rows after (``forward``) or before the row of ``cursor``"
+        values = decode_cursor(cursor, len(self.fields))
+        q = Q()
+        equal = {}
+        for (field, descending), value in zip(self.fields, values):
+            lookup = "lt" if descending == forward else "gt"
+            q |= Q(**equal, **{f"{field}__{lookup}": value})
+            equal[field] = value
+        return q
+
+    def get_page(self, after: Optional[str] = None, before: Optional[str] = None) -> KeysetPage:
+        """Get the page after the row of cursor ``after``, or before the row of ``before``
+
+        Without either, get the first page. Raises ``InvalidCursor``.
+        """
+        if before:
+            reverse_ordering = [field[1:] if field.startswith("-") else f"-{field}" for field in self.ordering]
+            qs = self.queryset.filter(self.seek(before, forward=False)).order_by(*reverse_ordering)
+            rows = list(qs[: self.per_page + 1])
+            has_previous = len(rows) > self.per_page
+            rows = rows[: self.per_page][::-1]
+            has_next = True
+            query = urlencode({"before": before})
+        else:
+            qs = self.queryset.order_by(*self.ordering)
+            if after:
+                qs = qs.filter(self.seek(after, forward=True))
+            rows = list(qs[: self.per_page + 1])
+            has_next = len(rows) > self.per_page
+            rows = rows[: self.per_page]
+            has_previous = bool(after)
+            query = urlencode({"after": after}) if after else ""
+        return KeysetPage(
+            object_list=rows,
+            has_next=has_next and bool(rows),
+            has_previous=has_previous and bool(rows),
+            next_cursor=self.get_cursor(rows[-1]) if rows else None,
+            previous_cursor=self.get_cursor(rows[0]) if rows else None,
+            query=query,
+        )
+
+
+@dataclass
+class Count:
+    "A number of rows that may only be a lower bound or an estimate"
+
+    value: int
+    at_least: bool = False
+    estimated: bool = False
+
+    def __str__(self):
+        if self.at_least:
+            return f"{self.value}+"
+        if self.estimated:
+            return f"~{self.value}"
+        return str(self.value)
+
+
+def estimate_count(model) -> int:
+    "Estimated number of rows in the table of ``model``, -1 if unknown"
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [model._meta.db_table])
+        row = cursor.fetchone()
+    return row[0] if row else -1
+
+
+def count_total(queryset: QuerySet) -> Count:
+    """Count all rows of ``queryset``, which must not be filtered
+
+    Above ``ARGUS_INCIDENTS_ESTIMATE_COUNT_ABOVE`` rows the count is estimated
+    from the planner statistics of the table. Set it to ``None`` to always count.
+    """
+    threshold = getattr(settings, "ARGUS_INCIDENTS_ESTIMATE_COUNT_ABOVE", ESTIMATE_COUNT_ABOVE_DEFAULT)
+    if threshold is not None:
+        estimate = estimate_count(queryset.model)
+        if estimate > threshold:
+            return Count(estimate, estimated=True)
+    return Count(queryset.count())
+
+
+def count_limited(queryset: QuerySet) -> Optional[Count]:
+    """Count the rows of ``queryset`` up to ``ARGUS_INCIDENTS_COUNT_LIMIT``
+
+    Set the limit to ``None`` to always count everything and to ``0`` to not
+    count at all, which returns ``None``.
+    """
+    limit = getattr(settings, "ARGUS_INCIDENTS_COUNT_LIMIT", COUNT_LIMIT_DEFAULT)
+    if limit is None:
+        return Count(queryset.count())
+    if not limit:
+        return None
+    count = queryset.order_by()[: limit + 1].count()
+    if count > limit:
+        return Count(limit, at_least=True)
+    return Count(count)
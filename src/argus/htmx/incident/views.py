@@ -11,7 +11,6 @@ from django.utils.timezone import now as tznow
 from django.shortcuts import render, get_object_or_404
 
 from django.views.decorators.http import require_POST, require_GET
-from django.core.paginator import Paginator
 from django.http import HttpResponse, HttpResponseBadRequest
 from django_htmx.http import HttpResponseClientRefresh, retarget
 
@@ -25,8 +24,9 @@ from argus.util.datetime_utils import make_aware
 from ..request import HtmxHttpRequest
 
 from .customization import get_incident_table_columns
+from .pagination import DEFAULT_ORDERING, InvalidCursor, KeysetPaginator, count_limited, count_total
 from .utils import get_filter_function
-from .forms import AckForm, DescriptionOptionalForm, EditTicketUrlForm, AddTicketUrlForm, TimeframeForm
+from .forms import AckForm, DescriptionOptionalForm, EditTicketUrlForm, AddTicketUrlForm, SearchForm, TimeframeForm
 from ..utils import (
     single_autocreate_ticket_url_queryset,
     bulk_change_incidents,
@@ -204,13 +204,10 @@ def incident_list(request: HtmxHttpRequest) -> HttpResponse:
     columns = get_incident_table_columns()
 
     # Load incidents
-    qs = prefetch_incident_daughters().order_by("-start_time")
-    total_count = qs.count()
+    qs = prefetch_incident_daughters()
+    total_count = count_total(qs)
     last_refreshed = make_aware(datetime.now())
 
-    # make dict from QueryDict
-    params = dict(request.GET.items())
-
     incident_list_filter = get_filter_function()
     filter_form, qs = incident_list_filter(request, qs)
 
@@ -224,14 +221,27 @@ def incident_list(request: HtmxHttpRequest) -> HttpResponse:
         after = tznow() - timedelta(seconds=timeframe * 60)
         qs = qs.filter(start_time__gte=after)
 
-    filtered_count = qs.count()
+    # Full text search, best matches first
+    search_form = SearchForm(request.GET)
+    search = ""
+    if search_form.is_valid():
+        search = search_form.cleaned_data["search"]
+
+    ordering = DEFAULT_ORDERING
+    if search:
+        qs = qs.search(*search.split())
+        ordering = ("-search_rank", *DEFAULT_ORDERING)
 
-    # Standard Django pagination
+    filtered_count = count_limited(qs)
+
+    # Keyset pagination, a page is found from the cursor of the page next to it
     page_size, _ = get_or_update_preference(request, request.GET, "argus_htmx", "page_size")
 
-    paginator = Paginator(object_list=qs, per_page=page_size)
-    page_num = params.pop("page", "1")
-    page = paginator.get_page(page_num)
+    paginator = KeysetPaginator(qs, per_page=page_size, ordering=ordering)
+    try:
+        page = paginator.get_page(after=request.GET.get("after"), before=request.GET.get("before"))
+    except InvalidCursor:
+        page = paginator.get_page()
 
     # The htmx magic - use a different, minimal base template for htmx
     # requests, allowing us to skip rendering the unchanging parts of the
@@ -240,7 +250,6 @@ def incident_list(request: HtmxHttpRequest) -> HttpResponse:
         base_template = "htmx/incident/responses/_incident_list_refresh.html"
     else:
         base_template = "htmx/incident/_base.html"
-    last_page_num = page.paginator.num_pages
     context = {
         "columns": columns,
         "filtered_count": filtered_count,
@@ -248,11 +257,10 @@ def incident_list(request: HtmxHttpRequest) -> HttpResponse:
         "filter_form": filter_form,
         "timeframe_form": timeframe_form,
         "timeframe": timeframe,
+        "search_form": search_form,
         "page_title": "Incidents",
         "base": base_template,
         "page": page,
-        "last_page_num": last_page_num,
-        "second_to_last_page": last_page_num - 1,
         "last_refreshed": last_refreshed,
     }
 
@@ -10,6 +10,7 @@ from django.utils import timezone
 
 from argus.incident.models import Incident
 from argus.incident.ticket.utils import autocreate_ticket
+from argus.notificationprofile.media import bulk_send_notifications_to_users
 
 
 def get_qs_for_incident_ids(incident_ids: list[int], qs=None):
@@ -29,7 +30,8 @@ def bulk_ack_queryset(request, qs, data: dict[str, Any]):
     timestamp = data["timestamp"]
     description = data.get("description", "")
     expiration = data.get("expiration", None)
-    acks = qs.create_acks(actor, timestamp, description, expiration)
+    acks = qs.create_acks(actor, timestamp, description, expiration).select_related("event__incident__source")
+    bulk_send_notifications_to_users(ack.event for ack in acks)
     incidents = []
     for ack in acks:
         incidents.append(ack.event.incident)
@@ -40,7 +42,8 @@ def bulk_close_queryset(request, qs, data: dict[str, Any]):
     actor = request.user
     timestamp = data["timestamp"]
     description = data.get("description", "")
-    events = qs.close(actor, timestamp, description)
+    events = qs.close(actor, timestamp, description).select_related("incident__source", "actor")
+    bulk_send_notifications_to_users(events)
     incidents = []
     for event in events:
         incidents.append(event.incident)
@@ -51,7 +54,8 @@ def bulk_reopen_queryset(request, qs, data: dict[str, Any]):
     actor = request.user
     timestamp = data["timestamp"]
     description = data.get("description", "")
-    events = qs.reopen(actor, timestamp, description)
+    events = qs.reopen(actor, timestamp, description).select_related("incident__source", "actor")
+    bulk_send_notifications_to_users(events)
     incidents = []
     for event in events:
         incidents.append(event.incident)
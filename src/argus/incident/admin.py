@@ -21,6 +21,7 @@ from .models import (
     IncidentRelation,
     IncidentRelationType,
     IncidentTagRelation,
+    IngestQueueItem,
     SourceSystem,
     SourceSystemType,
     Tag,
@@ -141,7 +142,6 @@ class IncidentAdmin(TextWidgetsOverrideModelAdmin):
         "source__type",
         "source",
     )
-    exclude = ("search_text",)
 
     text_input_form_fields = ("source_incident_id",)
     url_input_form_fields = ("details_url", "ticket_url")
@@ -357,6 +357,14 @@ class AcknowledgementAdmin(admin.ModelAdmin):
         return new_to_delete, model_count, perms_needed, protected
 
 
+class IngestQueueItemAdmin(admin.ModelAdmin):
+    list_display = ("id", "kind", "user", "incident", "created", "processed")
+    list_filter = ("kind",)
+    list_select_related = ("user",)
+    raw_id_fields = ("user", "incident")
+    ordering = ("id",)
+
+
 admin.site.register(SourceSystemType, SourceSystemTypeAdmin)
 admin.site.register(SourceSystem, SourceSystemAdmin)
 admin.site.register(Tag, TagAdmin)
@@ -365,3 +373,4 @@ admin.site.register(IncidentRelation, IncidentRelationAdmin)
 admin.site.register(IncidentRelationType, IncidentRelationTypeAdmin)
 admin.site.register(Event, EventAdmin)
 admin.site.register(Acknowledgement, AcknowledgementAdmin)
+admin.site.register(IngestQueueItem, IngestQueueItemAdmin)
@@ -11,12 +11,25 @@ class IncidentConfig(AppConfig):
             close_token_incident,
             delete_associated_user,
             delete_associated_event,
+            forget_changed_tag,
+            forget_deleted_tag,
             task_send_notification,  # noqa
             task_background_send_notification,
+            update_acked_until,
+            update_tag_index,
+            update_tag_index_of_tag,
         )
 
         post_delete.connect(delete_associated_user, "argus_incident.SourceSystem")
         post_delete.connect(delete_associated_event, "argus_incident.Acknowledgement")
+        # Connected after delete_associated_event so that the ack event is gone
+        post_delete.connect(update_acked_until, "argus_incident.Acknowledgement")
+        post_save.connect(update_acked_until, "argus_incident.Acknowledgement")
         post_delete.connect(close_token_incident, "authtoken.Token")
         post_save.connect(close_token_incident, "authtoken.Token")
+        post_save.connect(update_tag_index, "argus_incident.IncidentTagRelation")
+        post_delete.connect(update_tag_index, "argus_incident.IncidentTagRelation")
+        post_save.connect(update_tag_index_of_tag, "argus_incident.Tag")
+        post_save.connect(forget_changed_tag, "argus_incident.Tag")
+        post_delete.connect(forget_deleted_tag, "argus_incident.Tag")
         post_save.connect(task_background_send_notification, "argus_incident.Event", dispatch_uid="send_notification")
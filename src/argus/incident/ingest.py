@@ -0,0 +1,168 @@
+"""Apply a stream of incidents to create and events to post
+
+Each item is a JSON object with either the key ``incident``, holding an
+incident as for ``POST /api/v2/incidents/``, or the key ``event``, holding an
+event as for ``POST /api/v2/incidents/<pk>/events/`` plus either the
+``incident`` (the pk) or the ``source_incident_id`` of the incident to post
+it to.
+
+The items are applied in chunks of ``INGEST_CHUNK_SIZE``, each in one
+transaction, and every item in a savepoint of its own so that a bad item does
+not fail the rest of its chunk. There is one result per item, with the number
+of its line, a status code like the one the corresponding endpoint would have
+answered with and the errors, if any.
+
+Incidents with a ``source_incident_id`` that their source already has are not
+created again but answered with status 200, so a stream can safely be sent
+again after it was cut off.
+"""
+
+from __future__ import annotations
+
+from itertools import islice
+import json
+import logging
+from typing import TYPE_CHECKING, Optional
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, transaction
+from rest_framework import serializers, status
+
+from .models import Incident
+from .serializers import EventSerializer, IncidentSerializer
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+
+
+__all__ = [
+    "DEFAULT_CHUNK_SIZE",
+    "InvalidItem",
+    "Ingester",
+    "parse_item",
+]
+
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 100
+
+ITEM_KINDS = ("incident", "event")
+
+
+class InvalidItem(Exception):
+    def __init__(self, errors, status_code=status.HTTP_400_BAD_REQUEST):
+        super().__init__(errors)
+        self.errors = errors
+        self.status_code = status_code
+
+
+def parse_item(line: Optional[bytes]) -> dict:
+    "Decode one line into an item, raises ``InvalidItem``"
+    if line is None:
+        raise InvalidItem({"line": "The line is too long."})
+    try:
+        item = json.loads(line)
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise InvalidItem({"line": f"JSON parse error - {e}"})
+    if not isinstance(item, dict) or len(item) != 1 or next(iter(item)) not in ITEM_KINDS:
+        raise InvalidItem({"line": 'Must be an object with either the key "incident" or the key "event".'})
+    kind, data = next(iter(item.items()))
+    if not isinstance(data, dict):
+        raise InvalidItem({kind: "Must be an object."})
+    return item
+
+
+class Ingester:
+    "Applies items on behalf of ``user``, ``request`` is only used to build URLs"
+
+    def __init__(self, user, request=None):
+        # The views use this module
+        from .views import EventViewSet
+
+        self.user = user
+        self.request = request
+        self.event_view = EventViewSet(request=request)
+
+    def ingest(self, lines: Iterable[Optional[bytes]], chunk_size: Optional[int] = None) -> Iterator[dict]:
+        "Apply the items of ``lines`` chunk by chunk, yielding the results of each chunk once it is committed"
+        chunk_size = chunk_size or getattr(settings, "INGEST_CHUNK_SIZE", DEFAULT_CHUNK_SIZE)
+        numbered_lines = ((number, line) for number, line in enumerate(lines, start=1) if line is None or line.strip())
+        while chunk := list(islice(numbered_lines, chunk_size)):
+            yield from self.apply_chunk(chunk)
+
+    def apply_chunk(self, chunk: list[tuple[int, Optional[bytes]]]) -> list[dict]:
+        try:
+            with transaction.atomic():
+                return [{"line": number, **self.apply_line(line)} for number, line in chunk]
+        except DatabaseError:
+            LOG.exception("Ingest: Failed to save lines %i to %i", chunk[0][0], chunk[-1][0])
+            error = {"line": "The chunk this line was in could not be saved."}
+            return [
+                {"line": number, "status": status.HTTP_500_INTERNAL_SERVER_ERROR, "errors": error}
+                for number, _ in chunk
+            ]
+
+    def apply_line(self, line: Optional[bytes]) -> dict:
+        try:
+            item = parse_item(line)
+        except InvalidItem as e:
+            return {"status": e.status_code, "errors": e.errors}
+        return self.run(self.apply, item)
+
+    def run(self, apply, *args) -> dict:
+        "Call ``apply`` in a savepoint, and turn what it returns or raises into a result"
+        try:
+            with transaction.atomic():
+                status_code, result = apply(*args)
+        except InvalidItem as e:
+            return {"status": e.status_code, "errors": e.errors}
+        except serializers.ValidationError as e:
+            return {"status": status.HTTP_400_BAD_REQUEST, "errors": e.detail}
+        except IntegrityError as e:
+            return {"status": status.HTTP_400_BAD_REQUEST, "errors": {"line": str(e)}}
+        return {"status": status_code, **result, "errors": None}
+
+    def apply(self, item: dict) -> tuple[int, dict]:
+        "Apply one item, returns the status code and the pks of what was created"
+        if "incident" in item:
+            return self.create_incident(item["incident"])
+        return self.create_event(item["event"])
+
+    def get_source(self, data: dict):
+        from .views import get_source_for_new_incidents
+
+        return get_source_for_new_incidents(self.user, data)
+
+    def create_incident(self, data: dict) -> tuple[int, dict]:
+        serializer = IncidentSerializer(data=data)
+        serializer.is_valid(raise_exception=True)
+        source = self.get_source(data)
+        if serializer.validated_data.get("source_incident_id"):
+            incident, created = serializer.get_or_create(user=self.user, source=source)
+        else:
+            incident, created = serializer.save(user=self.user, source=source), True
+        return status.HTTP_201_CREATED if created else status.HTTP_200_OK, {"incident": incident.pk}
+
+    def create_event(self, data: dict) -> tuple[int, dict]:
+        data = dict(data)
+        incident_pk = data.pop("incident", None)
+        source_incident_id = data.pop("source_incident_id", None)
+        if incident_pk is not None:
+            lookup = {"pk": incident_pk}
+        elif source_incident_id:
+            lookup = {"source": self.get_source(data), "source_incident_id": source_incident_id}
+        else:
+            raise InvalidItem({"event": 'Must have either "incident" or "source_incident_id".'})
+        data.pop("source", None)
+        try:
+            incident = Incident.objects.get(**lookup)
+        except (Incident.DoesNotExist, ValueError, TypeError):
+            raise InvalidItem({"event": "The incident does not exist."}, status.HTTP_404_NOT_FOUND)
+        return self.post_event(incident, data)
+
+    def post_event(self, incident: Incident, data: dict, save_incident=True) -> tuple[int, dict]:
+        serializer = EventSerializer(data=data, context={"request": self.request, "user": self.user})
+        serializer.is_valid(raise_exception=True)
+        self.event_view.create_event(serializer, incident, self.user, save_incident=save_incident)
+        return status.HTTP_201_CREATED, {"incident": incident.pk, "event": serializer.instance.pk}
@@ -0,0 +1,129 @@
+"""Queue of incidents to create and events to post, applied after answering
+
+With the setting ``INGEST_QUEUE`` on, a request to create an incident or to
+post an event that prefers to be answered at once, with the header ``Prefer:
+respond-async``, is only validated and then stored as an ``IngestQueueItem``.
+It is answered with "202 Accepted" and a URL where the result can be looked up
+once the item has been applied.
+
+The ``process_ingest_queue`` management command applies the items in batches.
+Items are claimed with ``SELECT ... FOR UPDATE SKIP LOCKED``, so any number of
+workers can share the work. All events to an incident in a batch are applied
+in order to one locked copy of the incident, which is saved once at the end of
+the batch. Events to an incident that has older items claimed by another
+worker are left for later, so that the events to an incident are always
+applied in the order they were posted.
+"""
+
+from __future__ import annotations
+
+from datetime import timedelta
+import logging
+from typing import TYPE_CHECKING, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .ingest import Ingester
+from .models import Incident, IngestQueueItem
+
+if TYPE_CHECKING:
+    from django.contrib.auth.models import AbstractUser
+
+
+__all__ = [
+    "queue_is_enabled",
+    "wants_queue",
+    "queue_item",
+    "process_batch",
+    "delete_processed",
+]
+
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_KEEP_RESULTS = 24 * 60 * 60  # seconds
+
+
+def queue_is_enabled() -> bool:
+    return getattr(settings, "INGEST_QUEUE", False)
+
+
+def wants_queue(request) -> bool:
+    "Whether ``request`` should be queued instead of applied right away"
+    if not queue_is_enabled():
+        return False
+    preferences = request.headers.get("Prefer", "").split(",")
+    return any(preference.split(";")[0].strip().lower() == "respond-async" for preference in preferences)
+
+
+def queue_item(kind: str, user: AbstractUser, data, incident: Optional[Incident] = None) -> IngestQueueItem:
+    "Store validated ``data`` to be applied later"
+    if hasattr(data, "dict"):
+        # Form data
+        data = data.dict()
+    return IngestQueueItem.objects.create(kind=kind, user=user, data=data, incident=incident)
+
+
+def process_batch(batch_size: int = 100) -> int:
+    """Apply up to ``batch_size`` items from the queue
+
+    Returns how many items were processed, whether they succeeded or not.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        items = list(
+            IngestQueueItem.objects.filter(processed__isnull=True)
+            .select_for_update(skip_locked=True, of=("self",))
+            .select_related("user")
+            .order_by("id")[:batch_size]
+        )
+        if not items:
+            return 0
+
+        incident_pks = {item.incident_id for item in items if item.incident_id}
+        # An older unprocessed item that is not in this batch is claimed by another worker
+        waiting = set(
+            IngestQueueItem.objects.filter(processed__isnull=True, incident__in=incident_pks, pk__lt=items[-1].pk)
+            .exclude(pk__in=[item.pk for item in items])
+            .values_list("incident", flat=True)
+        )
+        incidents = Incident.objects.select_for_update(of=("self",)).in_bulk(incident_pks - waiting)
+
+        ingesters = {}
+        changed = {}
+        processed = []
+        for item in items:
+            if item.incident_id in waiting:
+                continue
+            if item.user_id not in ingesters:
+                ingesters[item.user_id] = Ingester(item.user)
+            ingester = ingesters[item.user_id]
+            if item.kind == IngestQueueItem.Kind.INCIDENT:
+                result = ingester.run(ingester.create_incident, item.data)
+            else:
+                incident = incidents[item.incident_id]
+                end_time = incident.end_time
+                result = ingester.run(ingester.post_event, incident, item.data, False)
+                if result["errors"] is not None:
+                    # Undo what was only changed in memory
+                    incident.end_time = end_time
+                elif incident.end_time != end_time:
+                    changed[incident.pk] = incident
+            item.processed = now
+            item.result = result
+            processed.append(item)
+
+        Incident.objects.bulk_update(changed.values(), fields=["end_time"])
+        IngestQueueItem.objects.bulk_update(processed, fields=["processed", "result"])
+    LOG.info("Ingest: processed %i queued items, %i left for later", len(processed), len(items) - len(processed))
+    return len(processed)
+
+
+def delete_processed(keep_results: Optional[int] = None) -> int:
+    "Delete items that were processed more than ``INGEST_QUEUE_KEEP_RESULTS`` seconds ago"
+    if keep_results is None:
+        keep_results = getattr(settings, "INGEST_QUEUE_KEEP_RESULTS", DEFAULT_KEEP_RESULTS)
+    deleted, _ = IngestQueueItem.objects.filter(processed__lt=timezone.now() - timedelta(seconds=keep_results)).delete()
+    return deleted
@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from argus.incident.ingest_queue import delete_processed, process_batch
+
+
+class Command(BaseCommand):
+    help = "Apply the incidents and events waiting in the ingest queue"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "-b", "--batch-size", type=int, default=100, help="Apply at most <batch-size> items per transaction"
+        )
+        parser.add_argument(
+            "--loop", action="store_true", help="Keep running, waiting for new items when the queue is empty"
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=1.0,
+            help="Seconds to wait before looking again when the queue is empty, only with --loop",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        total = 0
+        try:
+            while True:
+                processed = process_batch(batch_size=batch_size)
+                total += processed
+                if processed:
+                    continue
+                delete_processed()
+                if not options["loop"]:
+                    break
+                time.sleep(options["sleep"])
+        except KeyboardInterrupt:
+            pass
+        if options["verbosity"] > 1:
+            self.stdout.write(f"Processed {total} items")
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from argus.incident.models import Event, Incident
+
+
+class Command(BaseCommand):
+    help = "Recalculate when the acks of every acked incident expire"
+
+    def handle(self, *args, **options):
+        ack_events = Event.objects.filter(type=Event.Type.ACKNOWLEDGE).values("incident")
+        incidents = Incident.objects.filter(Q(acked_until__isnull=False) | Q(pk__in=ack_events))
+        updated = incidents.update_acked_until()
+        if options["verbosity"] > 1:
+            self.stdout.write(f"Recalculated the acks of {updated} incidents")
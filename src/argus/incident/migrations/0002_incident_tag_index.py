@@ -0,0 +1,38 @@
+# Generated by Django 5.2.2 on 2026-10-18 21:50
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+FILL_TAG_INDEX = """
+UPDATE argus_incident_incident AS incident SET tag_index = ARRAY(
+    SELECT tag.key || '=' || tag.value
+    FROM argus_incident_incidenttagrelation AS relation
+    JOIN argus_incident_tag AS tag ON tag.id = relation.tag_id
+    WHERE relation.incident_id = incident.id
+    ORDER BY 1
+)
+WHERE EXISTS (
+    SELECT 1 FROM argus_incident_incidenttagrelation AS relation WHERE relation.incident_id = incident.id
+)
+"""
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('argus_incident', '0001_squashed_incident_20250514'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='incident',
+            name='tag_index',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.TextField(), blank=True, default=list, editable=False, help_text='The tags of the incident as key=value, kept in sync with the tags for fast filtering.', size=None),
+        ),
+        migrations.RunSQL(FILL_TAG_INDEX, migrations.RunSQL.noop),
+        migrations.AddIndex(
+            model_name='incident',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['tag_index'], name='incident_tag_index_gin'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.2 on 2026-10-18 22:30
+
+import argus.incident.fields
+from django.db import migrations, models
+
+
+FILL_ACKED_UNTIL = """
+UPDATE argus_incident_incident AS incident SET acked_until = (
+    SELECT MAX(COALESCE(ack.expiration, 'infinity'))
+    FROM argus_incident_event AS event
+    LEFT JOIN argus_incident_acknowledgement AS ack ON ack.event_id = event.id
+    WHERE event.incident_id = incident.id AND event.type = 'ACK'
+)
+WHERE EXISTS (
+    SELECT 1 FROM argus_incident_event AS event WHERE event.incident_id = incident.id AND event.type = 'ACK'
+)
+"""
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('argus_incident', '0002_incident_tag_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='incident',
+            name='acked_until',
+            field=argus.incident.fields.DateTimeInfinityField(blank=True, editable=False, help_text='When the last ack of the incident expires, kept in sync with the acks for fast filtering.', null=True),
+        ),
+        migrations.RunSQL(FILL_ACKED_UNTIL, migrations.RunSQL.noop),
+        migrations.AddIndex(
+            model_name='incident',
+            index=models.Index(fields=['acked_until'], name='incident_acked_until_idx'),
+        ),
+    ]
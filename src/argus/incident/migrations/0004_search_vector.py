@@ -0,0 +1,37 @@
+# Generated by Django 5.2.2 on 2026-10-18 23:10
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('argus_incident', '0003_incident_acked_until'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='incident',
+            name='search_text',
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='search_vector',
+            field=models.GeneratedField(db_persist=True, expression=django.contrib.postgres.search.SearchVector('description', config='simple'), output_field=django.contrib.postgres.search.SearchVectorField()),
+        ),
+        migrations.AddField(
+            model_name='incident',
+            name='search_vector',
+            field=models.GeneratedField(db_persist=True, expression=django.contrib.postgres.search.SearchVector('description', config='simple'), output_field=django.contrib.postgres.search.SearchVectorField()),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='event_search_vector_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='incident',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='incident_search_vector_gin'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.2 on 2026-10-18 23:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('argus_incident', '0004_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='incident',
+            index=models.Index(fields=['-start_time', '-id'], name='incident_start_time_id_idx'),
+        ),
+    ]
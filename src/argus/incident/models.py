@@ -2,15 +2,20 @@ from collections import defaultdict
 from datetime import datetime, timedelta
 from functools import reduce
 import logging
-from operator import and_
+import operator
 from random import randint, choice
 from urllib.parse import urljoin
 
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.expressions import ArraySubquery
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, SearchVectorField
 from django.core.exceptions import ValidationError
 from django.core.validators import URLValidator
-from django.db import models
-from django.db.models import F, Q
+from django.db import connections, models, transaction
+from django.db.models import Exists, F, Max, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Concat
 from django.utils import timezone
 
 from argus.util.datetime_utils import INFINITY_REPR, get_infinity_repr
@@ -21,6 +26,10 @@ from .validators import validate_lowercase, validate_key
 
 LOG = logging.getLogger(__name__)
 User = get_user_model()
+# Reused, since every incident in a listing needs one
+validate_url = URLValidator()
+# No stemming or stop words, descriptions are mostly names of hosts, services and problems
+SEARCH_CONFIG = "simple"
 
 
 def get_or_create_default_instances():
@@ -111,6 +120,20 @@ def create_fake_incident(
     return incident
 
 
+def add_tags(incident, key_values, user):
+    "Tag ``incident`` with all of ``key_values``, creating the missing tags"
+    from .tags import resolve_tag_ids
+
+    tag_ids = resolve_tag_ids(key_values)
+    IncidentTagRelation.objects.bulk_create(
+        [IncidentTagRelation(tag_id=tag_id, incident=incident, added_by=user) for tag_id in tag_ids.values()],
+        ignore_conflicts=True,
+    )
+    # bulk_create sends no signals
+    Incident.objects.filter(pk=incident.pk).update_tag_index()
+    incident.refresh_from_db(fields=["tag_index"])
+
+
 def create_token_expiry_incident(token, expiry_date, level=2):
     if not token:
         raise ValueError("Token must be not None")
@@ -133,9 +156,27 @@ def create_token_expiry_incident(token, expiry_date, level=2):
         ("problem_type", "token_expiry"),
         ("source_system_id", f"{token.user.source_system.id}"),
     ]
-    for k, v in taglist:
-        tag, _ = Tag.objects.get_or_create(key=k, value=v)
-        IncidentTagRelation.objects.create(tag=tag, incident=incident, added_by=argus_user)
+    add_tags(incident, taglist, argus_user)
+    return incident
+
+
+def create_notification_storm_incident(description, level=2):
+    argus_user, _, source_system = get_or_create_default_instances()
+
+    incident = Incident.objects.create(
+        start_time=timezone.now(),
+        end_time=INFINITY_REPR,
+        source=source_system,
+        description=description,
+        level=level,
+    )
+
+    taglist = [
+        ("location", "argus"),
+        ("object", f"{incident.id}"),
+        ("problem_type", "notification_storm"),
+    ]
+    add_tags(incident, taglist, argus_user)
     return incident
 
 
@@ -269,17 +310,25 @@ class Event(models.Model):
     received = models.DateTimeField(default=timezone.now)
     type = models.TextField(choices=Type.choices)
     description = models.TextField(blank=True)
+    search_vector = models.GeneratedField(
+        expression=SearchVector("description", config=SEARCH_CONFIG),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
 
     class Meta:
+        indexes = [
+            GinIndex(fields=["search_vector"], name="event_search_vector_gin"),
+        ]
         ordering = ["-timestamp"]
 
     def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        # update incident.search_text
-        if self.description in self.incident.search_text:
-            return
-        self.incident.search_text += " " + self.description
-        self.incident.save(force_update=True, update_fields=["search_text"])
+        # Anything written by post_save, like the notification outbox, is saved or lost together with the event
+        with transaction.atomic():
+            adding = self._state.adding
+            super().save(*args, **kwargs)
+            if adding and self.type == self.Type.ACKNOWLEDGE:
+                self.incident.update_acked_until()
 
     def __str__(self):
         return f"'{self.get_type_display()}': {self.incident.description}, {self.actor} @ {self.timestamp}"
@@ -299,10 +348,10 @@ class IncidentQuerySet(models.QuerySet):
         return self.filter(end_time__lte=timezone.now())
 
     def acked(self):
-        return self.filter(id__in=self._get_acked_incident_ids())
+        return self.filter(acked_until__gt=timezone.now())
 
     def not_acked(self):
-        return self.exclude(id__in=self._get_acked_incident_ids())
+        return self.exclude(acked_until__gt=timezone.now())
 
     def has_ticket(self):
         return self.exclude(ticket_url="")
@@ -320,12 +369,69 @@ class IncidentQuerySet(models.QuerySet):
         return self.prefetch_related("incident_tag_relations__tag", "source__type")
 
     def from_tags(self, *tags):
-        tag_qss = Tag.objects.parse(*tags)
-        qs = []
-        for tag_qs in tag_qss:
-            qs.append(self.filter(incident_tag_relations__tag__in=tag_qs))
-        qs = reduce(and_, qs)
-        return qs.distinct()
+        "Incidents with all the tags in ``tags``, several values of the same key are ORed"
+        return self.filter(self.tags_q(*tags))
+
+    @staticmethod
+    def tags_q(*tags):
+        "Look up ``tags`` in the tag index, which avoids one join per tag key"
+        values_by_key = defaultdict(set)
+        for key, value in (Tag.split(tag) for tag in tags):
+            values_by_key[key].add(Tag.join(key, value))
+        q = Q()
+        required = []
+        for values in values_by_key.values():
+            if len(values) == 1:
+                required.extend(values)
+            else:
+                q &= Q(tag_index__overlap=sorted(values))
+        if required:
+            q &= Q(tag_index__contains=sorted(required))
+        return q
+
+    def update_tag_index(self):
+        "Rebuild the tag index of the incidents from their tags"
+        tags = (
+            IncidentTagRelation.objects.filter(incident=OuterRef("pk"))
+            .annotate(
+                representation=Concat(
+                    "tag__key", Value(Tag.TAG_DELIMITER), "tag__value", output_field=models.TextField()
+                )
+            )
+            .order_by("representation")
+            .values("representation")
+        )
+        return self.update(tag_index=ArraySubquery(tags))
+
+    def search(self, *terms):
+        """Incidents where every term starts a word in the description of the incident or one of its events
+
+        The matches are annotated with ``search_rank``, higher is better.
+        """
+        queries = [self.search_query(term) for term in terms if any(char.isalnum() for char in term)]
+        if not queries:
+            return self
+        q = Q()
+        for query in queries:
+            q &= Q(search_vector=query) | Exists(Event.objects.filter(incident=OuterRef("pk"), search_vector=query))
+        any_term = reduce(operator.or_, queries)
+        event_rank = (
+            Event.objects.filter(incident=OuterRef("pk"), search_vector=any_term)
+            .order_by()
+            .values("incident")
+            .annotate(rank=Max(SearchRank("search_vector", any_term)))
+            .values("rank")
+        )
+        rank = SearchRank("search_vector", any_term) + Coalesce(
+            Subquery(event_rank, output_field=models.FloatField()), Value(0.0)
+        )
+        return self.filter(q).annotate(search_rank=rank)
+
+    @staticmethod
+    def search_query(term):
+        "Match words starting with ``term``, the term is quoted so that it cannot change the query"
+        lexeme = term.replace("\\", "\\\\").replace("'", "''")
+        return SearchQuery(f"'{lexeme}':*", config=SEARCH_CONFIG, search_type="raw")
 
     def is_longer_than_minutes(self, minutes):
         min_duration = timedelta(minutes=minutes)
@@ -342,16 +448,109 @@ class IncidentQuerySet(models.QuerySet):
 
         return self.filter(source_id=argus_source_system.id).filter(incident_tag_relations__tag=token_expiry_tag)
 
-    # Cannot be a constant, because `timezone.now()` would have been evaluated at compile time
-    @staticmethod
-    def _get_acked_incident_ids():
-        current_acks = Acknowledgement.objects.active().prefetch_related("event__incident")
-        return current_acks.values_list("event__incident", flat=True).distinct()
+    def update_acked_until(self):
+        """Recalculate when the acks of the incidents expire
+
+        An ack event that does not (yet) have an acknowledgement counts as an
+        ack that never expires.
+        """
+        expirations = (
+            Event.objects.filter(incident=OuterRef("pk"), type=Event.Type.ACKNOWLEDGE)
+            .order_by()
+            .values("incident")
+            .annotate(
+                acked_until=Max(
+                    Coalesce(
+                        "ack__expiration",
+                        Value(INFINITY_REPR, output_field=DateTimeInfinityField()),
+                        output_field=DateTimeInfinityField(),
+                    ),
+                    output_field=DateTimeInfinityField(),
+                )
+            )
+            .values("acked_until")
+        )
+        return self.update(acked_until=Subquery(expirations, output_field=DateTimeInfinityField()))
+
+    def create_incidents(self, user: User, source: SourceSystem, incidents):
+        """Create incidents with their tags and first events in bulk
+
+        ``incidents`` are dicts like the validated data of
+        ``IncidentSerializer``. Returns the first events, in the same order.
+
+        No signals are sent, so notify about the events with
+        ``bulk_send_notifications_to_users``.
+        """
+        from .tags import resolve_tag_ids
+
+        incidents = [dict(data) for data in incidents]
+        incident_tags = [{(tag["key"], tag["value"]) for tag in data.pop("tags", ())} for data in incidents]
+        tag_ids = resolve_tag_ids(set().union(*incident_tags))
+
+        end_time_field = Incident._meta.get_field("end_time")
+        incident_objs = []
+        for data, key_values in zip(incidents, incident_tags):
+            incident = Incident(source=source, **data)
+            incident.end_time = end_time_field.to_python(incident.end_time)
+            # bulk_create sends no signals, so the tag index is filled in here
+            incident.tag_index = sorted(Tag.join(key, value) for key, value in key_values)
+            incident_objs.append(incident)
+
+        with transaction.atomic():
+            self.bulk_create(incident_objs)
+            IncidentTagRelation.objects.bulk_create(
+                IncidentTagRelation(incident=incident, tag_id=tag_ids[key_value], added_by=user)
+                for incident, key_values in zip(incident_objs, incident_tags)
+                for key_value in key_values
+            )
+            event_objs = [
+                Event(
+                    incident=incident,
+                    actor=source.user,
+                    timestamp=incident.start_time,
+                    type=Event.Type.INCIDENT_START if incident.stateful else Event.Type.STATELESS,
+                    description=incident.description,
+                )
+                for incident in incident_objs
+            ]
+            Event.objects.bulk_create(event_objs)
+        return event_objs
+
+    def insert_unless_exists(self, incident: "Incident") -> bool:
+        """Insert ``incident`` unless its source already has one with the same source incident id
+
+        Concurrent inserts of the same incident do not fail on the unique
+        constraint, one of them is inserted and the others are skipped. Sets the
+        pk and returns True if ``incident`` was inserted. No signals are sent.
+        """
+        connection = connections[self.db]
+        quote_name = connection.ops.quote_name
+        fields = [field for field in Incident._meta.local_concrete_fields if not (field.primary_key or field.generated)]
+        columns = ", ".join(quote_name(field.column) for field in fields)
+        placeholders = ", ".join(["%s"] * len(fields))
+        values = [field.get_db_prep_save(field.pre_save(incident, add=True), connection) for field in fields]
+        # The conflict target must repeat the condition of the partial unique constraint
+        sql = (
+            f"INSERT INTO {quote_name(Incident._meta.db_table)} ({columns}) VALUES ({placeholders}) "
+            f"ON CONFLICT ({quote_name('source_id')}, {quote_name('source_incident_id')}) "
+            f"WHERE {quote_name('source_incident_id')} > '' DO NOTHING RETURNING {quote_name('id')}"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, values)
+            row = cursor.fetchone()
+        if row is None:
+            return False
+        incident.pk = row[0]
+        incident._state.adding = False
+        incident._state.db = self.db
+        return True
 
     def create_acks(self, actor: User, timestamp=None, description="", expiration=None):
         events = self.create_events(actor, Event.Type.ACKNOWLEDGE, timestamp, description)
         ack_objs = [Acknowledgement(event=event, expiration=expiration) for event in events]
         Acknowledgement.objects.bulk_create(ack_objs)
+        # bulk_create sends no signals
+        self.update_acked_until()
         qs = Acknowledgement.objects.filter(event__in=events)
         return qs
 
@@ -438,8 +637,25 @@ class Incident(models.Model):
         verbose_name="ticket URL",
         help_text="URL to existing ticket in a ticketing system.",
     )
-    search_text = models.TextField(blank=True, default="", verbose_name="Search Text")
+    search_vector = models.GeneratedField(
+        expression=SearchVector("description", config=SEARCH_CONFIG),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
     metadata = models.JSONField(blank=True, default=dict)
+    tag_index = ArrayField(
+        models.TextField(),
+        blank=True,
+        default=list,
+        editable=False,
+        help_text="The tags of the incident as key=value, kept in sync with the tags for fast filtering.",
+    )
+    acked_until = DateTimeInfinityField(
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="When the last ack of the incident expires, kept in sync with the acks for fast filtering.",
+    )
 
     objects = IncidentQuerySet.as_manager()
 
@@ -451,17 +667,40 @@ class Incident(models.Model):
                 name="%(class)s_unique_source_incident_id_per_source",
             ),
         ]
+        indexes = [
+            GinIndex(fields=["tag_index"], name="incident_tag_index_gin"),
+            GinIndex(fields=["search_vector"], name="incident_search_vector_gin"),
+            # For keyset pagination of the incident list
+            models.Index(fields=["-start_time", "-id"], name="incident_start_time_id_idx"),
+            models.Index(fields=["acked_until"], name="incident_acked_until_idx"),
+        ]
         ordering = ["-start_time"]
 
     def __str__(self):
         end_time_str = f" - {self.end_time_str}" if self.end_time else ""
         return f"Incident #{self.pk} at {self.start_time}{end_time_str} [#{self.source_incident_id} from {self.source}]"
 
+    # Kept in sync in the database by signals and queryset updates, so only
+    # written when asked for with `update_fields`
+    DENORMALIZED_FIELDS = ("tag_index", "acked_until")
+
     def save(self, *args, **kwargs):
         # Parse and replace `end_time`, to avoid having to call `refresh_from_db()`
         self.end_time = self._meta.get_field("end_time").to_python(self.end_time)
+        if not self._state.adding and not args and kwargs.get("update_fields") is None:
+            # Do not overwrite the denormalized fields with stale values
+            kwargs["update_fields"] = self.get_saved_field_names()
         super().save(*args, **kwargs)
 
+    def get_saved_field_names(self):
+        "Names of the fields an ordinary save of an existing incident writes"
+        skipped = self.get_deferred_fields().union(self.DENORMALIZED_FIELDS)
+        return [
+            field.attname
+            for field in self._meta.concrete_fields
+            if not (field.primary_key or field.generated or field.attname in skipped)
+        ]
+
     @property
     def end_time_str(self):
         return get_infinity_repr(self.end_time, str_repr=True) or self.end_time
@@ -518,15 +757,12 @@ class Incident(models.Model):
 
     @property
     def acked(self):
-        acks_query = Q(ack__isnull=False)
-        acks_not_expired_query = Q(ack__expiration__isnull=True) | Q(ack__expiration__gt=timezone.now())
-        # This is specifically for when acks are just created
-        # The event (with type ACK) is created before the acknowledgement
-        # which triggers the notification sending which uses this function
-        # which is why we have to have this additional check
-        ack_is_just_being_created = Q(type=Event.Type.ACKNOWLEDGE) & Q(ack__isnull=True)
+        return self.acked_until is not None and self.acked_until > timezone.now()
 
-        return self.events.filter((acks_query & acks_not_expired_query) | ack_is_just_being_created).exists()
+    def update_acked_until(self):
+        incident_qs = Incident.objects.filter(pk=self.pk)
+        incident_qs.update_acked_until()
+        self.acked_until = incident_qs.values_list("acked_until", flat=True).first()
 
     def is_acked_by(self, group: str) -> bool:
         return group in self.acks.active().group_names()
@@ -621,14 +857,19 @@ class Incident(models.Model):
 
     def pp_details_url(self):
         "Merge Incident.details_url with Source.base_url"
-        path = self.details_url.strip()
+        if not self.details_url.strip():
+            return ""
+        return self.merge_details_url(self.details_url, self.source.base_url)
+
+    @staticmethod
+    def merge_details_url(details_url: str, base_url: str):
+        path = details_url.strip()
         if not path:
             return ""
-        validate_url = URLValidator()
         try:
             validate_url(path)
         except ValidationError:
-            base_url = self.source.base_url.strip()
+            base_url = base_url.strip()
             if base_url:
                 full_url = urljoin(base_url, path)
                 try:
@@ -730,3 +971,38 @@ class Acknowledgement(models.Model):
     def __str__(self):
         expiration_message = f" (expires {self.expiration})" if self.expiration else ""
         return f"Acknowledgement of incident #{self.event.incident.pk} by {self.event.actor}{expiration_message}"
+
+
+class IngestQueueItem(models.Model):
+    """An incident to create or an event to post, waiting to be applied
+
+    Stored by the incident and event endpoints when asked to answer at once,
+    and applied by the ``process_ingest_queue`` management command. Kept
+    for a while after it was processed, so that the result can be looked up.
+    """
+
+    class Kind(models.TextChoices):
+        INCIDENT = "incident", "Incident"
+        EVENT = "event", "Event"
+
+    id = models.BigAutoField(primary_key=True, verbose_name="ID")
+    kind = models.TextField(choices=Kind.choices)
+    user = models.ForeignKey(to=User, on_delete=models.CASCADE, related_name="+")
+    incident = models.ForeignKey(to=Incident, on_delete=models.CASCADE, null=True, blank=True, related_name="+")
+    data = models.JSONField()
+    created = models.DateTimeField(default=timezone.now)
+    processed = models.DateTimeField(null=True, blank=True)
+    result = models.JSONField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["id"]
+        indexes = [
+            models.Index(fields=["id"], condition=Q(processed__isnull=True), name="ingest_queue_pending_idx"),
+        ]
+
+    def __str__(self):
+        return f"Queued {self.kind} #{self.pk} from {self.user}"
+
+    @property
+    def status(self):
+        return "pending" if self.processed is None else "processed"
@@ -6,6 +6,7 @@ from django.core.validators import URLValidator
 from django.utils import timezone
 
 from rest_framework import serializers
+from rest_framework.reverse import reverse
 
 from argus.auth.serializers import UsernameSerializer
 from argus.util.datetime_utils import INFINITY_REPR
@@ -16,10 +17,12 @@ from .models import (
     Event,
     Incident,
     IncidentTagRelation,
+    IngestQueueItem,
     SourceSystem,
     SourceSystemType,
     Tag,
 )
+from .tags import resolve_tag_ids
 
 
 User = get_user_model()
@@ -129,15 +132,51 @@ class IncidentSerializer(serializers.ModelSerializer):
         assert "user" in validated_data
         user = validated_data.pop("user")
 
+        incident, tag_ids = self.build_incident(validated_data)
+        incident.save(force_insert=True)
+        self.add_tags_and_first_event(incident, tag_ids, user)
+
+        return incident
+
+    def get_or_create(self, user: User, source: SourceSystem) -> tuple[Incident, bool]:
+        """Create the incident unless its source already has one with the same source incident id
+
+        Returns the incident and whether it was created. Must be run in a
+        transaction, an existing incident stays locked until it ends.
+        """
+        assert hasattr(self, "_validated_data"), "You must call `.is_valid()` before calling `.get_or_create()`."
+
+        incident, tag_ids = self.build_incident({**self.validated_data, "source": source})
+        if Incident.objects.insert_unless_exists(incident):
+            self.add_tags_and_first_event(incident, tag_ids, user)
+            created = True
+        else:
+            incident = Incident.objects.select_for_update(of=("self",)).get(
+                source=source, source_incident_id=incident.source_incident_id
+            )
+            created = False
+        self.instance = incident
+        return incident, created
+
+    @staticmethod
+    def build_incident(validated_data: dict) -> tuple[Incident, dict]:
+        validated_data = dict(validated_data)
         tags_data = validated_data.pop("tags")
-        tags = {Tag.objects.get_or_create(**tag_data)[0] for tag_data in tags_data}
+        tag_ids = resolve_tag_ids((tag_data["key"], tag_data["value"]) for tag_data in tags_data)
 
-        incident = Incident.objects.create(**validated_data)
-        for tag in tags:
-            IncidentTagRelation.objects.create(tag=tag, incident=incident, added_by=user)
-        incident.create_first_event()
+        # The relations are created without signals, so the tag index is filled in here
+        tag_index = sorted(Tag.join(key, value) for key, value in tag_ids)
+        incident = Incident(tag_index=tag_index, **validated_data)
+        # Not every incident built here is saved through `Incident.save()`
+        incident.end_time = Incident._meta.get_field("end_time").to_python(incident.end_time)
+        return incident, tag_ids
 
-        return incident
+    @staticmethod
+    def add_tags_and_first_event(incident: Incident, tag_ids: dict, user: User):
+        IncidentTagRelation.objects.bulk_create(
+            IncidentTagRelation(tag_id=tag_id, incident=incident, added_by=user) for tag_id in tag_ids.values()
+        )
+        incident.create_first_event()
 
     def update(self, *args, **kwargs):
         """
@@ -222,14 +261,16 @@ class IncidentPureDeserializer(serializers.ModelSerializer):
 
     @staticmethod
     def add_and_remove_tags(instance: Incident, user: User, tags_data: list[dict]):
-        posted_tags = {Tag.objects.get_or_create(**tag_data)[0] for tag_data in tags_data}
+        posted_tag_ids = resolve_tag_ids((tag_data["key"], tag_data["value"]) for tag_data in tags_data)
+        posted_ids = set(posted_tag_ids.values())
 
         existing_tag_relations = instance.incident_tag_relations.select_related("tag")
         existing_tags = {tag_relation.tag for tag_relation in existing_tag_relations}
+        existing_ids = {tag.id for tag in existing_tags}
         remove_tag_relations = [
-            tag_relation for tag_relation in existing_tag_relations if tag_relation.tag not in posted_tags
+            tag_relation for tag_relation in existing_tag_relations if tag_relation.tag_id not in posted_ids
         ]
-        add_tags = posted_tags - existing_tags
+        add_tag_ids = posted_ids - existing_ids
 
         if not user.is_superuser:
             errors = {}
@@ -240,11 +281,11 @@ class IncidentPureDeserializer(serializers.ModelSerializer):
                 raise serializers.ValidationError(errors)
 
         # Post change events
-        if remove_tag_relations or add_tags:
+        if remove_tag_relations or add_tag_ids:
             description = ChangeEvent.format_description(
                 "tags",
                 [str(tag) for tag in existing_tags],
-                [str(tag) for tag in posted_tags],
+                [Tag.join(key, value) for key, value in posted_tag_ids],
             )
             ChangeEvent.objects.create(incident=instance, actor=user, timestamp=timezone.now(), description=description)
 
@@ -252,8 +293,14 @@ class IncidentPureDeserializer(serializers.ModelSerializer):
             tag_relation.delete()
             # XXX: remove tag object as well if no incident is connected to it?
 
-        for tag in add_tags:
-            IncidentTagRelation.objects.create(tag=tag, incident=instance, added_by=user)
+        if add_tag_ids:
+            IncidentTagRelation.objects.bulk_create(
+                IncidentTagRelation(tag_id=tag_id, incident=instance, added_by=user) for tag_id in add_tag_ids
+            )
+            # bulk_create sends no signals
+            Incident.objects.filter(pk=instance.pk).update_tag_index()
+        if remove_tag_relations or add_tag_ids:
+            instance.refresh_from_db(fields=["tag_index"])
 
     def to_representation(self, instance: Incident):
         return IncidentSerializer(instance).data
@@ -302,7 +349,8 @@ class EventSerializer(serializers.ModelSerializer):
         raise NotImplementedError()
 
     def to_internal_value(self, data: dict):
-        user = self.context["request"].user
+        # Queued events are validated without a request
+        user = self.context["user"] if "user" in self.context else self.context["request"].user
         if user.is_end_user and "timestamp" not in data:
             data["timestamp"] = timezone.now()
         return super().to_internal_value(data)
@@ -330,6 +378,230 @@ class EventSerializer(serializers.ModelSerializer):
         return event_repr
 
 
+class EventValuesSerializer:
+    """Read-only, faster version of ``EventSerializer`` for listings
+
+    Works on ``.values()``-rows made by ``get_values()``, so that no model
+    instances nor DRF fields are built per event. Gives exactly the same
+    representation as ``EventSerializer``.
+    """
+
+    VALUES = [
+        "pk",
+        "incident_id",
+        "actor_id",
+        "actor__username",
+        "timestamp",
+        "received",
+        "type",
+        "description",
+    ]
+
+    datetime_field = serializers.DateTimeField()
+    type_labels = dict(Event.Type.choices)
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    @classmethod
+    def get_values(cls, queryset):
+        return queryset.prefetch_related(None).values(*cls.VALUES)
+
+    @property
+    def data(self):
+        return [self.to_representation(row) for row in self.rows]
+
+    @classmethod
+    def to_representation(cls, row: dict, prefix=""):
+        "``prefix`` is put in front of the keys in ``row``, for values looked up through a relation"
+        return {
+            "pk": row[prefix + "pk"],
+            "incident": row[prefix + "incident_id"],
+            "actor": {"pk": row[prefix + "actor_id"], "username": row[prefix + "actor__username"]},
+            "timestamp": cls.datetime_field.to_representation(row[prefix + "timestamp"]),
+            "received": cls.datetime_field.to_representation(row[prefix + "received"]),
+            "type": {"value": row[prefix + "type"], "display": cls.type_labels[row[prefix + "type"]]},
+            "description": row[prefix + "description"],
+        }
+
+
+class IncidentValuesSerializer:
+    """Read-only, faster version of ``IncidentSerializer`` for listings
+
+    Works on ``.values()``-rows made by ``get_values()``, so that no model
+    instances nor DRF fields are built per incident. Gives exactly the same
+    representation as ``IncidentSerializer``.
+
+    ``fields`` picks which fields to show, and only their values are fetched.
+    ``expand`` adds the ``events`` and/or ``acks`` of every incident, which
+    are fetched for all the incidents at once.
+    """
+
+    # The values needed by each field
+    FIELDS = {
+        "pk": [],
+        "start_time": [],
+        "end_time": ["end_time"],
+        "source": ["source_id", "source__name", "source__type_id", "source__user_id", "source__base_url"],
+        "source_incident_id": ["source_incident_id"],
+        "details_url": ["details_url", "source__base_url"],
+        "description": ["description"],
+        "level": ["level"],
+        "ticket_url": ["ticket_url"],
+        "metadata": ["metadata"],
+        "tags": [],
+        "stateful": ["end_time"],
+        "open": ["end_time"],
+        "acked": ["acked_until"],
+    }
+    # Always needed, for looking up related objects and for paging
+    REQUIRED_VALUES = ["pk", "start_time"]
+    EXPANDABLE = ["events", "acks"]
+    ACK_VALUES = ["event__" + value for value in EventValuesSerializer.VALUES] + ["expiration"]
+
+    datetime_field = serializers.DateTimeField()
+    end_time_field = fields.DateTimeInfinitySerializerField()
+
+    def __init__(self, rows, fields=None, expand=()):
+        self.rows = rows
+        self.fields = fields or list(self.FIELDS)
+        self.expand = expand
+
+    @classmethod
+    def validate_options(cls, fields=None, expand=()):
+        errors = {}
+        unknown_fields = [field for field in fields or () if field not in cls.FIELDS]
+        if unknown_fields:
+            errors["fields"] = f"Unknown fields: {', '.join(unknown_fields)}"
+        unknown_expansions = [expansion for expansion in expand if expansion not in cls.EXPANDABLE]
+        if unknown_expansions:
+            errors["expand"] = f"Cannot expand: {', '.join(unknown_expansions)}"
+        if errors:
+            raise serializers.ValidationError(errors)
+
+    @classmethod
+    def get_values(cls, queryset, fields=None, **kwargs):
+        values = dict.fromkeys(cls.REQUIRED_VALUES)
+        for field in fields or cls.FIELDS:
+            values.update(dict.fromkeys(cls.FIELDS[field]))
+        return queryset.prefetch_related(None).values(*values)
+
+    @property
+    def data(self):
+        rows = list(self.rows)
+        incident_pks = [row["pk"] for row in rows]
+        tags = self.fetch_tags(incident_pks) if "tags" in self.fields else {}
+        expansions = {expansion: getattr(self, "fetch_" + expansion)(incident_pks) for expansion in self.expand}
+        now = timezone.now()
+        representations = []
+        for row in rows:
+            representation = self.to_representation(row, tags.get(row["pk"], []), now)
+            for expansion, related in expansions.items():
+                representation[expansion] = related.get(row["pk"], [])
+            representations.append(representation)
+        return representations
+
+    def fetch_tags(self, incident_pks):
+        relations = IncidentTagRelation.objects.filter(incident_id__in=incident_pks).values_list(
+            "incident_id", "added_by_id", "added_time", "tag__key", "tag__value"
+        )
+        tags = {}
+        for incident_pk, added_by, added_time, key, value in relations:
+            tags.setdefault(incident_pk, []).append(
+                {
+                    "added_by": added_by,
+                    "added_time": self.datetime_field.to_representation(added_time),
+                    "tag": Tag.join(key, value),
+                }
+            )
+        return tags
+
+    def fetch_events(self, incident_pks):
+        events = {}
+        for row in EventValuesSerializer.get_values(Event.objects.filter(incident_id__in=incident_pks)):
+            events.setdefault(row["incident_id"], []).append(EventValuesSerializer.to_representation(row))
+        return events
+
+    def fetch_acks(self, incident_pks):
+        "Same representation as ``ResponseAcknowledgementSerializer``"
+        acks = {}
+        rows = Acknowledgement.objects.filter(event__incident_id__in=incident_pks).values(*self.ACK_VALUES)
+        for row in rows:
+            acks.setdefault(row["event__incident_id"], []).append(
+                {
+                    "pk": row["event__pk"],
+                    "event": EventValuesSerializer.to_representation(row, prefix="event__"),
+                    "expiration": self.datetime_field.to_representation(row["expiration"]),
+                }
+            )
+        return acks
+
+    def to_representation(self, row: dict, tags: list, now):
+        return {field: getattr(self, "get_" + field)(row, tags, now) for field in self.fields}
+
+    @staticmethod
+    def get_pk(row, tags, now):
+        return row["pk"]
+
+    @classmethod
+    def get_start_time(cls, row, tags, now):
+        return cls.datetime_field.to_representation(row["start_time"])
+
+    @classmethod
+    def get_end_time(cls, row, tags, now):
+        return cls.end_time_field.to_representation(row["end_time"])
+
+    @staticmethod
+    def get_source(row, tags, now):
+        return {
+            "pk": row["source_id"],
+            "name": row["source__name"],
+            "type": {"name": row["source__type_id"]},
+            "user": row["source__user_id"],
+            "base_url": row["source__base_url"],
+        }
+
+    @staticmethod
+    def get_source_incident_id(row, tags, now):
+        return row["source_incident_id"]
+
+    @staticmethod
+    def get_details_url(row, tags, now):
+        return Incident.merge_details_url(row["details_url"], row["source__base_url"])
+
+    @staticmethod
+    def get_description(row, tags, now):
+        return row["description"]
+
+    @staticmethod
+    def get_level(row, tags, now):
+        return row["level"]
+
+    @staticmethod
+    def get_ticket_url(row, tags, now):
+        return row["ticket_url"]
+
+    @staticmethod
+    def get_metadata(row, tags, now):
+        return row["metadata"]
+
+    @staticmethod
+    def get_tags(row, tags, now):
+        return tags
+
+    @staticmethod
+    def get_stateful(row, tags, now):
+        return row["end_time"] is not None
+
+    @staticmethod
+    def get_open(row, tags, now):
+        return row["end_time"] is not None and row["end_time"] > now
+
+    @staticmethod
+    def get_acked(row, tags, now):
+        return row["acked_until"] is not None and row["acked_until"] > now
+
+
 class UpdateAcknowledgementSerializer(serializers.ModelSerializer):
     _later_than_func = timezone.now
 
@@ -435,9 +707,39 @@ class RequestBulkTicketUrlSerializer(serializers.ModelSerializer):
         ]
 
 
+class RequestBulkIncidentSerializer(serializers.Serializer):
+    "Every incident is validated by itself with ``IncidentSerializer``, so that it can fail alone"
+
+    MAX_INCIDENTS = 1000
+
+    incidents = serializers.ListField(child=serializers.DictField(), allow_empty=False, max_length=MAX_INCIDENTS)
+    source = serializers.IntegerField(required=False)
+
+
 class ResponseBulkSerializer(serializers.Serializer):
     changes = serializers.JSONField()
 
 
+class IngestQueueItemSerializer(serializers.ModelSerializer):
+    url = serializers.SerializerMethodField()
+    status = serializers.ReadOnlyField()
+
+    class Meta:
+        model = IngestQueueItem
+        fields = [
+            "pk",
+            "url",
+            "kind",
+            "status",
+            "created",
+            "processed",
+            "result",
+        ]
+        read_only_fields = fields
+
+    def get_url(self, item: IngestQueueItem) -> str:
+        return reverse("incident:ingest-queue-item", args=[item.pk], request=self.context.get("request"))
+
+
 class EmptySerializer(serializers.Serializer):
     pass
@@ -4,14 +4,17 @@ from rest_framework.authtoken.models import Token
 from argus.notificationprofile.media import send_notifications_to_users
 from argus.notificationprofile.media import background_send_notification
 from argus.notificationprofile.media import send_notification
+from argus.notificationprofile.outbox import outbox_is_enabled, queue_notification
 from .models import (
     Acknowledgement,
     Event,
     Incident,
+    IncidentTagRelation,
     SourceSystem,
     Tag,
     get_or_create_default_instances,
 )
+from .tags import forget_all_tags, forget_tag
 
 
 __all__ = [
@@ -19,6 +22,11 @@ __all__ = [
     "send_notification",
     "delete_associated_event",
     "close_token_incident",
+    "update_tag_index",
+    "update_tag_index_of_tag",
+    "forget_changed_tag",
+    "forget_deleted_tag",
+    "update_acked_until",
 ]
 
 
@@ -32,7 +40,8 @@ def task_send_notification(sender, instance: Event, *args, **kwargs):
 
 
 def task_background_send_notification(sender, instance: Event, *args, **kwargs):
-    send_notifications_to_users(instance, send=background_send_notification)
+    send = queue_notification if outbox_is_enabled() else background_send_notification
+    send_notifications_to_users(instance, send=send)
 
 
 def delete_associated_event(sender, instance: Acknowledgement, *args, **kwargs):
@@ -40,6 +49,29 @@ def delete_associated_event(sender, instance: Acknowledgement, *args, **kwargs):
         instance.event.delete()
 
 
+def update_acked_until(sender, instance: Acknowledgement, *args, **kwargs):
+    instance.event.incident.update_acked_until()
+
+
+def update_tag_index(sender, instance: IncidentTagRelation, *args, **kwargs):
+    Incident.objects.filter(pk=instance.incident_id).update_tag_index()
+
+
+def update_tag_index_of_tag(sender, instance: Tag, created=False, *args, **kwargs):
+    if not created:
+        Incident.objects.filter(incident_tag_relations__tag=instance).update_tag_index()
+
+
+def forget_changed_tag(sender, instance: Tag, created=False, *args, **kwargs):
+    # What the tag used to be is not known
+    if not created:
+        forget_all_tags()
+
+
+def forget_deleted_tag(sender, instance: Tag, *args, **kwargs):
+    forget_tag(instance.key, instance.value)
+
+
 def close_token_incident(instance: Token, **kwargs):
     if not hasattr(instance.user, "source_system"):
         return
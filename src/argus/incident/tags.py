@@ -0,0 +1,171 @@
+"""Look up the ids of many tags at once, creating the missing ones
+
+Tags arrive as key and value, and used to be looked up with one
+``get_or_create()`` each. Concurrent source systems sending the same new tag
+then raced on the unique constraint on key and value. Here all the tags are
+resolved in one statement: an ``INSERT ... ON CONFLICT DO NOTHING RETURNING``
+of the new tags, combined with a SELECT of the existing ones. A tag committed
+by someone else while the statement runs is found by neither, and is fetched
+with a second SELECT.
+
+The ids of known tags are kept in a bounded, least-recently-used cache in
+process, so that the usual tags cost no queries at all. A cached tag is
+forgotten when it is changed or deleted (see ``argus.incident.signals``).
+Since signals only reach the process that made the change, entries are also
+forgotten when they are older than the setting ``TAG_ID_CACHE_MAX_AGE`` (in
+seconds). The size of the cache is set with ``TAG_ID_CACHE_SIZE``, 0 turns it
+off.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+import logging
+import threading
+import time
+from typing import TYPE_CHECKING
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from .models import Tag
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+
+__all__ = [
+    "TagIdCache",
+    "resolve_tag_ids",
+    "forget_tag",
+    "forget_all_tags",
+]
+
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_CACHE_SIZE = 10_000
+DEFAULT_CACHE_MAX_AGE = 60  # seconds
+
+KeyValue = tuple[str, str]
+
+
+class TagIdCache:
+    "Thread-safe LRU cache of tag ids by (key, value)"
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def maxsize(self) -> int:
+        return getattr(settings, "TAG_ID_CACHE_SIZE", DEFAULT_CACHE_SIZE)
+
+    @property
+    def max_age(self) -> float:
+        return getattr(settings, "TAG_ID_CACHE_MAX_AGE", DEFAULT_CACHE_MAX_AGE)
+
+    def get_many(self, key_values: Iterable[KeyValue]) -> dict[KeyValue, int]:
+        found = {}
+        oldest = time.monotonic() - self.max_age
+        with self._lock:
+            for key_value in key_values:
+                entry = self._entries.get(key_value)
+                if entry is None:
+                    continue
+                tag_id, stored = entry
+                if stored <= oldest:
+                    del self._entries[key_value]
+                    continue
+                self._entries.move_to_end(key_value)
+                found[key_value] = tag_id
+        return found
+
+    def set_many(self, tag_ids: dict[KeyValue, int]):
+        maxsize = self.maxsize
+        if not maxsize:
+            return
+        now = time.monotonic()
+        with self._lock:
+            for key_value, tag_id in tag_ids.items():
+                self._entries[key_value] = (tag_id, now)
+                self._entries.move_to_end(key_value)
+            while len(self._entries) > maxsize:
+                self._entries.popitem(last=False)
+
+    def discard(self, key_value: KeyValue):
+        with self._lock:
+            self._entries.pop(key_value, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_cache = TagIdCache()
+
+
+def _run(sql: str, key_values: list[KeyValue]) -> dict[KeyValue, int]:
+    table = connection.ops.quote_name(Tag._meta.db_table)
+    keys = [key for key, _ in key_values]
+    values = [value for _, value in key_values]
+    with connection.cursor() as cursor:
+        cursor.execute(sql.format(table=table), [keys, values])
+        return {(key, value): tag_id for tag_id, key, value in cursor.fetchall()}
+
+
+# The SELECT sees the table as it was before the INSERT, so no tag is found twice
+UPSERT_TAGS = """
+WITH wanted ("key", "value") AS (
+    SELECT * FROM unnest(%s::text[], %s::text[])
+), inserted AS (
+    INSERT INTO {table} ("key", "value")
+    SELECT "key", "value" FROM wanted
+    ON CONFLICT ("key", "value") DO NOTHING
+    RETURNING "id", "key", "value"
+)
+SELECT "id", "key", "value" FROM inserted
+UNION ALL
+SELECT "id", "key", "value" FROM {table} JOIN wanted USING ("key", "value")
+"""
+
+SELECT_TAGS = """
+SELECT "id", "key", "value" FROM {table}
+WHERE ("key", "value") IN (SELECT * FROM unnest(%s::text[], %s::text[]))
+"""
+
+
+def resolve_tag_ids(key_values: Iterable[KeyValue]) -> dict[KeyValue, int]:
+    """Return the ids of the tags in ``key_values`` by (key, value)
+
+    Tags that do not exist are created. The keys must already be validated,
+    see ``Tag.split()``.
+    """
+    wanted = set(key_values)
+    tag_ids = _cache.get_many(wanted)
+    # Sorted, so that concurrent inserts of the same tags lock them in the same order
+    missing = sorted(wanted - tag_ids.keys())
+    if not missing:
+        return tag_ids
+
+    found = _run(UPSERT_TAGS, missing)
+    # Committed by a concurrent transaction after this statement started
+    concurrent = [key_value for key_value in missing if key_value not in found]
+    if concurrent:
+        LOG.debug("Tags: %i tags were created concurrently", len(concurrent))
+        found.update(_run(SELECT_TAGS, concurrent))
+    # New tags are only known to others once they are committed
+    transaction.on_commit(lambda: _cache.set_many(found))
+    tag_ids.update(found)
+    return tag_ids
+
+
+def forget_tag(key: str, value: str):
+    _cache.discard((key, value))
+
+
+def forget_all_tags():
+    _cache.clear()
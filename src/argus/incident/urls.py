@@ -11,6 +11,10 @@ router.register(r"source-types", views.SourceSystemTypeViewSet)
 router.register(r"", views.IncidentViewSet)
 
 sourced_incident_list = views.SourceLockedIncidentViewSet.as_view({"get": "list", "post": "create"})
+sourced_incident_upsert = views.SourceLockedIncidentViewSet.as_view({"put": "upsert"})
+incidents_bulk_list = views.BulkIncidentViewSet.as_view({"post": "create"})
+incidents_ingest = views.IngestViewSet.as_view({"post": "create"})
+ingest_queue_item_detail = views.IngestQueueViewSet.as_view({"get": "retrieve"})
 
 all_events_list = views.AllEventsViewSet.as_view({"get": "list"})
 event_list = views.EventViewSet.as_view({"get": "list", "post": "create"})
@@ -30,9 +34,13 @@ ticket_url_bulk_list = views.BulkTicketUrlViewSet.as_view({"post": "create"})
 app_name = "incident"
 urlpatterns = [
     path("acks/bulk/", acks_bulk_list, name="incident-acks-bulk"),
+    path("bulk/", incidents_bulk_list, name="incidents-bulk"),
     path("events/", all_events_list, name="events"),
     path("events/bulk/", events_bulk_list, name="incident-events-bulk"),
+    path("ingest/", incidents_ingest, name="incidents-ingest"),
     path("mine/", sourced_incident_list, name="source_locked_incidents"),
+    path("mine/<str:source_incident_id>/", sourced_incident_upsert, name="source_locked_incident_upsert"),
+    path("queue/<int:pk>/", ingest_queue_item_detail, name="ingest-queue-item"),
     path("ticket_url/bulk/", ticket_url_bulk_list, name="incident-ticket-url-bulk"),
     path("<int:incident_pk>/events/", event_list, name="incident-events"),
     path("<int:incident_pk>/events/<int:pk>/", event_detail, name="incident-event"),
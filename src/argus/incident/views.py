@@ -1,34 +1,48 @@
+from copy import deepcopy
+from hashlib import md5
 import logging
 import secrets
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db import IntegrityError
+from django.db import IntegrityError, transaction
+from django.db.models import Min
+from django.http import StreamingHttpResponse
 from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
 
 from django_filters import rest_framework as filters
 from rest_framework.filters import SearchFilter
 from drf_rw_serializers import viewsets as rw_viewsets
 from drf_spectacular.utils import extend_schema, extend_schema_view
+from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import OpenApiParameter, OpenApiResponse
 from rest_framework import mixins, serializers, status, viewsets
 from rest_framework.decorators import action
-from rest_framework.exceptions import ValidationError, PermissionDenied, MethodNotAllowed
+from rest_framework.exceptions import ValidationError, PermissionDenied, MethodNotAllowed, NotFound
 from rest_framework.generics import get_object_or_404
 from rest_framework.pagination import CursorPagination
 from rest_framework.response import Response
 from rest_framework.reverse import reverse
+from rest_framework.settings import api_settings
 
+from argus.drf.ndjson import NDJSONParser, NDJSONRenderer, render_line
 from argus.drf.permissions import IsSuperuserOrReadOnly
 from argus.filter import get_filter_backend
+from argus.notificationprofile.media import bulk_send_notifications_to_users
 from argus.util.datetime_utils import INFINITY_REPR
 
 from .forms import AddSourceSystemForm
+from .ingest import Ingester
+from .ingest_queue import queue_item, wants_queue
 from .models import (
     Acknowledgement,
     ChangeEvent,
     Event,
     Incident,
+    IncidentTagRelation,
+    IngestQueueItem,
     SourceSystem,
     SourceSystemType,
     Tag,
@@ -37,20 +51,24 @@ from .serializers import (
     UpdateAcknowledgementSerializer,
     EmptySerializer,
     EventSerializer,
+    EventValuesSerializer,
     IncidentPureDeserializer,
     IncidentSerializer,
+    IncidentValuesSerializer,
     IncidentTicketUrlSerializer,
+    IngestQueueItemSerializer,
     RequestAcknowledgementSerializer,
     RequestBulkAcknowledgementSerializer,
     RequestBulkEventSerializer,
+    RequestBulkIncidentSerializer,
     RequestBulkTicketUrlSerializer,
     ResponseAcknowledgementSerializer,
     ResponseBulkSerializer,
     SourceSystemSerializer,
     SourceSystemTypeSerializer,
     TagSerializer,
-    IncidentTagRelation,
 )
+from .tags import resolve_tag_ids
 from .ticket.base import (
     TicketClientException,
     TicketCreationException,
@@ -67,6 +85,18 @@ INCIDENT_OPENAPI_PARAMETER_DESCRIPTIONS = filter_backend.INCIDENT_OPENAPI_PARAME
 SOURCE_LOCKED_INCIDENT_OPENAPI_PARAMETER_DESCRIPTIONS = (
     filter_backend.SOURCE_LOCKED_INCIDENT_OPENAPI_PARAMETER_DESCRIPTIONS
 )
+INCIDENT_OUTPUT_OPENAPI_PARAMETERS = [
+    OpenApiParameter(
+        name="fields",
+        description="Comma-separated list of the fields to show for every incident, by default all of them.",
+        type=str,
+    ),
+    OpenApiParameter(
+        name="expand",
+        description="Comma-separated list of `events` and/or `acks`, to show those for every incident as well.",
+        type=str,
+    ),
+]
 User = get_user_model()
 
 
@@ -83,6 +113,128 @@ class EventPagination(CursorPagination):
     page_size_query_param = "page_size"
 
 
+def get_source_for_new_incidents(user, data):
+    "The source of incidents created by ``user``, superusers may pick another source with ``data['source']``"
+    if "source" in data:
+        if not user.is_superuser:
+            raise serializers.ValidationError("You must be a superuser to be allowed to specify the 'source' field.")
+
+        source_pk = data["source"]
+        try:
+            return SourceSystem.objects.get(pk=source_pk)
+        except SourceSystem.DoesNotExist:
+            raise ValidationError(f"SourceSystem with pk={source_pk} does not exist.")
+    try:
+        return user.source_system
+    except SourceSystem.DoesNotExist:
+        raise ValidationError("The requesting user must have a connected source system.")
+
+
+def queued_response(request, item: IngestQueueItem) -> Response:
+    "Answer that ``item`` will be applied later, and where to look up the result"
+    data = IngestQueueItemSerializer(item, context={"request": request}).data
+    return Response(data, status=status.HTTP_202_ACCEPTED, headers={"Location": data["url"]})
+
+
+class IncidentSearchFilter(SearchFilter):
+    """Full text search in the descriptions of incidents and their events
+
+    Every search term must start a word. Results keep the order of the
+    pagination, which needs a fixed ordering.
+    """
+
+    search_description = "Words or starts of words that must all be in the description of the incident or its events."
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+        return queryset.search(*terms)
+
+
+class ConditionalGetMixin:
+    """Answer with "304 Not Modified" if nothing has changed since the last GET
+
+    The validators are made from markers that are cheap to look up and change
+    whenever events or tags are added or an ack expires, together with the full
+    path, so that different filters and pages never share a validator. Changes
+    that leave no such marker, like removing a tag or deleting an incident, are
+    picked up by lists after at most API_CONDITIONAL_GET_MAX_AGE seconds. A
+    deleted incident or event is never answered with "304 Not Modified".
+    """
+
+    DEFAULT_MAX_AGE = 60  # seconds
+
+    def get_validators(self, request):
+        now = timezone.now()
+        last_event = Event.objects.order_by("-pk").values_list("pk", "received").first() or (None, None)
+        last_tag = IncidentTagRelation.objects.order_by("-pk").values_list("pk", "added_time").first() or (None, None)
+        next_ack_expiry = Incident.objects.filter(acked_until__gt=now).aggregate(Min("acked_until"))
+        max_age = getattr(settings, "API_CONDITIONAL_GET_MAX_AGE", self.DEFAULT_MAX_AGE)
+        period_start = int(now.timestamp()) // max_age * max_age if max_age else int(now.timestamp())
+
+        markers = [
+            request.user.pk,
+            request.accepted_renderer.format,
+            request.path,
+            sorted(request.query_params.lists()),
+            last_event[0],
+            last_tag[0],
+            next_ack_expiry["acked_until__min"],
+            period_start,
+        ]
+        etag = quote_etag(md5(repr(markers).encode(), usedforsecurity=False).hexdigest())
+        changed = [int(timestamp.timestamp()) for timestamp in (last_event[1], last_tag[1]) if timestamp]
+        last_modified = max([period_start, *changed])
+        return etag, last_modified
+
+    def get_conditionally(self, request, handler, *args, **kwargs):
+        etag, last_modified = self.get_validators(request)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is not None:
+            self.check_exists(**kwargs)
+            return response
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            response["ETag"] = etag
+            response["Last-Modified"] = http_date(last_modified)
+        return response
+
+    def check_exists(self, **kwargs):
+        "Raise ``NotFound`` if what is asked for was deleted, since deleting leaves no marker"
+        # Nested views answer 404 here if their parent was deleted
+        queryset = self.get_queryset()
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        if lookup_url_kwarg not in kwargs:
+            return
+        lookup = {self.lookup_field: kwargs[lookup_url_kwarg]}
+        if not self.filter_queryset(queryset).filter(**lookup).exists():
+            raise NotFound()
+
+
+class ValuesListModelMixin(mixins.ListModelMixin):
+    """List with ``values_serializer_class`` instead of the serializer class
+
+    The values serializer is read-only and works on ``.values()``-rows.
+    """
+
+    values_serializer_class = None
+
+    def get_values_serializer_kwargs(self):
+        return {}
+
+    def list(self, request, *args, **kwargs):
+        serializer_class = self.values_serializer_class
+        serializer_kwargs = self.get_values_serializer_kwargs()
+        queryset = serializer_class.get_values(self.filter_queryset(self.get_queryset()), **serializer_kwargs)
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(serializer_class(page, **serializer_kwargs).data)
+
+        return Response(serializer_class(queryset, **serializer_kwargs).data)
+
+
 class SourceSystemTypeViewSet(
     mixins.CreateModelMixin, mixins.ListModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet
 ):
@@ -127,7 +279,8 @@ class SourceSystemViewSet(
 
 
 class BaseIncidentViewSet(
-    mixins.ListModelMixin,
+    ConditionalGetMixin,
+    ValuesListModelMixin,
     mixins.CreateModelMixin,
     mixins.RetrieveModelMixin,
     mixins.UpdateModelMixin,
@@ -136,39 +289,45 @@ class BaseIncidentViewSet(
 ):
     pagination_class = IncidentPagination
     queryset = Incident.objects.prefetch_default_related()
-    search_fields = ["description", "search_text"]
+    values_serializer_class = IncidentValuesSerializer
 
     def get_serializer_class(self):
         if self.request.method in {"PUT", "PATCH"}:
             return IncidentPureDeserializer
         return IncidentSerializer
 
+    def get_values_serializer_kwargs(self):
+        def get_list(name):
+            return [item.strip() for item in self.request.query_params.get(name, "").split(",") if item.strip()]
+
+        fields, expand = get_list("fields"), get_list("expand")
+        self.values_serializer_class.validate_options(fields, expand)
+        return {"fields": fields, "expand": expand}
+
     def list(self, request, *args, **kwargs):
         if "count" in request.query_params:
             count = self.filter_queryset(self.get_queryset()).count()
             response_dict = {"count": count, "params": request.query_params}
             return Response(response_dict)
-        return super().list(request, *args, **kwargs)
+        return self.get_conditionally(request, super().list, *args, **kwargs)
 
-    def perform_create(self, serializer):
-        user = self.request.user
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_conditionally(request, super().retrieve, *args, **kwargs)
 
-        if "source" in serializer.initial_data:
-            if not user.is_superuser:
-                raise serializers.ValidationError(
-                    "You must be a superuser to be allowed to specify the 'source' field."
-                )
+    def create(self, request, *args, **kwargs):
+        if not wants_queue(request):
+            return super().create(request, *args, **kwargs)
+        # Validating empties the nested tags, so store what was posted
+        data = deepcopy(request.data)
+        serializer = IncidentSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        get_source_for_new_incidents(request.user, data)
+        item = queue_item(IngestQueueItem.Kind.INCIDENT, request.user, data)
+        return queued_response(request, item)
 
-            source_pk = serializer.initial_data["source"]
-            try:
-                source = SourceSystem.objects.get(pk=source_pk)
-            except SourceSystem.DoesNotExist:
-                raise ValidationError(f"SourceSystem with pk={source_pk} does not exist.")
-        else:
-            try:
-                source = user.source_system
-            except SourceSystem.DoesNotExist:
-                raise ValidationError("The requesting user must have a connected source system.")
+    def perform_create(self, serializer):
+        user = self.request.user
+        source = get_source_for_new_incidents(user, serializer.initial_data)
 
         # TODO: send notifications to users
         try:
@@ -229,7 +388,7 @@ class BaseIncidentViewSet(
                     incident=incident, actor=request.user, timestamp=timezone.now(), description=description
                 )
                 incident.ticket_url = serializer.data["ticket_url"]
-                incident.save()
+                incident.save(update_fields=["ticket_url"])
             return Response(serializer.data)
         else:
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -237,7 +396,7 @@ class BaseIncidentViewSet(
 
 @extend_schema_view(
     list=extend_schema(
-        parameters=INCIDENT_OPENAPI_PARAMETER_DESCRIPTIONS,
+        parameters=[*INCIDENT_OPENAPI_PARAMETER_DESCRIPTIONS, *INCIDENT_OUTPUT_OPENAPI_PARAMETERS],
     )
 )
 class IncidentViewSet(BaseIncidentViewSet):
@@ -246,20 +405,19 @@ class IncidentViewSet(BaseIncidentViewSet):
     Paged using a cursor
     """
 
-    filter_backends = [filters.DjangoFilterBackend, SearchFilter]
+    filter_backends = [filters.DjangoFilterBackend, IncidentSearchFilter]
     filterset_class = IncidentFilter
 
     def get_queryset(self):
         if self.request.method != "GET":
             return super().get_queryset()
-        return (
-            Incident.objects.prefetch_default_related().select_related("source").prefetch_related("events__ack").all()
-        )
+        # acked, open and stateful are read from columns on the incident, so events are not needed
+        return Incident.objects.prefetch_default_related().select_related("source__type")
 
 
 @extend_schema_view(
     list=extend_schema(
-        parameters=SOURCE_LOCKED_INCIDENT_OPENAPI_PARAMETER_DESCRIPTIONS,
+        parameters=[*SOURCE_LOCKED_INCIDENT_OPENAPI_PARAMETER_DESCRIPTIONS, *INCIDENT_OUTPUT_OPENAPI_PARAMETERS],
     )
 )
 class SourceLockedIncidentViewSet(BaseIncidentViewSet):
@@ -273,6 +431,37 @@ class SourceLockedIncidentViewSet(BaseIncidentViewSet):
     def get_queryset(self):
         return Incident.objects.filter(source__user=self.request.user).prefetch_default_related()
 
+    @extend_schema(
+        request=IncidentSerializer,
+        responses={200: IncidentSerializer, 201: IncidentSerializer},
+    )
+    def upsert(self, request, source_incident_id=None):
+        """Create an incident, or change the one with the same source incident id
+
+        Lets a source system safely repeat creating an incident, for instance
+        after a timeout. The source incident id in the URL overrides the one in
+        the body. Of an existing incident only the fields that can be changed
+        with PATCH are changed, the rest are ignored.
+        """
+        data = deepcopy(request.data)
+        data["source_incident_id"] = source_incident_id
+        # Validating empties the nested tags, and `data` is needed for the changes
+        serializer = IncidentSerializer(data=deepcopy(data))
+        serializer.is_valid(raise_exception=True)
+
+        user = request.user
+        source = get_source_for_new_incidents(user, request.data)
+        with transaction.atomic():
+            incident, created = serializer.get_or_create(user=user, source=source)
+            if not created:
+                changes = {field: data[field] for field in IncidentPureDeserializer.Meta.fields if field in data}
+                deserializer = IncidentPureDeserializer(incident, data=changes, partial=True)
+                deserializer.is_valid(raise_exception=True)
+                incident = deserializer.save(user=user)
+        return Response(
+            IncidentSerializer(incident).data, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK
+        )
+
 
 @extend_schema_view(
     update=extend_schema(
@@ -380,9 +569,12 @@ class IncidentTagViewSet(
 
     def perform_create(self, serializer):
         data = serializer.validated_data
-        tag, _ = Tag.objects.get_or_create(**data)
+        key_value = (data["key"], data["value"])
+        tag_id = resolve_tag_ids([key_value])[key_value]
         incident = self._get_incident()
-        IncidentTagRelation.objects.get_or_create(incident=incident, tag=tag, defaults={"added_by": self.request.user})
+        IncidentTagRelation.objects.get_or_create(
+            incident=incident, tag_id=tag_id, defaults={"added_by": self.request.user}
+        )
 
     def perform_destroy(self, instance):
         incident = self._get_incident()
@@ -403,14 +595,18 @@ class IncidentTagViewSet(
         ],
     )
 )
-class AllEventsViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
+class AllEventsViewSet(ConditionalGetMixin, ValuesListModelMixin, viewsets.GenericViewSet):
     pagination_class = EventPagination
     queryset = Event.objects.none()
     serializer_class = EventSerializer
+    values_serializer_class = EventValuesSerializer
 
     def get_queryset(self):
         return Event.objects.all()
 
+    def list(self, request, *args, **kwargs):
+        return self.get_conditionally(request, super().list, *args, **kwargs)
+
 
 @extend_schema_view(
     list=extend_schema(
@@ -420,19 +616,55 @@ class AllEventsViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
         ],
     )
 )
-class EventViewSet(mixins.ListModelMixin, mixins.CreateModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+class EventViewSet(
+    ConditionalGetMixin,
+    ValuesListModelMixin,
+    mixins.CreateModelMixin,
+    mixins.RetrieveModelMixin,
+    viewsets.GenericViewSet,
+):
     queryset = Incident.objects.none()  # For OpenAPI
     serializer_class = EventSerializer
+    values_serializer_class = EventValuesSerializer
 
     def get_queryset(self):
         incident_pk = self.kwargs["incident_pk"]
         incident = get_object_or_404(Incident.objects.all(), pk=incident_pk)
         return incident.events.all()
 
+    def list(self, request, *args, **kwargs):
+        return self.get_conditionally(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_conditionally(request, super().retrieve, *args, **kwargs)
+
+    def create(self, request, *args, **kwargs):
+        if not wants_queue(request):
+            return super().create(request, *args, **kwargs)
+        incident = get_object_or_404(Incident.objects.all(), pk=self.kwargs["incident_pk"])
+        data = request.data.dict() if hasattr(request.data, "dict") else dict(request.data)
+        serializer = self.get_serializer(data=data)
+        serializer.is_valid(raise_exception=True)
+        event_type = serializer.validated_data["type"]
+        self.validate_event_type_for_user(event_type, request.user)
+        if event_type == Event.Type.ACKNOWLEDGE:
+            # Points to the endpoint for acks
+            self.validate_event_type_for_incident(event_type, incident)
+        # The rest depends on the state of the incident when the event is applied
+        data["timestamp"] = serializer.validated_data["timestamp"].isoformat()
+        item = queue_item(IngestQueueItem.Kind.EVENT, request.user, data, incident=incident)
+        return queued_response(request, item)
+
     def perform_create(self, serializer: EventSerializer):
         user = self.request.user
         incident = Incident.objects.get(pk=self.kwargs["incident_pk"])
+        self.create_event(serializer, incident, user)
 
+    def create_event(self, serializer: EventSerializer, incident: Incident, user: User, save_incident=True):
+        """Save the event of ``serializer`` for ``incident``, and change the incident if the event is valid for it
+
+        With ``save_incident`` false, the incident is only changed in memory.
+        """
         event_type = serializer.validated_data["type"]
         self.validate_event_type_for_user(event_type, user)
         try:
@@ -445,7 +677,7 @@ class EventViewSet(mixins.ListModelMixin, mixins.CreateModelMixin, mixins.Retrie
                 raise e
         else:
             # Only update incident if everything is valid; otherwise, just record the event
-            self.update_incident(serializer.validated_data, incident)
+            self.update_incident(serializer.validated_data, incident, save=save_incident)
 
         serializer.save(incident=incident, actor=user)
 
@@ -483,15 +715,17 @@ class EventViewSet(mixins.ListModelMixin, mixins.CreateModelMixin, mixins.Retrie
                 f"Acknowledgements of this incidents should be posted through {acks_endpoint}."
             )
 
-    def update_incident(self, validated_data: dict, incident: Incident):
+    def update_incident(self, validated_data: dict, incident: Incident, save=True):
         timestamp = validated_data["timestamp"]
         event_type = validated_data["type"]
         if event_type in {Event.Type.INCIDENT_END, Event.Type.CLOSE}:
             incident.end_time = timestamp
-            incident.save()
         elif event_type == Event.Type.REOPEN:
-            incident.end_time = INFINITY_REPR
-            incident.save()
+            incident.end_time = incident._meta.get_field("end_time").to_python(INFINITY_REPR)
+        else:
+            return
+        if save:
+            incident.save(update_fields=["end_time"])
 
     @staticmethod
     def _raise_type_validation_error(message: str):
@@ -590,8 +824,9 @@ class BulkAcknowledgementViewSet(BulkHelper, viewsets.ViewSet):
 
         qs, changes, status_codes_seen = self.bulk_setup(incident_ids)
 
-        acks = qs.create_acks(actor, timestamp, description, expiration)
-        # send notifications manually
+        acks = list(qs.create_acks(actor, timestamp, description, expiration).select_related("event__incident__source"))
+        # bulk_create sends no signals
+        bulk_send_notifications_to_users(ack.event for ack in acks)
 
         for ack in acks:
             event = ack.event
@@ -642,7 +877,9 @@ class BulkEventViewSet(BulkHelper, viewsets.ViewSet):
             events = qs.reopen(actor, timestamp, description)
         else:
             events = qs.create_events(actor, event_type, timestamp, description)
-        # send notifications manually
+        events = list(events.select_related("incident__source", "actor"))
+        # bulk_create sends no signals
+        bulk_send_notifications_to_users(events)
 
         for event in events:
             incident = event.incident
@@ -695,3 +932,126 @@ class BulkTicketUrlViewSet(BulkHelper, viewsets.ViewSet):
         return Response(
             data={"changes": changes}, status=status.HTTP_400_BAD_REQUEST if all_bad else status.HTTP_201_CREATED
         )
+
+
+@extend_schema_view(
+    create=extend_schema(
+        request={NDJSONParser.media_type: OpenApiTypes.STR},
+        responses={(200, NDJSONRenderer.media_type): OpenApiTypes.STR},
+    ),
+)
+class IngestViewSet(viewsets.ViewSet):
+    """Create incidents and post events from newline-delimited JSON
+
+    The body is read and applied in chunks while the results are streamed
+    back, one line per line of the body. See ``argus.incident.ingest``.
+    """
+
+    parser_classes = [NDJSONParser]
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, NDJSONRenderer]
+
+    def create(self, request):
+        lines = request.data
+        if isinstance(lines, dict):
+            # There was no body
+            lines = []
+        results = Ingester(request.user, request).ingest(lines)
+        return StreamingHttpResponse(map(render_line, results), content_type=NDJSONRenderer.media_type)
+
+
+class IngestQueueViewSet(mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """Queued incidents and events, see the setting INGEST_QUEUE
+
+    The result of a processed item is what the incident or event endpoint
+    would have answered with: the status code, the pks of what was created and
+    the errors, if any.
+    """
+
+    queryset = IngestQueueItem.objects.all()
+    serializer_class = IngestQueueItemSerializer
+
+    def get_queryset(self):
+        if self.request.user.is_superuser:
+            return self.queryset
+        return self.queryset.filter(user=self.request.user)
+
+
+@extend_schema_view(
+    create=extend_schema(
+        request=RequestBulkIncidentSerializer,
+        responses=ResponseBulkSerializer,
+    )
+)
+class BulkIncidentViewSet(viewsets.ViewSet):
+    """Create many incidents at once
+
+    The changes are keyed by the position of the incident in the request.
+    """
+
+    serializer_class = ResponseBulkSerializer
+    write_serializer_class = RequestBulkIncidentSerializer
+    change_key = "incident"
+
+    def create(self, request):
+        serializer = self.write_serializer_class(data=request.data, context={"request": request})
+
+        if not serializer.is_valid():
+            return Response(data=serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        user = request.user
+        source = get_source_for_new_incidents(user, serializer.validated_data)
+
+        changes = {}
+        status_codes_seen = set()
+        valid = {}
+        for index, incident_data in enumerate(serializer.validated_data["incidents"]):
+            incident_serializer = IncidentSerializer(data=incident_data)
+            if incident_serializer.is_valid():
+                valid[index] = incident_serializer.validated_data
+            else:
+                changes[str(index)] = self.get_error(incident_serializer.errors)
+                status_codes_seen.add(status.HTTP_400_BAD_REQUEST)
+
+        # Incidents from the same source must have different source incident ids
+        source_incident_ids = {data["source_incident_id"] for data in valid.values() if data.get("source_incident_id")}
+        seen = set(
+            Incident.objects.filter(source=source, source_incident_id__in=source_incident_ids).values_list(
+                "source_incident_id", flat=True
+            )
+        )
+        for index, data in list(valid.items()):
+            source_incident_id = data.get("source_incident_id")
+            if not source_incident_id:
+                continue
+            if source_incident_id in seen:
+                del valid[index]
+                changes[str(index)] = self.get_error(
+                    {"source_incident_id": "An incident from this source with this source incident ID already exists."}
+                )
+                status_codes_seen.add(status.HTTP_400_BAD_REQUEST)
+            seen.add(source_incident_id)
+
+        try:
+            events = Incident.objects.create_incidents(user, source, valid.values())
+        except IntegrityError as e:
+            raise serializers.ValidationError(e)
+        # bulk_create sends no signals
+        bulk_send_notifications_to_users(events)
+
+        index_by_pk = {event.incident_id: index for index, event in zip(valid, events)}
+        rows = list(IncidentValuesSerializer.get_values(Incident.objects.filter(pk__in=index_by_pk)))
+        for row, representation in zip(rows, IncidentValuesSerializer(rows).data):
+            changes[str(index_by_pk[row["pk"]])] = {
+                "incident": representation,
+                "status": status.HTTP_201_CREATED,
+                "errors": None,
+            }
+            status_codes_seen.add(status.HTTP_201_CREATED)
+
+        all_bad = status_codes_seen == set((status.HTTP_400_BAD_REQUEST,))
+        return Response(
+            data={"changes": changes}, status=status.HTTP_400_BAD_REQUEST if all_bad else status.HTTP_201_CREATED
+        )
+
+    def get_error(self, errors):
+        return {self.change_key: None, "status": status.HTTP_400_BAD_REQUEST, "errors": errors}
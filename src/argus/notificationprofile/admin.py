@@ -2,7 +2,16 @@ from django.contrib import admin
 from django.db.models.functions import Concat
 from django.utils.html import format_html_join
 
-from .models import DestinationConfig, Filter, Media, NotificationProfile, TimeRecurrence, Timeslot
+from .models import (
+    DestinationConfig,
+    Filter,
+    Media,
+    NotificationProfile,
+    OutboxNotification,
+    TimeRecurrence,
+    Timeslot,
+)
+from .routing import invalidate_routing_table
 
 
 @admin.action(description="Toggle activation for selected profiles")
@@ -15,11 +24,13 @@ def toggle_activation(modeladmin, request, queryset):
 @admin.action(description="Activate selected profiles")
 def activate_profiles(modeladmin, request, queryset):
     queryset.update(active=True)
+    invalidate_routing_table()
 
 
 @admin.action(description="Deactivate selected profiles")
 def deactivate_profiles(modeladmin, request, queryset):
     queryset.update(active=False)
+    invalidate_routing_table()
 
 
 class TimeslotAdmin(admin.ModelAdmin):
@@ -150,8 +161,17 @@ class NotificationProfileAdmin(admin.ModelAdmin):
         return super(NotificationProfileAdmin, self).formfield_for_manytomany(db_field, request, **kwargs)
 
 
+class OutboxNotificationAdmin(admin.ModelAdmin):
+    list_display = ("id", "event", "destination", "created", "send_after", "attempts", "last_error")
+    list_filter = ("attempts", "digest", "destination__media")
+    list_select_related = ("event__incident", "event__actor", "destination__media")
+    raw_id_fields = ("event", "destination")
+    ordering = ("id",)
+
+
 admin.site.register(Timeslot, TimeslotAdmin)
 admin.site.register(Filter, FilterAdmin)
 admin.site.register(Media, MediaAdmin)
 admin.site.register(DestinationConfig, DestinationConfigAdmin)
 admin.site.register(NotificationProfile, NotificationProfileAdmin)
+admin.site.register(OutboxNotification, OutboxNotificationAdmin)
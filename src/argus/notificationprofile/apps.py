@@ -1,5 +1,6 @@
 from django.apps import AppConfig
-from django.db.models.signals import post_save, post_migrate
+from django.core.signals import setting_changed
+from django.db.models.signals import m2m_changed, post_delete, post_migrate, post_save
 
 
 class NotificationprofileConfig(AppConfig):
@@ -8,8 +9,11 @@ class NotificationprofileConfig(AppConfig):
 
     def ready(self):
         # Signals
+        from .models import NotificationProfile
         from .signals import (
             create_default_timeslot,
+            invalidate_routing_table_on_change,
+            invalidate_routing_table_on_setting_change,
             sync_email_destination,
             sync_media,
         )
@@ -17,3 +21,18 @@ class NotificationprofileConfig(AppConfig):
         post_save.connect(create_default_timeslot, "argus_auth.User")
         post_save.connect(sync_email_destination, "argus_auth.User")
         post_migrate.connect(sync_media, sender=self)
+
+        # Keep the compiled routing table in sync
+        for model in (
+            "argus_notificationprofile.NotificationProfile",
+            "argus_notificationprofile.Filter",
+            "argus_notificationprofile.Timeslot",
+            "argus_notificationprofile.TimeRecurrence",
+            "argus_notificationprofile.DestinationConfig",
+            "argus_notificationprofile.Media",
+        ):
+            post_save.connect(invalidate_routing_table_on_change, model)
+            post_delete.connect(invalidate_routing_table_on_change, model)
+        m2m_changed.connect(invalidate_routing_table_on_change, NotificationProfile.filters.through)
+        m2m_changed.connect(invalidate_routing_table_on_change, NotificationProfile.destinations.through)
+        setting_changed.connect(invalidate_routing_table_on_setting_change)
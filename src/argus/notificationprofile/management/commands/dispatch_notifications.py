@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from argus.notificationprofile.outbox import dispatch_batch
+from argus.notificationprofile.ratelimit import end_storm_if_over
+
+
+class Command(BaseCommand):
+    help = "Send the notifications waiting in the notification outbox"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "-b", "--batch-size", type=int, default=100, help="Send at most <batch-size> notifications per transaction"
+        )
+        parser.add_argument(
+            "--loop", action="store_true", help="Keep running, waiting for new notifications when the outbox is empty"
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=1.0,
+            help="Seconds to wait before looking again when the outbox is empty, only with --loop",
+        )
+        parser.add_argument(
+            "--max-attempts", type=int, help="Give up on a notification after failing <max-attempts> times"
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        max_attempts = options.get("max_attempts")
+        total = 0
+        try:
+            while True:
+                handled = dispatch_batch(batch_size=batch_size, max_attempts=max_attempts)
+                total += handled
+                if handled:
+                    continue
+                if not options["loop"]:
+                    break
+                end_storm_if_over()
+                time.sleep(options["sleep"])
+        except KeyboardInterrupt:
+            pass
+        if options["verbosity"] > 1:
+            self.stdout.write(f"Handled {total} notifications")
@@ -1,17 +1,22 @@
 from __future__ import annotations
 
+from collections import defaultdict
 import logging
-from multiprocessing import Process
+from operator import attrgetter
 from typing import TYPE_CHECKING
 
 from django.conf import settings
-from django.db import connections
+from django.utils import timezone
 from rest_framework.exceptions import ValidationError
 
-from argus.filter import get_filter_backend
 from argus.util.utils import import_class_from_dotted_path
 
-from ..models import DestinationConfig, Media, NotificationProfile
+from ..models import DestinationConfig, Media
+from ..ratelimit import end_storm_if_over, filter_rate_limited, hold_for_summary, record_events
+from ..routing import get_routing_table
+from ..workers import get_worker_pool
+from .concurrent import concurrent_sending_is_enabled, send_many
+from .email import email_connection
 
 if TYPE_CHECKING:
     from collections.abc import Iterable
@@ -19,9 +24,6 @@ if TYPE_CHECKING:
     from argus.incident.models import Event  # noqa: Break circular import
 
 
-filter_backend = get_filter_backend()
-ComplexFallbackFilterWrapper = filter_backend.ComplexFallbackFilterWrapper
-
 LOG = logging.getLogger(__name__)
 
 
@@ -29,9 +31,13 @@ __all__ = [
     "api_safely_get_medium_object",
     "send_notification",
     "background_send_notification",
+    "send_digest_notification",
+    "background_send_digest_notification",
+    "deduplicate_destinations",
     "find_destinations_for_event",
     "find_destinations_for_many_events",
     "send_notifications_to_users",
+    "bulk_send_notifications_to_users",
     "get_notification_media",
 ]
 
@@ -55,33 +61,92 @@ def send_notification(destinations: Iterable[DestinationConfig], *events: Iterab
         return
     media = get_notification_media(destinations)
     media_count = len(media)
-    for event in events:
-        LOG.info('Notification: sending event "%s" to %i mediums', event, media_count)
+    if concurrent_sending_is_enabled():
+        sends = [(medium, event, destinations) for event in events for medium in media]
+        LOG.info("Notification: sending %i events to %i mediums concurrently", len(events), media_count)
+        results = send_many(sends)
+        for (medium, event, _), result in zip(sends, results):
+            _log_send_result(medium, event, result)
+        return
+    with email_connection():
+        for event in events:
+            LOG.info('Notification: sending event "%s" to %i mediums', event, media_count)
+            for medium in media:
+                sent = medium.send(event=event, destinations=destinations)
+                _log_send_result(medium, event, sent)
+
+
+def _log_send_result(medium, event: Event, result):
+    if isinstance(result, BaseException):
+        LOG.error('Notification: could not send event "%s" to "%s"', event, medium.MEDIA_SLUG, exc_info=result)
+    elif result:
+        LOG.info('Notification: sent event "%s" to "%s"', event, medium.MEDIA_SLUG)
+    else:
+        LOG.warn('Notification: could not send event "%s" to "%s"', event, medium.MEDIA_SLUG)
+
+
+def background_send_notification(destinations: Iterable[DestinationConfig], *events: Event):
+    """Hand the sending over to the notification worker pool
+
+    Sends in the current thread if the pool is turned off or full.
+    """
+    pool = get_worker_pool()
+    if pool is not None and pool.submit(send_notification, destinations, *events):
+        LOG.info("Notification: backgrounded: about to send %i events", len(events))
+        return True
+    LOG.info("Notification: not backgrounded: sending %i events", len(events))
+    send_notification(destinations, *events)
+    return False
+
+
+def send_digest_notification(destinations: Iterable[DestinationConfig], *events: Event):
+    """Send one message about all the events to each destination
+
+    Has the same signature as ``send_notification``.
+    """
+    if not events:
+        return
+    if len(events) == 1:
+        return send_notification(destinations, *events)
+    media = get_notification_media(destinations)
+    LOG.info("Notification: sending digest of %i events to %i mediums", len(events), len(media))
+    with email_connection():
         for medium in media:
-            sent = medium.send(event=event, destinations=destinations)
+            sent = medium.send_digest(events=events, destinations=destinations)
             if sent:
-                LOG.info('Notification: sent event "%s" to "%s"', event, medium.MEDIA_SLUG)
+                LOG.info('Notification: sent digest of %i events to "%s"', len(events), medium.MEDIA_SLUG)
             else:
-                LOG.warn('Notification: could not send event "%s" to "%s"', event, medium.MEDIA_SLUG)
+                LOG.warn('Notification: could not send digest of %i events to "%s"', len(events), medium.MEDIA_SLUG)
 
 
-def background_send_notification(destinations: Iterable[DestinationConfig], *events: Event):
-    connections.close_all()
-    LOG.info("Notification: backgrounded: about to send %i events", len(events))
-    p = Process(target=send_notification, args=(destinations, *events))
-    p.start()
-    return p
+def background_send_digest_notification(destinations: Iterable[DestinationConfig], *events: Event):
+    "Hand the sending of a digest over to the notification worker pool"
+    pool = get_worker_pool()
+    if pool is not None and pool.submit(send_digest_notification, destinations, *events):
+        LOG.info("Notification: backgrounded: about to send digest of %i events", len(events))
+        return True
+    LOG.info("Notification: not backgrounded: sending digest of %i events", len(events))
+    send_digest_notification(destinations, *events)
+    return False
+
+
+def deduplicate_destinations(destinations: Iterable[DestinationConfig]) -> set[DestinationConfig]:
+    """Keep only one destination per medium and address
+
+    Several profiles, or several users, may have destinations with the same
+    address. The address is what the medium's ``get_label`` returns.
+    """
+    unique = {}
+    for destination in sorted(destinations, key=attrgetter("pk")):
+        medium = MEDIA_CLASSES_DICT.get(destination.media_id, None)
+        address = medium.get_label(destination) if medium else None
+        key = (destination.media_id, address) if address else destination.pk
+        unique.setdefault(key, destination)
+    return set(unique.values())
 
 
 def find_destinations_for_event(event: Event):
-    destinations = set()
-    incident = event.incident
-    qs = NotificationProfile.objects.filter(active=True)
-    for profile in qs.prefetch_related("destinations").select_related("user"):
-        fw = ComplexFallbackFilterWrapper(profile=profile)
-        LOG.debug('Notification: checking profile "%s" (%s) for event "%s"', profile, profile.user.username, event)
-        if fw.incident_fits(incident) and fw.event_fits(event):
-            destinations.update(profile.destinations.all())
+    destinations = deduplicate_destinations(get_routing_table().find_destinations_for_event(event))
     LOG.info('Notification: found %i listeners for "%s"', len(destinations), event)
     return destinations
 
@@ -102,16 +167,67 @@ def send_notifications_to_users(*events: Iterable[Event], send=send_notification
     if not getattr(settings, "SEND_NOTIFICATIONS", False):
         LOG.info("Notification: turned off sitewide, not sending any")
         return
-    # TODO: only send one notification per medium per user
     LOG.debug('Fallback filter set to "%s"', getattr(settings, "ARGUS_FALLBACK_FILTER", {}))
+    storm = record_events(len(events))
+    if not storm:
+        end_storm_if_over()
     all_destinations = find_destinations_for_many_events(events)
     if not all_destinations:
         return
     for event, destinations in all_destinations.items():
-        send(destinations, event)
+        if storm:
+            hold_for_summary(destinations, event)
+            continue
+        destinations = filter_rate_limited(destinations)
+        if destinations:
+            send(destinations, event)
     LOG.info("Notification: %i events sent! %i copies", len(events), len(destinations))
 
 
+def bulk_send_notifications_to_users(events: Iterable[Event]):
+    """Notify about events created in bulk, which send no signals
+
+    The events are matched against the notification profiles in one go, and
+    every destination gets a single message about all its events.
+    """
+    from ..outbox import outbox_is_enabled, queue_notification
+
+    events = list(events)
+    if not events:
+        return
+    if not getattr(settings, "SEND_NOTIFICATIONS", False):
+        LOG.info("Notification: turned off sitewide, not sending any")
+        return
+    storm = record_events(len(events))
+    if not storm:
+        end_storm_if_over()
+    all_destinations = find_destinations_for_many_events(events)
+    if not all_destinations:
+        return
+
+    events_per_destination = defaultdict(list)
+    for event, destinations in all_destinations.items():
+        for destination in destinations:
+            events_per_destination[destination].append(event)
+    # Destinations getting the same events share a message, like for single events
+    destinations_per_events = defaultdict(list)
+    for destination, destination_events in events_per_destination.items():
+        destinations_per_events[tuple(destination_events)].append(destination)
+
+    for destination_events, destinations in destinations_per_events.items():
+        if storm:
+            hold_for_summary(destinations, *destination_events)
+            continue
+        destinations = filter_rate_limited(destinations)
+        if not destinations:
+            continue
+        if outbox_is_enabled():
+            queue_notification(destinations, *destination_events, send_after=timezone.now())
+        else:
+            background_send_digest_notification(destinations, *destination_events)
+    LOG.info("Notification: %i events in bulk sent to %i destinations", len(events), len(events_per_destination))
+
+
 def get_notification_media(destinations: Iterable[DestinationConfig]):
     destination_slugs = set([destination.media.slug for destination in destinations])
     media = []
@@ -3,6 +3,9 @@ from __future__ import annotations
 from abc import ABC, abstractmethod
 from typing import TYPE_CHECKING
 
+from asgiref.sync import sync_to_async
+from django.db import connections
+
 if TYPE_CHECKING:
     from collections.abc import Iterable
 
@@ -23,6 +26,9 @@ __all__ = ["NotificationMedium"]
 
 
 class NotificationMedium(ABC):
+    # How many sends to this medium may run at the same time, see ``asend``
+    CONCURRENCY_LIMIT = 4
+
     class NotDeletableError(Exception):
         """
         Custom exception class that is raised when a destination cannot be
@@ -66,6 +72,31 @@ class NotificationMedium(ABC):
         """Sends message about a given event to the given destinations"""
         pass
 
+    @classmethod
+    async def asend(cls, event: Event, destinations: Iterable[DestinationConfig], **kwargs) -> bool:
+        """Sends message about a given event to the given destinations, asynchronously
+
+        Override this to send natively with asyncio. By default ``send`` is
+        run in a separate thread.
+        """
+
+        def send():
+            try:
+                return cls.send(event=event, destinations=destinations, **kwargs)
+            finally:
+                connections.close_all()
+
+        return await sync_to_async(send, thread_sensitive=False)()
+
+    @classmethod
+    def send_digest(cls, events: Iterable[Event], destinations: Iterable[DestinationConfig], **kwargs) -> bool:
+        """Sends a single message about all the given events to the given destinations
+
+        Media that cannot bundle messages send one message per event.
+        """
+        sent = [cls.send(event=event, destinations=destinations, **kwargs) for event in events]
+        return all(sent)
+
     @classmethod
     def raise_if_not_deletable(cls, destination: DestinationConfig) -> NoneType:
         """
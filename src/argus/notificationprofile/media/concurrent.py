@@ -0,0 +1,66 @@
+"""Send notifications to several media and destinations at the same time
+
+Every send runs as a task on an asyncio loop, via ``NotificationMedium.asend``.
+Media that only have a synchronous ``send`` are run in threads. How many sends
+to a single medium run at once is limited by the setting
+``NOTIFICATION_MEDIA_CONCURRENCY``, or else the medium's ``CONCURRENCY_LIMIT``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import TYPE_CHECKING
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from argus.incident.models import Event
+    from .base import NotificationMedium
+    from ..models import DestinationConfig
+
+    Send = tuple[type[NotificationMedium], Event, Iterable[DestinationConfig]]
+
+
+__all__ = [
+    "concurrent_sending_is_enabled",
+    "asend_many",
+    "send_many",
+]
+
+
+LOG = logging.getLogger(__name__)
+
+
+def concurrent_sending_is_enabled() -> bool:
+    return getattr(settings, "NOTIFICATION_CONCURRENT_SEND", False)
+
+
+def get_concurrency_limit(medium: type[NotificationMedium]) -> int:
+    limits = getattr(settings, "NOTIFICATION_MEDIA_CONCURRENCY", {})
+    return limits.get(medium.MEDIA_SLUG, medium.CONCURRENCY_LIMIT)
+
+
+async def asend_many(sends: Iterable[Send]) -> list[bool | BaseException]:
+    """Run all sends concurrently, each a tuple of medium, event and destinations
+
+    Returns the result of every send in the same order, or the exception it
+    raised.
+    """
+    semaphores = {}
+
+    async def asend(medium, event, destinations):
+        if medium not in semaphores:
+            semaphores[medium] = asyncio.Semaphore(get_concurrency_limit(medium))
+        async with semaphores[medium]:
+            return await medium.asend(event=event, destinations=destinations)
+
+    return await asyncio.gather(*(asend(*send) for send in sends), return_exceptions=True)
+
+
+def send_many(sends: Iterable[Send]) -> list[bool | BaseException]:
+    "Synchronous version of ``asend_many``"
+    return async_to_sync(asend_many)(list(sends))
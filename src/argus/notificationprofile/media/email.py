@@ -1,17 +1,20 @@
 from __future__ import annotations
 
+from contextlib import contextmanager
 import logging
+import threading
 from typing import TYPE_CHECKING
 
 from django import forms
 from django.conf import settings
-from django.core.mail import send_mail
+from django.core.mail import EmailMultiAlternatives, get_connection
 from django.template.loader import render_to_string
 from rest_framework.exceptions import ValidationError
 
 from argus.incident.models import Event
 from .base import NotificationMedium
 from ..models import DestinationConfig
+from ..routing import invalidate_routing_table
 from argus.util.datetime_utils import INFINITY, LOCAL_INFINITY
 
 if TYPE_CHECKING:
@@ -30,10 +33,13 @@ if TYPE_CHECKING:
 LOG = logging.getLogger(__name__)
 
 __all__ = [
+    "email_connection",
     "send_email_safely",
     "EmailNotification",
 ]
 
+_local = threading.local()
+
 
 def modelinstance_to_dict(obj):
     dict_ = vars(obj).copy()
@@ -41,6 +47,32 @@ def modelinstance_to_dict(obj):
     return dict_
 
 
+@contextmanager
+def email_connection():
+    """Send all emails inside the block over one shared connection
+
+    Nested blocks reuse the outermost connection. The connection is per
+    thread, so every notification worker gets its own.
+    """
+    connection = getattr(_local, "connection", None)
+    if connection is not None:
+        yield connection
+        return
+
+    connection = get_connection()
+    try:
+        connection.open()
+    except OSError:
+        # Every message will try to connect again, and report the failure
+        LOG.warning("Notification: Email: Could not open connection, will retry for each message")
+    _local.connection = connection
+    try:
+        yield connection
+    finally:
+        _local.connection = None
+        connection.close()
+
+
 def send_email_safely(function, additional_error=None, *args, **kwargs) -> int:
     try:
         result = function(*args, **kwargs)
@@ -123,6 +155,7 @@ class EmailNotification(NotificationMedium):
             )
             destination.settings = validated_data["settings"]
             DestinationConfig.objects.bulk_update([destination], fields=["settings"])
+            invalidate_routing_table()
             new_synced_destination.save()
             return destination
         return None
@@ -175,33 +208,41 @@ class EmailNotification(NotificationMedium):
 
         return subject, message, html_message
 
+    @staticmethod
+    def create_digest_message_context(events: Iterable[Event]):
+        """Creates the subject, message and html message for an email about several events"""
+        title = f"{len(events)} events"
+        template_context = {
+            "title": title,
+            "events": events,
+        }
+        subject = f"{settings.NOTIFICATION_SUBJECT_PREFIX}{title}"
+        message = render_to_string("notificationprofile/email_digest.txt", template_context)
+        html_message = render_to_string("notificationprofile/email_digest.html", template_context)
+
+        return subject, message, html_message
+
     @classmethod
-    def send(cls, event: Event, destinations: Iterable[DestinationConfig], **_) -> bool:
+    def send_to_addresses(cls, email_addresses: set[str], subject: str, message: str, html_message: str) -> bool:
         """
-        Sends email about a given event to the given email destinations
+        Sends one email per address, over a shared connection
 
-        Returns False if no email destinations were given and
-        True if emails were sent
+        Returns False if sending to all addresses failed, True otherwise
         """
-        email_addresses = cls.get_relevant_addresses(destinations=destinations)
-        if not email_addresses:
-            return False
         num_emails = len(email_addresses)
-
-        subject, message, html_message = cls.create_message_context(event=event)
-
         failed = set()
-        for email_address in email_addresses:
-            sent = send_email_safely(
-                send_mail,
-                subject=subject,
-                message=message,
-                from_email=None,
-                recipient_list=[email_address],
-                html_message=html_message,
-            )
-            if not sent:  # 0 for failure otherwise 1
-                failed.add(email_address)
+        with email_connection() as connection:
+            for email_address in email_addresses:
+                email = EmailMultiAlternatives(
+                    subject=subject,
+                    body=message,
+                    to=[email_address],
+                    connection=connection,
+                )
+                email.attach_alternative(html_message, "text/html")
+                sent = send_email_safely(email.send)
+                if not sent:  # 0 for failure otherwise 1
+                    failed.add(email_address)
 
         if failed:
             if num_emails == len(failed):
@@ -212,5 +253,36 @@ class EmailNotification(NotificationMedium):
                 len(failed),
                 num_emails,
             )
-            LOG.debug("Email: Failed to send to:", " ".join(failed))
+            LOG.debug("Email: Failed to send to: %s", " ".join(failed))
         return True
+
+    @classmethod
+    def send(cls, event: Event, destinations: Iterable[DestinationConfig], **_) -> bool:
+        """
+        Sends email about a given event to the given email destinations
+
+        Returns False if no email destinations were given and
+        True if emails were sent
+        """
+        email_addresses = cls.get_relevant_addresses(destinations=destinations)
+        if not email_addresses:
+            return False
+
+        subject, message, html_message = cls.create_message_context(event=event)
+        return cls.send_to_addresses(email_addresses, subject, message, html_message)
+
+    @classmethod
+    def send_digest(cls, events: Iterable[Event], destinations: Iterable[DestinationConfig], **_) -> bool:
+        """
+        Sends a single email about all the given events to each of the given
+        email destinations
+
+        Returns False if no email destinations were given and
+        True if emails were sent
+        """
+        email_addresses = cls.get_relevant_addresses(destinations=destinations)
+        if not email_addresses:
+            return False
+
+        subject, message, html_message = cls.create_digest_message_context(events=list(events))
+        return cls.send_to_addresses(email_addresses, subject, message, html_message)
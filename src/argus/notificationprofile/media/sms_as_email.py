@@ -11,13 +11,13 @@ from typing import TYPE_CHECKING
 
 from django import forms
 from django.conf import settings
-from django.core.mail import send_mail
+from django.core.mail import EmailMessage
 from phonenumber_field.formfields import PhoneNumberField
 from rest_framework.exceptions import ValidationError
 
 from ...incident.models import Event
 from .base import NotificationMedium
-from .email import send_email_safely
+from .email import email_connection, send_email_safely
 
 if TYPE_CHECKING:
     from collections.abc import Iterable
@@ -36,6 +36,8 @@ LOG = logging.getLogger(__name__)
 class SMSNotification(NotificationMedium):
     MEDIA_SLUG = "sms"
     MEDIA_NAME = "SMS"
+    # All messages go through the same gateway address
+    CONCURRENCY_LIMIT = 1
     MEDIA_JSON_SCHEMA = {
         "title": "SMS Settings",
         "description": "Settings for a DestinationConfig using SMS.",
@@ -97,9 +99,9 @@ class SMSNotification(NotificationMedium):
         return set(phone_numbers)
 
     @classmethod
-    def send(cls, event: Event, destinations: Iterable[DestinationConfig], **_) -> bool:
+    def send_message(cls, message: str, destinations: Iterable[DestinationConfig]) -> bool:
         """
-        Sends an SMS about a given event to the given sms destinations
+        Sends an SMS with the given message to the given sms destinations
 
         Returns False if no SMS destinations were given and True if SMS were sent
         """
@@ -115,16 +117,38 @@ class SMSNotification(NotificationMedium):
         # there is only one recipient, so failing to send a single message
         # means something is wrong on the email server
         sent = True
-        for phone_number in phone_numbers:
-            sent = send_email_safely(
-                send_mail,
-                subject=f"sms {phone_number}",
-                message=f"{event.description}",
-                from_email=None,
-                recipient_list=[recipient],
-            )
-            if not sent:
-                LOG.error("SMS: Failed to send")
-                break
+        with email_connection() as connection:
+            for phone_number in phone_numbers:
+                email = EmailMessage(
+                    subject=f"sms {phone_number}",
+                    body=message,
+                    to=[recipient],
+                    connection=connection,
+                )
+                sent = send_email_safely(email.send)
+                if not sent:
+                    LOG.error("SMS: Failed to send")
+                    break
 
         return sent
+
+    @classmethod
+    def send(cls, event: Event, destinations: Iterable[DestinationConfig], **_) -> bool:
+        """
+        Sends an SMS about a given event to the given sms destinations
+
+        Returns False if no SMS destinations were given and True if SMS were sent
+        """
+        return cls.send_message(f"{event.description}", destinations)
+
+    @classmethod
+    def send_digest(cls, events: Iterable[Event], destinations: Iterable[DestinationConfig], **_) -> bool:
+        """
+        Sends a single SMS about all the given events to the given sms destinations
+
+        Returns False if no SMS destinations were given and True if SMS were sent
+        """
+        events = list(events)
+        lines = [f"{len(events)} events:"]
+        lines.extend(f"{event.description}" for event in events)
+        return cls.send_message("\n".join(lines), destinations)
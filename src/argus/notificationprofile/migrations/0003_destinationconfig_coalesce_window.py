@@ -0,0 +1,18 @@
+# Generated by Django 5.2.2 on 2026-10-18 20:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('argus_notificationprofile', '0002_outboxnotification'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='destinationconfig',
+            name='coalesce_window',
+            field=models.PositiveIntegerField(default=0, help_text='Seconds to collect events into a single digest. 0 sends every event on its own.'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.2 on 2026-10-18 21:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('argus_notificationprofile', '0003_destinationconfig_coalesce_window'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboxnotification',
+            name='digest',
+            field=models.BooleanField(default=False, help_text='Send together with other held back notifications'),
+        ),
+    ]
@@ -11,6 +11,7 @@ from django.utils import timezone
 from django.utils.text import slugify
 
 from argus.util.utils import collection_to_prose
+from .schedule import WeeklySchedule
 
 if TYPE_CHECKING:
     from argus.incident.models import Event, Incident  # noqa: F401
@@ -45,11 +46,24 @@ class Timeslot(models.Model):
         time_recurrence_prose = [collection_to_prose(tr) for tr in self.time_recurrences.all()]
         return " ".join(time_recurrence_prose)
 
+    def get_schedule(self) -> WeeklySchedule:
+        "Compile the time recurrences, the result is kept until the timeslot is saved"
+        schedule = getattr(self, "_schedule", None)
+        if schedule is None:
+            schedule = WeeklySchedule.from_time_recurrences(self.time_recurrences.all())
+            self._schedule = schedule
+        return schedule
+
+    def reset_schedule(self):
+        self._schedule = None
+
     def timestamp_is_within_time_recurrences(self, timestamp: datetime):
-        for time_recurrence in self.time_recurrences.all():
-            if time_recurrence.timestamp_is_within(timestamp):
-                return True
-        return False
+        timestamp = timestamp.astimezone(timezone.get_current_timezone())
+        return self.get_schedule().contains(timestamp)
+
+    def save(self, *args, **kwargs):
+        self.reset_schedule()
+        super().save(*args, **kwargs)
 
 
 class TimeRecurrence(models.Model):
@@ -122,7 +136,7 @@ class TimeRecurrence(models.Model):
         return [self.Day(day).label for day in self.days]
 
     def timestamp_is_within(self, timestamp: datetime):
-        # FIXME: Might affect performance negatively if calling this method frequently
+        # For checking many timestamps use Timeslot.get_schedule() instead
         timestamp = timestamp.astimezone(timezone.get_current_timezone())
         return timestamp.isoweekday() in self.isoweekdays and self.start <= timestamp.time() <= self.end
 
@@ -131,6 +145,13 @@ class TimeRecurrence(models.Model):
         if self.days:
             self.days = sorted(self.days)
         super().save(*args, **kwargs)
+        if "timeslot" in self._state.fields_cache:
+            self.timeslot.reset_schedule()
+
+    def delete(self, *args, **kwargs):
+        if "timeslot" in self._state.fields_cache:
+            self.timeslot.reset_schedule()
+        return super().delete(*args, **kwargs)
 
 
 class Filter(models.Model):
@@ -179,6 +200,10 @@ class DestinationConfig(models.Model):
     )
     label = models.CharField(max_length=50, blank=True, null=True)
     settings = models.JSONField()
+    coalesce_window = models.PositiveIntegerField(
+        default=0,
+        help_text="Seconds to collect events into a single digest. 0 sends every event on its own.",
+    )
 
     def __str__(self):
         if self.label:
@@ -216,3 +241,26 @@ class NotificationProfile(models.Model):
         if self.name:
             return f"{self.name}"
         return f"{self.timeslot}: {', '.join(str(f) for f in self.filters.all())}"
+
+
+class OutboxNotification(models.Model):
+    """A notification about an event to a destination, waiting to be sent
+
+    Written in the same transaction as the event, and removed by the
+    ``dispatch_notifications`` management command once sent.
+    """
+
+    id = models.BigAutoField(primary_key=True, verbose_name="ID")
+    event = models.ForeignKey(to="argus_incident.Event", on_delete=models.CASCADE, related_name="+")
+    destination = models.ForeignKey(to=DestinationConfig, on_delete=models.CASCADE, related_name="+")
+    created = models.DateTimeField(default=timezone.now)
+    send_after = models.DateTimeField(default=timezone.now, db_index=True)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    digest = models.BooleanField(default=False, help_text="Send together with other held back notifications")
+
+    class Meta:
+        ordering = ["id"]
+
+    def __str__(self):
+        return f"Notification about event #{self.event_id} to destination #{self.destination_id}"
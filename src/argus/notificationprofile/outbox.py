@@ -0,0 +1,227 @@
+"""Durable notification outbox
+
+Instead of sending right away, every (event, destination) pair that should be
+notified is stored as an ``OutboxNotification``, in the same transaction as the
+event. The ``dispatch_notifications`` management command drains the outbox in
+batches. Rows are claimed with ``SELECT ... FOR UPDATE SKIP LOCKED``, so any
+number of dispatchers, on any number of nodes, can share the work without
+sending anything twice.
+
+Destinations with a ``coalesce_window`` hold back their notifications for that
+many seconds, and everything that piles up in the meantime is sent as a single
+digest. Notifications held back during a notification storm are sent the same
+way.
+
+Turn it on with the setting ``NOTIFICATION_OUTBOX``.
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import datetime, timedelta
+import logging
+from typing import TYPE_CHECKING
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from .media.email import email_connection
+from .models import OutboxNotification
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from argus.incident.models import Event
+    from .models import DestinationConfig
+
+
+__all__ = [
+    "outbox_is_enabled",
+    "queue_notification",
+    "dispatch_batch",
+]
+
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_MAX_ATTEMPTS = 5
+RETRY_DELAY = timedelta(seconds=30)
+MAX_RETRY_DELAY = timedelta(hours=1)
+
+
+def outbox_is_enabled() -> bool:
+    return getattr(settings, "NOTIFICATION_OUTBOX", False)
+
+
+def get_send_after(destinations: Iterable[DestinationConfig], now) -> dict[int, datetime]:
+    """Find when notifications to each destination should be sent
+
+    Destinations without a coalesce window are sent to right away. The others
+    join the digest already waiting in the outbox, or start a new one.
+    """
+    send_after = {destination.pk: now for destination in destinations}
+    coalescing = {destination.pk: destination for destination in destinations if destination.coalesce_window}
+    if not coalescing:
+        return send_after
+    pending = (
+        OutboxNotification.objects.filter(destination__in=coalescing, attempts=0, send_after__gt=now)
+        .values_list("destination")
+        .annotate(Min("send_after"))
+    )
+    for pk, destination in coalescing.items():
+        send_after[pk] = now + timedelta(seconds=destination.coalesce_window)
+    send_after.update(pending)
+    return send_after
+
+
+def queue_notification(destinations: Iterable[DestinationConfig], *events: Event, send_after: datetime = None):
+    """Store notifications in the outbox, has the same signature as ``send_notification``
+
+    If ``send_after`` is given the notifications are held back until then and
+    sent as a digest.
+    """
+    destinations = list(destinations)
+    now = timezone.now()
+    if send_after is None:
+        send_after = get_send_after(destinations, now)
+        digest = {destination.pk: bool(destination.coalesce_window) for destination in destinations}
+    else:
+        send_after = dict.fromkeys((destination.pk for destination in destinations), send_after)
+        digest = dict.fromkeys(send_after, True)
+    outbox = [
+        OutboxNotification(
+            event=event,
+            destination=destination,
+            created=now,
+            send_after=send_after[destination.pk],
+            digest=digest[destination.pk],
+        )
+        for event in events
+        for destination in destinations
+    ]
+    OutboxNotification.objects.bulk_create(outbox)
+    LOG.info("Notification: queued %i notifications in outbox", len(outbox))
+    return outbox
+
+
+def get_retry_delay(attempts: int) -> timedelta:
+    return min(RETRY_DELAY * 2 ** (attempts - 1), MAX_RETRY_DELAY)
+
+
+def _get_media(outbox: list[OutboxNotification]):
+    from .media import get_notification_media
+
+    return {medium.MEDIA_SLUG: medium for medium in get_notification_media(entry.destination for entry in outbox)}
+
+
+def _send_safely(medium, description: str, send, **kwargs):
+    """Send via ``send`` and return an error message, or None if it succeeded"""
+    slug = medium.MEDIA_SLUG
+    try:
+        sent = send(**kwargs)
+    except Exception as e:
+        LOG.exception('Notification: could not send %s to "%s"', description, slug)
+        return f"{e.__class__.__name__}: {e}"
+    if not sent:
+        LOG.warning('Notification: could not send %s to "%s"', description, slug)
+        return "Sending failed"
+    LOG.info('Notification: sent %s to "%s"', description, slug)
+    return None
+
+
+def _send_event(event: Event, outbox: list[OutboxNotification]):
+    """Send one event to all its destinations in the outbox
+
+    Returns a dict of the medium slug and the error of every failed medium
+    """
+    by_medium = defaultdict(list)
+    for entry in outbox:
+        by_medium[entry.destination.media_id].append(entry.destination)
+    media = _get_media(outbox)
+    errors = {}
+    for slug, destinations in by_medium.items():
+        medium = media.get(slug, None)
+        if medium is None:
+            errors[slug] = f'Medium "{slug}" is not installed'
+            continue
+        error = _send_safely(medium, f'event "{event}"', medium.send, event=event, destinations=destinations)
+        if error:
+            errors[slug] = error
+    return errors
+
+
+def _send_digest(destination: DestinationConfig, outbox: list[OutboxNotification]):
+    """Send all events in the outbox to one destination as a single digest
+
+    Returns the error, or None if the digest was sent
+    """
+    slug = destination.media_id
+    medium = _get_media(outbox).get(slug, None)
+    if medium is None:
+        return f'Medium "{slug}" is not installed'
+    events = [entry.event for entry in outbox]
+    return _send_safely(
+        medium, f"digest of {len(events)} events", medium.send_digest, events=events, destinations=[destination]
+    )
+
+
+def dispatch_batch(batch_size: int = 100, max_attempts: int = None) -> int:
+    """Send up to ``batch_size`` notifications from the outbox
+
+    Returns how many notifications were handled, sent or failed.
+    """
+    if max_attempts is None:
+        max_attempts = getattr(settings, "NOTIFICATION_OUTBOX_MAX_ATTEMPTS", DEFAULT_MAX_ATTEMPTS)
+    now = timezone.now()
+    with transaction.atomic():
+        outbox = list(
+            OutboxNotification.objects.filter(send_after__lte=now, attempts__lt=max_attempts)
+            .select_for_update(skip_locked=True, of=("self",))
+            .select_related("event__incident__source", "event__actor", "destination__media")
+            .order_by("id")[:batch_size]
+        )
+        if not outbox:
+            return 0
+
+        by_destination = defaultdict(list)
+        by_event = defaultdict(list)
+        for entry in outbox:
+            if entry.digest:
+                by_destination[entry.destination].append(entry)
+            else:
+                by_event[entry.event].append(entry)
+        digests = {}
+        for destination, entries in by_destination.items():
+            if len(entries) > 1:
+                digests[destination] = entries
+            else:
+                by_event[entries[0].event].extend(entries)
+
+        results = []
+        with email_connection():
+            for destination, entries in digests.items():
+                error = _send_digest(destination, entries)
+                results.extend((entry, error) for entry in entries)
+            for event, entries in by_event.items():
+                errors = _send_event(event, entries)
+                results.extend((entry, errors.get(entry.destination.media_id, None)) for entry in entries)
+
+        sent = []
+        failed = []
+        for entry, error in results:
+            if error is None:
+                sent.append(entry.pk)
+                continue
+            entry.attempts += 1
+            entry.last_error = error
+            entry.send_after = now + get_retry_delay(entry.attempts)
+            failed.append(entry)
+            if entry.attempts >= max_attempts:
+                LOG.error("Notification: giving up on %s after %i attempts: %s", entry, entry.attempts, error)
+
+        OutboxNotification.objects.filter(pk__in=sent).delete()
+        OutboxNotification.objects.bulk_update(failed, fields=["attempts", "last_error", "send_after"])
+    LOG.info("Notification: dispatched %i notifications from outbox, %i failed", len(sent), len(failed))
+    return len(outbox)
@@ -0,0 +1,196 @@
+"""Rate limits and a circuit breaker for notifications
+
+Each destination and each medium can have a token bucket that limits how many
+notifications it gets. Notifications over the limit are dropped.
+
+The circuit breaker counts all events up for notification. When there are more
+than allowed, a notification storm is declared: an incident is raised and
+notifications are held back and sent as one digest per destination when the
+storm is over. Without the notification outbox there is nowhere to hold them,
+so they are dropped instead.
+
+The state is kept in the Django cache given by the setting
+``NOTIFICATION_RATE_LIMIT_CACHE``. Use a shared cache like Redis or memcached
+if notifications are sent from more than one process, the default local memory
+cache only counts per process.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timezone as dt_timezone
+import logging
+import time
+from typing import TYPE_CHECKING
+
+from django.conf import settings
+from django.core.cache import caches
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from argus.incident.models import Event
+    from .models import DestinationConfig
+
+
+__all__ = [
+    "parse_rate",
+    "TokenBucket",
+    "filter_rate_limited",
+    "record_events",
+    "storm_is_ongoing",
+    "storm_ends_at",
+    "end_storm_if_over",
+    "hold_for_summary",
+]
+
+
+LOG = logging.getLogger(__name__)
+
+KEY_PREFIX = "argus:notification"
+STORM_KEY = f"{KEY_PREFIX}:storm"
+STORM_INCIDENT_KEY = f"{KEY_PREFIX}:storm:incident"
+
+PERIODS = {"s": 1, "m": 60, "h": 60 * 60, "d": 24 * 60 * 60}
+
+
+def get_cache():
+    return caches[getattr(settings, "NOTIFICATION_RATE_LIMIT_CACHE", "default")]
+
+
+def parse_rate(rate: str) -> tuple[int, int]:
+    """Parse a rate like ``"10/min"`` into the number and the period in seconds
+
+    Uses the same format as the throttle rates of Django REST Framework.
+    """
+    num, period = rate.split("/")
+    return int(num), PERIODS[period[0]]
+
+
+class TokenBucket:
+    """A bucket holding up to ``num`` tokens that refills over ``period`` seconds
+
+    Reading and writing the state is not atomic, so concurrent senders may
+    occasionally let a notification too many through.
+    """
+
+    def __init__(self, key: str, rate: str, cache=None):
+        self.key = key
+        self.capacity, self.period = parse_rate(rate)
+        self.cache = cache or get_cache()
+
+    def consume(self, tokens: int = 1) -> bool:
+        "Take ``tokens`` from the bucket, returns False if there are not enough"
+        now = time.time()
+        state = self.cache.get(self.key, None)
+        if state is None:
+            available = self.capacity
+        else:
+            available, last = state
+            available = min(self.capacity, available + (now - last) * self.capacity / self.period)
+        allowed = available >= tokens
+        if allowed:
+            available -= tokens
+        self.cache.set(self.key, (available, now), timeout=self.period)
+        return allowed
+
+
+def get_buckets(destination: DestinationConfig) -> list[TokenBucket]:
+    buckets = []
+    destination_rate = getattr(settings, "NOTIFICATION_DESTINATION_RATE_LIMIT", None)
+    if destination_rate:
+        buckets.append(TokenBucket(f"{KEY_PREFIX}:destination:{destination.pk}", destination_rate))
+    medium_rate = getattr(settings, "NOTIFICATION_MEDIA_RATE_LIMITS", {}).get(destination.media_id, None)
+    if medium_rate:
+        buckets.append(TokenBucket(f"{KEY_PREFIX}:medium:{destination.media_id}", medium_rate))
+    return buckets
+
+
+def filter_rate_limited(destinations: Iterable[DestinationConfig]) -> list[DestinationConfig]:
+    "Return the destinations that are still allowed to get a notification"
+    allowed = []
+    for destination in destinations:
+        if all(bucket.consume() for bucket in get_buckets(destination)):
+            allowed.append(destination)
+        else:
+            LOG.warning("Notification: rate limit reached for %s, dropping notification", destination)
+    return allowed
+
+
+def record_events(count: int) -> bool:
+    """Count events up for notification and trip the circuit breaker if there are too many
+
+    Returns True if there is an ongoing notification storm.
+    """
+    threshold = getattr(settings, "NOTIFICATION_STORM_THRESHOLD", None)
+    if not threshold:
+        return False
+    num, period = parse_rate(threshold)
+    cache = get_cache()
+    now = time.time()
+    key = f"{KEY_PREFIX}:events:{int(now // period)}"
+    cache.add(key, 0, timeout=2 * period)
+    if cache.incr(key, count) > num:
+        _trip(now, period, threshold)
+        return True
+    return storm_is_ongoing()
+
+
+def _trip(now: float, period: int, threshold: str):
+    from argus.incident.models import create_notification_storm_incident
+
+    cooldown = getattr(settings, "NOTIFICATION_STORM_COOLDOWN", period)
+    cache = get_cache()
+    ends_at = now + cooldown
+    if not cache.add(STORM_KEY, ends_at, timeout=cooldown):
+        # Still storming, keep the breaker open a while longer
+        cache.set(STORM_KEY, ends_at, timeout=cooldown)
+        return
+    LOG.error("Notification: storm, more than %s events, holding back notifications", threshold)
+    incident = create_notification_storm_incident(
+        f"Notification storm: more than {threshold} events, notifications are held back"
+    )
+    cache.set(STORM_INCIDENT_KEY, incident.pk, timeout=None)
+
+
+def storm_is_ongoing() -> bool:
+    return get_cache().get(STORM_KEY, None) is not None
+
+
+def storm_ends_at() -> datetime | None:
+    ends_at = get_cache().get(STORM_KEY, None)
+    if ends_at is None:
+        return None
+    return datetime.fromtimestamp(ends_at, tz=dt_timezone.utc)
+
+
+def end_storm_if_over():
+    "End the incident about the last notification storm once it is over"
+    if storm_is_ongoing():
+        return
+    cache = get_cache()
+    incident_pk = cache.get(STORM_INCIDENT_KEY, None)
+    if incident_pk is None:
+        return
+    from argus.incident.models import Incident, get_or_create_default_instances
+
+    cache.delete(STORM_INCIDENT_KEY)
+    incident = Incident.objects.filter(pk=incident_pk).first()
+    if incident:
+        argus_user, _, _ = get_or_create_default_instances()
+        incident.set_end(actor=argus_user)
+        LOG.info("Notification: storm is over")
+
+
+def hold_for_summary(destinations: Iterable[DestinationConfig], *events: Event):
+    """Hold back notifications during a storm
+
+    With the outbox they are sent as part of a digest when the storm is over,
+    otherwise they are dropped.
+    """
+    from .outbox import outbox_is_enabled, queue_notification
+
+    ends_at = storm_ends_at()
+    if ends_at is None or not outbox_is_enabled():
+        LOG.warning("Notification: storm, dropping notification about %i events", len(events))
+        return
+    queue_notification(destinations, *events, send_after=ends_at)
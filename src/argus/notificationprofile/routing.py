@@ -0,0 +1,183 @@
+"""Compiled routing table for matching events to notification profiles
+
+All active notification profiles are loaded once, together with their
+timeslots, filters and destinations, and kept in memory as compact,
+pre-built structures. Matching an event against the table then runs no
+queries for the profiles themselves.
+
+The table is thrown away whenever a profile, filter, timeslot, time recurrence
+or destination is changed (see ``argus.notificationprofile.signals``) and is
+rebuilt on next use. Since signals only reach the process that made the change,
+the table is also rebuilt when it is older than the setting
+``NOTIFICATION_ROUTING_TABLE_MAX_AGE`` (in seconds).
+"""
+
+from __future__ import annotations
+
+from functools import cached_property
+import logging
+import threading
+import time
+from typing import TYPE_CHECKING
+
+from django.conf import settings
+from django.utils import timezone
+
+from argus.filter import get_filter_backend
+
+from .models import NotificationProfile
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+    from datetime import datetime
+
+    from argus.incident.models import Event, Incident
+    from .models import DestinationConfig
+
+
+__all__ = [
+    "IncidentSnapshot",
+    "CompiledProfile",
+    "RoutingTable",
+    "get_routing_table",
+    "invalidate_routing_table",
+]
+
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_MAX_AGE = 60  # seconds
+
+filter_backend = get_filter_backend()
+
+
+class IncidentSnapshot:
+    """Wraps an incident so that the expensive attributes are looked up once
+
+    The filterwrappers read the same attributes of an incident once per filter,
+    some of which (``acked``, the tags) cost a query each time. Every other
+    attribute is passed through to the wrapped incident.
+    """
+
+    def __init__(self, incident: Incident, event: Event = None):
+        self._incident = incident
+        self._event = event
+
+    def __getattr__(self, name):
+        return getattr(self._incident, name)
+
+    @cached_property
+    def acked(self) -> bool:
+        # An ack event is saved before its acknowledgement
+        if self._event is not None and self._event.type == self._event.Type.ACKNOWLEDGE:
+            return True
+        return self._incident.acked
+
+    @cached_property
+    def open(self) -> bool:
+        return self._incident.open
+
+    @cached_property
+    def deprecated_tags(self):
+        return self._incident.deprecated_tags
+
+    @cached_property
+    def local_start_time(self) -> datetime:
+        return self._incident.start_time.astimezone(timezone.get_current_timezone())
+
+
+class CompiledProfile:
+    __slots__ = ("pk", "user_id", "schedule", "filterwrappers", "event_filterwrappers", "destinations")
+
+    def __init__(self, profile: NotificationProfile):
+        self.pk = profile.pk
+        self.user_id = profile.user_id
+        self.schedule = profile.timeslot.get_schedule()
+        filterblobs = [f.filter for f in profile.filters.all()]
+        incident_filterwrapper = filter_backend.ComplexFallbackFilterWrapper.filterwrapper
+        self.filterwrappers = tuple(incident_filterwrapper(filterblob) for filterblob in filterblobs)
+        self.event_filterwrappers = tuple(filter_backend.FilterWrapper(filterblob) for filterblob in filterblobs)
+        self.destinations = tuple(profile.destinations.all())
+
+    def __repr__(self):
+        return f"<CompiledProfile: {self.pk}>"
+
+    def is_selected_by_time(self, timestamp: datetime) -> bool:
+        "`timestamp` must already be in the current timezone"
+        return self.schedule.contains(timestamp)
+
+    def incident_fits(self, incident: IncidentSnapshot) -> bool:
+        if not self.is_selected_by_time(incident.local_start_time):
+            return False
+        for filterwrapper in self.filterwrappers:
+            if not filterwrapper.incident_fits(incident):
+                return False
+        return True
+
+    def event_fits(self, event: Event) -> bool:
+        for filterwrapper in self.event_filterwrappers:
+            if filterwrapper.event_fits(event):
+                return True
+        return False
+
+
+class RoutingTable:
+    def __init__(self, profiles: Iterable[CompiledProfile]):
+        self.profiles = tuple(profiles)
+        self.created = time.monotonic()
+
+    def __len__(self):
+        return len(self.profiles)
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.created
+
+    @classmethod
+    def build(cls) -> RoutingTable:
+        qs = (
+            NotificationProfile.objects.filter(active=True)
+            .select_related("timeslot")
+            .prefetch_related("timeslot__time_recurrences", "filters", "destinations__media")
+        )
+        table = cls(CompiledProfile(profile) for profile in qs)
+        LOG.debug("Notification: built routing table of %i active profiles", len(table))
+        return table
+
+    def find_destinations_for_event(self, event: Event) -> set[DestinationConfig]:
+        destinations = set()
+        incident = IncidentSnapshot(event.incident, event)
+        for profile in self.profiles:
+            if profile.event_fits(event) and profile.incident_fits(incident):
+                destinations.update(profile.destinations)
+        return destinations
+
+
+_routing_table = None
+_generation = 0
+_lock = threading.Lock()
+
+
+def get_routing_table() -> RoutingTable:
+    "Return the current routing table, building a new one if necessary"
+    global _routing_table
+    max_age = getattr(settings, "NOTIFICATION_ROUTING_TABLE_MAX_AGE", DEFAULT_MAX_AGE)
+    table = _routing_table
+    if table is not None and table.age <= max_age:
+        return table
+    with _lock:
+        table = _routing_table
+        if table is not None and table.age <= max_age:
+            return table
+        generation = _generation
+        table = RoutingTable.build()
+        # Do not cache a table that was invalidated while being built
+        if generation == _generation:
+            _routing_table = table
+    return table
+
+
+def invalidate_routing_table():
+    global _routing_table, _generation
+    _generation += 1
+    _routing_table = None
@@ -0,0 +1,92 @@
+"""Timeslots compiled into weekly schedules
+
+A ``WeeklySchedule`` holds the time recurrences of a timeslot as a sorted array
+of non-overlapping intervals, in microseconds since Monday 00:00. Looking up a
+timestamp is a binary search over a handful of integers instead of a loop over
+every time recurrence.
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_right
+from datetime import datetime, time
+from typing import TYPE_CHECKING
+
+from django.utils import timezone
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from .models import TimeRecurrence
+
+
+__all__ = [
+    "WeeklySchedule",
+]
+
+
+MICROSECONDS_PER_DAY = 24 * 60 * 60 * 1_000_000
+
+
+def time_to_microseconds(clock: time) -> int:
+    return ((clock.hour * 60 + clock.minute) * 60 + clock.second) * 1_000_000 + clock.microsecond
+
+
+def timestamp_to_offset(timestamp: datetime) -> int:
+    "Microseconds since Monday 00:00 in the timezone of ``timestamp``"
+    return (timestamp.isoweekday() - 1) * MICROSECONDS_PER_DAY + time_to_microseconds(timestamp.time())
+
+
+class WeeklySchedule:
+    __slots__ = ("starts", "ends")
+
+    def __init__(self, intervals: Iterable[tuple[int, int]] = ()):
+        """Merge half-open intervals of offsets since Monday 00:00"""
+        starts = []
+        ends = []
+        for start, end in sorted(intervals):
+            if start >= end:
+                continue
+            if ends and start <= ends[-1]:
+                ends[-1] = max(ends[-1], end)
+                continue
+            starts.append(start)
+            ends.append(end)
+        self.starts = tuple(starts)
+        self.ends = tuple(ends)
+
+    def __repr__(self):
+        return f"<WeeklySchedule: {len(self.starts)} intervals>"
+
+    def __bool__(self):
+        return bool(self.starts)
+
+    def __eq__(self, other):
+        if not isinstance(other, WeeklySchedule):
+            return NotImplemented
+        return self.starts == other.starts and self.ends == other.ends
+
+    @classmethod
+    def from_time_recurrences(cls, time_recurrences: Iterable[TimeRecurrence]):
+        """Compile time recurrences, where both ``start`` and ``end`` are included"""
+        intervals = []
+        for time_recurrence in time_recurrences:
+            start = time_to_microseconds(time_recurrence.start)
+            end = time_to_microseconds(time_recurrence.end) + 1
+            for day in time_recurrence.isoweekdays:
+                day_offset = (day - 1) * MICROSECONDS_PER_DAY
+                intervals.append((day_offset + start, day_offset + end))
+        return cls(intervals)
+
+    def contains_offset(self, offset: int) -> bool:
+        index = bisect_right(self.starts, offset) - 1
+        return index >= 0 and offset < self.ends[index]
+
+    def contains(self, timestamp: datetime) -> bool:
+        "Check ``timestamp``, which must already be in the current timezone"
+        return self.contains_offset(timestamp_to_offset(timestamp))
+
+    def contains_many(self, timestamps: Iterable[datetime]) -> list[bool]:
+        "Check several timestamps at once, converting them to the current timezone"
+        tz = timezone.get_current_timezone()
+        return [self.contains_offset(timestamp_to_offset(timestamp.astimezone(tz))) for timestamp in timestamps]
@@ -120,6 +120,7 @@ class ResponseDestinationConfigSerializer(serializers.ModelSerializer):
             "label",
             "suggested_label",
             "settings",
+            "coalesce_window",
         ]
 
     def get_suggested_label(self, destination: DestinationConfig) -> str:
@@ -134,6 +135,7 @@ class RequestDestinationConfigSerializer(serializers.ModelSerializer):
             "media",
             "label",
             "settings",
+            "coalesce_window",
         ]
 
     def validate(self, attrs: dict):
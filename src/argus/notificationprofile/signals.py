@@ -4,6 +4,7 @@ from django.contrib.auth import get_user_model
 from django.db.utils import ProgrammingError
 
 from .models import DestinationConfig, TimeRecurrence, Timeslot
+from .routing import invalidate_routing_table
 
 LOG = logging.getLogger(__name__)
 User = get_user_model()
@@ -12,6 +13,8 @@ __all__ = [
     "sync_media",
     "create_default_timeslot",
     "sync_email_destination",
+    "invalidate_routing_table_on_change",
+    "invalidate_routing_table_on_setting_change",
 ]
 
 
@@ -88,15 +91,34 @@ def sync_email_destination(sender, instance: User, created, raw, *args, **kwargs
                 DestinationConfig.objects.bulk_update(objs=[synced_email_destination], fields=["settings"])
             user_email_destination.settings["synced"] = True
             DestinationConfig.objects.bulk_update(objs=[user_email_destination], fields=["settings"])
+            invalidate_routing_table()
 
     # We need to create a destination with email_address=user.email
     else:
         if synced_email_destination:
             synced_email_destination.settings["synced"] = False
             DestinationConfig.objects.bulk_update(objs=[synced_email_destination], fields=["settings"])
+            invalidate_routing_table()
         new_synced_destination = DestinationConfig(
             user=instance,
             media_id="email",
             settings={"email_address": instance.email, "synced": True},
         )
         DestinationConfig.objects.bulk_create([new_synced_destination])
+
+
+def invalidate_routing_table_on_change(sender, *args, **kwargs):
+    """
+    Throw away the compiled routing table when anything it was built from changes
+    """
+    if kwargs.get("raw", False):
+        return
+    action = kwargs.get("action", None)
+    if action and not action.startswith("post_"):
+        return
+    invalidate_routing_table()
+
+
+def invalidate_routing_table_on_setting_change(sender, setting, *args, **kwargs):
+    if setting in ("ARGUS_FALLBACK_FILTER", "MEDIA_PLUGINS"):
+        invalidate_routing_table()
@@ -0,0 +1,204 @@
+"""A bounded pool of long-lived notification workers
+
+Sending notifications is slow, so it is done outside of the request. Instead of
+starting a new process per event, jobs are put on a bounded queue that is
+drained by a fixed number of worker threads. Each worker keeps its own database
+connection for as long as it lives.
+
+When the queue is full the caller waits up to ``NOTIFICATION_QUEUE_TIMEOUT``
+seconds for room, and then runs the job itself. This slows down whoever
+produces events faster than they can be sent instead of dropping
+notifications.
+"""
+
+from __future__ import annotations
+
+import atexit
+import logging
+import os
+import queue
+import threading
+from typing import TYPE_CHECKING
+
+from django.conf import settings
+from django.db import connection
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+
+__all__ = [
+    "NotificationWorkerPool",
+    "get_worker_pool",
+    "shutdown_worker_pool",
+]
+
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 4
+DEFAULT_QUEUE_SIZE = 1000
+DEFAULT_QUEUE_TIMEOUT = 5  # seconds
+DEFAULT_SHUTDOWN_TIMEOUT = 30  # seconds
+
+_STOP = object()
+
+
+class NotificationWorkerPool:
+    def __init__(self, size: int, queue_size: int, queue_timeout: float = DEFAULT_QUEUE_TIMEOUT):
+        if size < 1:
+            raise ValueError("A worker pool needs at least one worker")
+        self.size = size
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.workers = []
+        self.processed = 0
+        self.failed = 0
+        self.overflowed = 0
+        self._lock = threading.Lock()
+        self._stopping = False
+
+    def __repr__(self):
+        return f"<NotificationWorkerPool: {self.size} workers, {self.queue_depth}/{self.queue_size} queued>"
+
+    @property
+    def queue_depth(self) -> int:
+        return self.queue.qsize()
+
+    @property
+    def is_running(self) -> bool:
+        return any(worker.is_alive() for worker in self.workers)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.size,
+            "alive": sum(worker.is_alive() for worker in self.workers),
+            "queue_depth": self.queue_depth,
+            "queue_size": self.queue_size,
+            "processed": self.processed,
+            "failed": self.failed,
+            "overflowed": self.overflowed,
+        }
+
+    def start(self):
+        with self._lock:
+            if self.workers:
+                return
+            self._stopping = False
+            for number in range(self.size):
+                worker = threading.Thread(target=self._work, name=f"argus-notification-worker-{number}", daemon=True)
+                worker.start()
+                self.workers.append(worker)
+        LOG.info("Notification: started %i workers", self.size)
+
+    def submit(self, function: Callable, *args, **kwargs) -> bool:
+        """Queue ``function(*args, **kwargs)`` to be run by a worker
+
+        Returns False if the job could not be queued, because the pool is
+        shutting down or the queue stayed full for too long. The caller is then
+        responsible for the job.
+        """
+        if self._stopping:
+            return False
+        if not self.workers:
+            self.start()
+        try:
+            self.queue.put((function, args, kwargs), timeout=self.queue_timeout)
+        except queue.Full:
+            with self._lock:
+                self.overflowed += 1
+            LOG.warning("Notification: queue has been full (%i) for %ss", self.queue_size, self.queue_timeout)
+            return False
+        depth = self.queue_depth
+        if depth >= self.queue_size * 0.8:
+            LOG.warning("Notification: queue is nearly full: %i of %i", depth, self.queue_size)
+        else:
+            LOG.debug("Notification: queue depth %i", depth)
+        return True
+
+    def shutdown(self, timeout: float = DEFAULT_SHUTDOWN_TIMEOUT):
+        "Let the workers finish what is queued, then stop them"
+        with self._lock:
+            if not self.workers:
+                return
+            self._stopping = True
+            workers, self.workers = self.workers, []
+        LOG.info("Notification: stopping workers, %i jobs left in queue", self.queue_depth)
+        for _ in workers:
+            self.queue.put(_STOP)
+        for worker in workers:
+            worker.join(timeout)
+        still_alive = sum(worker.is_alive() for worker in workers)
+        if still_alive:
+            LOG.error("Notification: %i workers did not stop within %ss", still_alive, timeout)
+
+    def _work(self):
+        try:
+            while True:
+                job = self.queue.get()
+                if job is _STOP:
+                    self.queue.task_done()
+                    break
+                function, args, kwargs = job
+                self._ensure_usable_connection()
+                failed = False
+                try:
+                    function(*args, **kwargs)
+                except Exception:
+                    failed = True
+                    LOG.exception("Notification: worker failed to run %r", function)
+                finally:
+                    with self._lock:
+                        self.processed += 1
+                        self.failed += failed
+                    self.queue.task_done()
+        finally:
+            connection.close()
+
+    @staticmethod
+    def _ensure_usable_connection():
+        # The connection is kept open between jobs, drop it if the server went away
+        if connection.connection is not None and not connection.is_usable():
+            connection.close()
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def get_worker_pool():
+    """Return the worker pool of this process, creating it if necessary
+
+    Returns None if the pool is turned off by setting ``NOTIFICATION_WORKERS``
+    to 0.
+    """
+    global _pool, _pool_pid
+    size = getattr(settings, "NOTIFICATION_WORKERS", DEFAULT_WORKERS)
+    if not size:
+        return None
+    pid = os.getpid()
+    # Threads do not survive a fork, a forked process needs a pool of its own
+    if _pool is not None and _pool_pid == pid:
+        return _pool
+    with _pool_lock:
+        if _pool is None or _pool_pid != pid:
+            _pool = NotificationWorkerPool(
+                size=size,
+                queue_size=getattr(settings, "NOTIFICATION_QUEUE_SIZE", DEFAULT_QUEUE_SIZE),
+                queue_timeout=getattr(settings, "NOTIFICATION_QUEUE_TIMEOUT", DEFAULT_QUEUE_TIMEOUT),
+            )
+            _pool_pid = pid
+    return _pool
+
+
+def shutdown_worker_pool(timeout: float = DEFAULT_SHUTDOWN_TIMEOUT):
+    global _pool
+    pool = _pool
+    if pool is not None and _pool_pid == os.getpid():
+        pool.shutdown(timeout)
+    _pool = None
+
+
+atexit.register(shutdown_worker_pool)
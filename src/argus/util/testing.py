@@ -1,7 +1,6 @@
 from django.db.models.signals import post_save
 
-from argus.incident.signals import send_notification
-from argus.incident.signals import background_send_notification
+from argus.incident.signals import task_background_send_notification
 from argus.incident.models import Event
 
 
@@ -15,10 +14,8 @@ __all__ = [
 
 
 def disconnect_signals():
-    post_save.disconnect(send_notification, Event, dispatch_uid="send_notification")
-    post_save.disconnect(background_send_notification, Event, dispatch_uid="send_notification")
+    post_save.disconnect(task_background_send_notification, Event, dispatch_uid="send_notification")
 
 
 def connect_signals():
-    post_save.connect(send_notification, Event, dispatch_uid="send_notification")
-    post_save.connect(background_send_notification, Event, dispatch_uid="send_notification")
+    post_save.connect(task_background_send_notification, Event, dispatch_uid="send_notification")
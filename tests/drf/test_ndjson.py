@@ -0,0 +1,22 @@
+from io import BytesIO
+
+from django.test import SimpleTestCase
+
+from argus.drf.ndjson import NDJSONParser, NDJSONRenderer
+
+
+class NDJSONTests(SimpleTestCase):
+    def test_parser_yields_lines_as_they_are_read(self):
+        stream = BytesIO(b'{"a": 1}\n\n{"b": 2}')
+        lines = NDJSONParser().parse(stream)
+        self.assertEqual(next(lines), b'{"a": 1}\n')
+        self.assertEqual(stream.tell(), 9)
+        self.assertEqual(list(lines), [b"\n", b'{"b": 2}'])
+
+    def test_parser_skips_too_long_lines(self):
+        stream = BytesIO(b"1234\n123456789\n12345\n")
+        lines = NDJSONParser.iter_lines(stream, max_length=4)
+        self.assertEqual(list(lines), [b"1234\n", None, None])
+
+    def test_renderer_renders_one_line(self):
+        self.assertEqual(NDJSONRenderer().render({"a": [1, 2]}), b'{"a":[1,2]}\n')
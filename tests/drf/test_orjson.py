@@ -0,0 +1,51 @@
+from datetime import datetime, timezone as dt_timezone
+from importlib.util import find_spec
+from io import BytesIO
+import unittest
+
+from django.test import SimpleTestCase
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from argus.util.datetime_utils import INFINITY, NEGATIVE_INFINITY
+
+
+@unittest.skipUnless(find_spec("orjson"), "orjson is not installed")
+class ORJSONTests(SimpleTestCase):
+    def setUp(self):
+        from argus.drf.parsers import ORJSONParser
+        from argus.drf.renderers import ORJSONRenderer
+
+        self.renderer = ORJSONRenderer()
+        self.parser = ORJSONParser()
+
+    def test_renders_the_same_as_the_stock_renderer(self):
+        data = {
+            "pk": 1,
+            "description": "Netbox <1> down æøå",
+            "start_time": datetime(2011, 11, 11, 11, 11, 11, 111111, tzinfo=dt_timezone.utc),
+            "level": 5,
+            "tags": [{"tag": "a=b"}],
+            "metadata": {"nested": [1, 2.5, None, True]},
+        }
+        self.assertEqual(self.renderer.render(data), JSONRenderer().render(data))
+
+    def test_renders_infinity_datetimes_as_strings(self):
+        data = {"end_time": INFINITY, "start_time": NEGATIVE_INFINITY}
+        self.assertEqual(self.renderer.render(data), b'{"end_time":"infinity","start_time":"-infinity"}')
+
+    def test_renders_lazy_translation_strings(self):
+        self.assertEqual(self.renderer.render({"status": gettext_lazy("Open")}), b'{"status":"Open"}')
+
+    def test_renders_none_as_empty_body(self):
+        self.assertEqual(self.renderer.render(None), b"")
+
+    def test_parses_the_same_as_the_stock_parser(self):
+        body = '{"description": "æøå", "tags": [{"tag": "a=b"}], "level": 5, "end_time": null}'.encode()
+        self.assertEqual(self.parser.parse(BytesIO(body)), JSONParser().parse(BytesIO(body)))
+
+    def test_parse_error_is_raised_for_invalid_json(self):
+        with self.assertRaises(ParseError):
+            self.parser.parse(BytesIO(b'{"description": '))
@@ -0,0 +1,130 @@
+from datetime import timedelta
+from itertools import product
+
+from django.test import TestCase, override_settings, tag
+from django.utils import timezone
+
+from argus.auth.factories import PersonUserFactory
+from argus.filter import get_filter_backend
+from argus.filter.compiled_queryset_filters import CompiledQuerySetFilter
+from argus.filter.factories import FilterFactory
+from argus.filter.queryset_filters import QuerySetFilter
+from argus.incident.factories import (
+    IncidentTagRelationFactory,
+    SourceSystemFactory,
+    SourceUserFactory,
+    StatefulIncidentFactory,
+    StatelessIncidentFactory,
+    TagFactory,
+)
+from argus.incident.models import Incident
+from argus.notificationprofile.factories import NotificationProfileFactory
+from argus.util.testing import connect_signals, disconnect_signals
+
+
+@tag("database", "queryset-filter")
+class CompiledQuerySetFilterEquivalenceTests(TestCase):
+    def setUp(self):
+        disconnect_signals()
+        self.user = PersonUserFactory()
+        self.source1 = SourceSystemFactory(user=SourceUserFactory())
+        self.source2 = SourceSystemFactory(user=SourceUserFactory())
+        self.tags = {
+            "object=1": TagFactory(key="object", value="1"),
+            "object=2": TagFactory(key="object", value="2"),
+            "location=Oslo": TagFactory(key="location", value="Oslo"),
+        }
+        now = timezone.now()
+        incidents = []
+        for source, (level, kind) in product(
+            (self.source1, self.source2), product((1, 3, 5), ("open", "closed", "stateless"))
+        ):
+            if kind == "stateless":
+                incidents.append(StatelessIncidentFactory(source=source, level=level))
+            elif kind == "closed":
+                incidents.append(StatefulIncidentFactory(source=source, level=level, end_time=now - timedelta(hours=1)))
+            else:
+                incidents.append(StatefulIncidentFactory(source=source, level=level))
+        tag_combinations = [(), ("object=1",), ("object=2", "location=Oslo"), ("object=1", "object=2")]
+        for index, incident in enumerate(incidents):
+            for tag_name in tag_combinations[index % len(tag_combinations)]:
+                IncidentTagRelationFactory(tag=self.tags[tag_name], incident=incident, added_by=self.user)
+            if index % 3 == 0:
+                incident.create_ack(self.user)
+            elif index % 3 == 1:
+                incident.create_ack(self.user, expiration=now - timedelta(minutes=5))
+        self.incidents = incidents
+
+    def tearDown(self):
+        connect_signals()
+
+    def get_filterblobs(self):
+        sources = [[], [self.source1.pk], [self.source1.pk, self.source2.pk]]
+        tags = [[], ["object=1"], ["object=1", "object=2"], ["object=2", "location=Oslo"]]
+        tristates = [None, True, False]
+        maxlevels = [None, 3]
+        for source_list, tags_list, open_, acked, stateful, maxlevel in product(
+            sources, tags, tristates, tristates, tristates, maxlevels
+        ):
+            filterblob = {}
+            if source_list:
+                filterblob["sourceSystemIds"] = source_list
+            if tags_list:
+                filterblob["tags"] = tags_list
+            if open_ is not None:
+                filterblob["open"] = open_
+            if acked is not None:
+                filterblob["acked"] = acked
+            if stateful is not None:
+                filterblob["stateful"] = stateful
+            if maxlevel is not None:
+                filterblob["maxlevel"] = maxlevel
+            yield filterblob
+
+    def test_filtered_incidents_gives_same_result_as_default(self):
+        for filterblob in self.get_filterblobs():
+            with self.subTest(filterblob=filterblob):
+                expected = set(QuerySetFilter.filtered_incidents(filterblob))
+                result = set(CompiledQuerySetFilter.filtered_incidents(filterblob))
+                self.assertEqual(result, expected)
+
+    def test_filtered_incidents_respects_given_queryset(self):
+        incident_queryset = Incident.objects.filter(source=self.source2)
+        filterblob = {"tags": ["object=1"]}
+        self.assertEqual(
+            set(CompiledQuerySetFilter.filtered_incidents(filterblob, incident_queryset)),
+            set(QuerySetFilter.filtered_incidents(filterblob, incident_queryset)),
+        )
+
+    def test_incidents_by_notificationprofile_gives_same_result_as_default(self):
+        profile = NotificationProfileFactory(user=self.user)
+        profile.filters.add(
+            FilterFactory(user=self.user, filter={"tags": ["object=1"], "open": True}),
+            FilterFactory(user=self.user, filter={"sourceSystemIds": [self.source2.pk], "maxlevel": 1}),
+            FilterFactory(user=self.user, filter={}),
+        )
+        all_incidents = Incident.objects.all()
+        self.assertEqual(
+            set(CompiledQuerySetFilter.incidents_by_notificationprofile(all_incidents, profile)),
+            set(QuerySetFilter.incidents_by_notificationprofile(all_incidents, profile)),
+        )
+
+    def test_filtered_incidents_is_a_single_query_without_distinct(self):
+        filterblob = {
+            "sourceSystemIds": [self.source1.pk],
+            "tags": ["object=2", "location=Oslo"],
+            "acked": False,
+            "open": True,
+            "maxlevel": 5,
+        }
+        queryset = CompiledQuerySetFilter.filtered_incidents(filterblob)
+        self.assertNotIn("DISTINCT", str(queryset.query))
+        with self.assertNumQueries(1):
+            list(queryset)
+
+    def test_empty_filter_matches_nothing(self):
+        self.assertFalse(CompiledQuerySetFilter.filtered_incidents({}))
+
+    @override_settings(ARGUS_FILTER_BACKEND="argus.filter.compiled")
+    def test_backend_can_be_swapped_in(self):
+        self.assertIs(get_filter_backend().QuerySetFilter, CompiledQuerySetFilter)
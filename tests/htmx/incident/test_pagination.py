@@ -0,0 +1,100 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from argus.htmx.incident.pagination import (
+    InvalidCursor,
+    KeysetPaginator,
+    count_limited,
+    count_total,
+)
+from argus.incident.factories import IncidentFactory, SourceSystemFactory
+from argus.incident.models import Incident
+from argus.util.testing import connect_signals, disconnect_signals
+
+
+class TestKeysetPaginator(TestCase):
+    def setUp(self):
+        disconnect_signals()
+        source = SourceSystemFactory()
+        now = timezone.now()
+        # Two incidents share a start time to check that ties are broken by pk
+        start_times = [now, now - timedelta(minutes=1), now - timedelta(minutes=1), now - timedelta(minutes=2)]
+        for start_time in start_times:
+            IncidentFactory(source=source, start_time=start_time)
+        self.incidents = list(Incident.objects.order_by("-start_time", "-pk"))
+        self.paginator = KeysetPaginator(Incident.objects.all(), per_page=3)
+
+    def tearDown(self):
+        connect_signals()
+
+    def test_first_page_has_the_newest_incidents(self):
+        page = self.paginator.get_page()
+        self.assertEqual(page.object_list, self.incidents[:3])
+        self.assertTrue(page.has_next)
+        self.assertFalse(page.has_previous)
+        self.assertEqual(page.query, "")
+
+    def test_next_page_continues_after_the_last_incident(self):
+        first_page = self.paginator.get_page()
+        page = self.paginator.get_page(after=first_page.next_cursor)
+        self.assertEqual(page.object_list, self.incidents[3:])
+        self.assertFalse(page.has_next)
+        self.assertTrue(page.has_previous)
+
+    def test_previous_page_ends_before_the_first_incident(self):
+        first_page = self.paginator.get_page()
+        last_page = self.paginator.get_page(after=first_page.next_cursor)
+        page = self.paginator.get_page(before=last_page.previous_cursor)
+        self.assertEqual(page.object_list, first_page.object_list)
+        self.assertFalse(page.has_previous)
+        self.assertTrue(page.has_next)
+
+    def test_a_page_is_fetched_with_one_query(self):
+        cursor = self.paginator.get_page().next_cursor
+        with self.assertNumQueries(1):
+            self.paginator.get_page(after=cursor)
+
+    def test_invalid_cursor_is_rejected(self):
+        for cursor in ("garbage", "WzFd", "W3RydWUsIDFd"):
+            with self.assertRaises(InvalidCursor):
+                self.paginator.get_page(after=cursor)
+
+
+class TestCounts(TestCase):
+    def setUp(self):
+        disconnect_signals()
+        source = SourceSystemFactory()
+        for _ in range(3):
+            IncidentFactory(source=source)
+
+    def tearDown(self):
+        connect_signals()
+
+    @override_settings(ARGUS_INCIDENTS_COUNT_LIMIT=2)
+    def test_count_stops_at_limit(self):
+        count = count_limited(Incident.objects.all())
+        self.assertEqual(str(count), "2+")
+
+    @override_settings(ARGUS_INCIDENTS_COUNT_LIMIT=None)
+    def test_count_without_limit_counts_everything(self):
+        count = count_limited(Incident.objects.all())
+        self.assertEqual(str(count), "3")
+
+    @override_settings(ARGUS_INCIDENTS_COUNT_LIMIT=0)
+    def test_count_can_be_turned_off(self):
+        self.assertIsNone(count_limited(Incident.objects.all()))
+
+    @override_settings(ARGUS_INCIDENTS_ESTIMATE_COUNT_ABOVE=1000)
+    def test_total_is_estimated_above_threshold(self):
+        with patch("argus.htmx.incident.pagination.estimate_count", return_value=5000):
+            count = count_total(Incident.objects.all())
+        self.assertEqual(str(count), "~5000")
+
+    @override_settings(ARGUS_INCIDENTS_ESTIMATE_COUNT_ABOVE=1000)
+    def test_total_is_counted_below_threshold(self):
+        with patch("argus.htmx.incident.pagination.estimate_count", return_value=-1):
+            count = count_total(Incident.objects.all())
+        self.assertEqual(str(count), "3")
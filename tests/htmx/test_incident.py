@@ -1,9 +1,13 @@
+from urllib.parse import urlencode
+
 from django import forms, test
 from django.test.client import RequestFactory
 from argus.auth.factories import PersonUserFactory
 from argus.filter.queryset_filters import QuerySetFilter
 from argus.htmx.incident.customization import IncidentTableColumn
 from argus.htmx.incident.views import incident_list
+from argus.incident.constants import AckedStatus, Level, OpenStatus
+from argus.incident.factories import SourceSystemFactory, SourceUserFactory, StatefulIncidentFactory
 
 
 class IncidentRegularFilterForm(forms.Form):
@@ -76,3 +80,34 @@ class TestFilterableColumn(test.TestCase):
 
     def test_doesnt_add_filter_to_filterbox(self):
         self.assertNotContains(self.response, '<span class="label-text">Description</span>')
+
+
+class TestSearch(test.TestCase):
+    def setUp(self):
+        source = SourceSystemFactory(user=SourceUserFactory())
+        StatefulIncidentFactory(source=source, description="Disk full")
+        StatefulIncidentFactory(source=source, description="Link down")
+
+    def get_incident_list(self, path):
+        request = RequestFactory().get(path)
+        request.session = {}
+        request.user = PersonUserFactory()
+        request.htmx = False
+        return incident_list(request)
+
+    def test_shows_search_field(self):
+        response = self.get_incident_list("/incidents")
+        self.assertContains(response, 'name="search"')
+
+    def test_only_lists_matching_incidents(self):
+        # The search field includes the filter box, like every other ".incident-list-param"
+        params = {
+            "open": OpenStatus.BOTH.value,
+            "acked": AckedStatus.BOTH.value,
+            "tags": "",
+            "maxlevel": max(Level).value,
+            "search": "disk",
+        }
+        response = self.get_incident_list(f"/incidents?{urlencode(params)}")
+        self.assertContains(response, "Disk full")
+        self.assertNotContains(response, "Link down")
@@ -9,7 +9,7 @@ from argus.incident.factories import (
     StatefulIncidentFactory,
     StatelessIncidentFactory,
 )
-from argus.incident.models import Event
+from argus.incident.models import Event, Incident
 from argus.incident.factories import SourceSystemFactory, SourceUserFactory
 from argus.util.testing import disconnect_signals, connect_signals
 
@@ -78,6 +78,35 @@ class IncidentAckedTests(TestCase):
         incident = StatefulIncidentFactory(source=source)
         self.assertFalse(incident.acked)
 
+    def test_acked_is_false_after_expiration_of_acknowledgement_is_moved_to_the_past(self):
+        ack = AcknowledgementFactory()
+        ack.expiration = timezone.now() - timedelta(minutes=1)
+        ack.save()
+        self.assertFalse(ack.event.incident.acked)
+
+    def test_acked_is_false_after_acknowledgement_is_deleted(self):
+        ack = AcknowledgementFactory()
+        incident = ack.event.incident
+        ack.delete()
+        incident.refresh_from_db()
+        self.assertFalse(incident.acked)
+
+    def test_acked_is_true_while_any_acknowledgement_is_active(self):
+        ack = AcknowledgementFactory(expiration=timezone.now() + timedelta(days=3))
+        incident = ack.event.incident
+        expired_event = EventFactory(incident=incident, type=Event.Type.ACKNOWLEDGE)
+        AcknowledgementFactory(event=expired_event, expiration=timezone.now() - timedelta(days=1))
+        incident.refresh_from_db()
+        self.assertTrue(incident.acked)
+
+    def test_saving_an_incident_loaded_before_an_ack_keeps_it_acked(self):
+        incident = StatefulIncidentFactory()
+        AcknowledgementFactory(event__incident=Incident.objects.get(pk=incident.pk))
+        incident.description = "changed"
+        incident.save()
+        incident.refresh_from_db()
+        self.assertTrue(incident.acked)
+
 
 class IncidentLevelTests(TestCase):
     def setup(self):
@@ -0,0 +1,105 @@
+import json
+from unittest.mock import patch
+
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from argus.incident.factories import SourceSystemFactory, SourceUserFactory, StatefulIncidentFactory
+from argus.incident.ingest import Ingester
+from argus.incident.models import Event, Incident
+from argus.util.testing import connect_signals, disconnect_signals
+
+
+PATH = "/api/v2/incidents/ingest/"
+
+
+def to_ndjson(*items):
+    return "\n".join(item if isinstance(item, str) else json.dumps(item) for item in items) + "\n"
+
+
+class IngestViewTests(APITestCase):
+    def setUp(self):
+        disconnect_signals()
+        source_user = SourceUserFactory()
+        self.source = SourceSystemFactory(user=source_user)
+        self.client.force_authenticate(user=source_user)
+
+    def tearDown(self):
+        connect_signals()
+
+    def ingest(self, *items):
+        response = self.client.post(PATH, data=to_ndjson(*items), content_type="application/x-ndjson")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        return [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+
+    def incident(self, **kwargs):
+        data = {
+            "start_time": "2021-08-04T09:13:55.908Z",
+            "description": "incident",
+            "level": 2,
+            "tags": [{"tag": "a=b"}],
+        }
+        data.update(kwargs)
+        return {"incident": data}
+
+    def event(self, **kwargs):
+        data = {"timestamp": "2021-08-04T10:13:55.908Z", "type": "END", "description": "end"}
+        data.update(kwargs)
+        return {"event": data}
+
+    def test_creates_incidents_and_posts_events(self):
+        results = self.ingest(self.incident(source_incident_id="42"), self.event(source_incident_id="42"))
+
+        self.assertEqual([result["status"] for result in results], [201, 201])
+        incident = Incident.objects.get(pk=results[0]["incident"])
+        self.assertEqual(incident.source, self.source)
+        self.assertEqual(results[1]["incident"], incident.pk)
+        self.assertEqual(Event.objects.get(pk=results[1]["event"]).type, Event.Type.INCIDENT_END)
+        self.assertFalse(incident.open)
+
+    def test_posts_events_by_pk(self):
+        incident = StatefulIncidentFactory(source=self.source)
+
+        results = self.ingest(self.event(incident=incident.pk, type="OTH"))
+
+        self.assertEqual(results[0]["status"], 201)
+        self.assertEqual(incident.events.get().type, Event.Type.OTHER)
+
+    def test_bad_lines_do_not_stop_the_others(self):
+        results = self.ingest(
+            "not json",
+            {"unknown": {}},
+            self.incident(level=10),
+            self.event(incident=0),
+            "",
+            self.incident(),
+        )
+
+        self.assertEqual([result["line"] for result in results], [1, 2, 3, 4, 6])
+        self.assertEqual([result["status"] for result in results], [400, 400, 400, 404, 201])
+        self.assertIn("level", results[2]["errors"])
+        self.assertEqual(Incident.objects.count(), 1)
+
+    def test_existing_incident_is_not_created_again(self):
+        incident = StatefulIncidentFactory(source=self.source, source_incident_id="42")
+
+        results = self.ingest(self.incident(source_incident_id="42"))
+
+        self.assertEqual(results[0]["status"], 200)
+        self.assertEqual(results[0]["incident"], incident.pk)
+        self.assertEqual(Incident.objects.count(), 1)
+
+    @override_settings(INGEST_CHUNK_SIZE=2)
+    def test_lines_are_applied_in_chunks(self):
+        with patch.object(Ingester, "apply_chunk", autospec=True, side_effect=Ingester.apply_chunk) as apply_chunk:
+            results = self.ingest(*(self.incident() for _ in range(5)))
+
+        self.assertEqual(apply_chunk.call_count, 3)
+        self.assertEqual([result["line"] for result in results], [1, 2, 3, 4, 5])
+        self.assertEqual(Incident.objects.count(), 5)
+
+    def test_wrong_content_type_is_rejected(self):
+        response = self.client.post(PATH, data=self.incident(), format="json")
+        self.assertEqual(response.status_code, status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
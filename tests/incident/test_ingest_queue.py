@@ -0,0 +1,123 @@
+from datetime import timedelta
+
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from argus.auth.factories import SourceUserFactory
+from argus.incident.factories import SourceSystemFactory, StatefulIncidentFactory
+from argus.incident.ingest_queue import delete_processed, process_batch
+from argus.incident.models import Event, Incident, IngestQueueItem
+from argus.util.testing import connect_signals, disconnect_signals
+
+
+API_PATH = "/api/v2/incidents"
+PREFER_ASYNC = {"HTTP_PREFER": "respond-async"}
+
+
+@override_settings(INGEST_QUEUE=True)
+class IngestQueueTests(APITestCase):
+    def setUp(self):
+        disconnect_signals()
+        source_user = SourceUserFactory()
+        self.source = SourceSystemFactory(user=source_user)
+        self.client.force_authenticate(user=source_user)
+
+    def tearDown(self):
+        connect_signals()
+
+    def incident_data(self, **kwargs):
+        data = {
+            "start_time": "2021-08-04T09:13:55.908Z",
+            "description": "incident",
+            "level": 2,
+            "tags": [{"tag": "a=b"}],
+        }
+        data.update(kwargs)
+        return data
+
+    def event_data(self, **kwargs):
+        data = {"timestamp": "2021-08-04T10:13:55.908Z", "type": "OTH", "description": "event"}
+        data.update(kwargs)
+        return data
+
+    def test_incident_is_queued_and_created_later(self):
+        response = self.client.post(f"{API_PATH}/", data=self.incident_data(), format="json", **PREFER_ASYNC)
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response["Location"], response.data["url"])
+        self.assertEqual(response.data["status"], "pending")
+        self.assertFalse(Incident.objects.exists())
+
+        self.assertEqual(process_batch(), 1)
+
+        incident = Incident.objects.get()
+        self.assertEqual(incident.source, self.source)
+        self.assertEqual(incident.events.get().type, Event.Type.INCIDENT_START)
+        response = self.client.get(f"{API_PATH}/queue/{response.data['pk']}/")
+        self.assertEqual(response.data["status"], "processed")
+        self.assertEqual(response.data["result"], {"status": 201, "incident": incident.pk, "errors": None})
+
+    def test_invalid_incident_is_not_queued(self):
+        response = self.client.post(f"{API_PATH}/", data=self.incident_data(level=10), format="json", **PREFER_ASYNC)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(IngestQueueItem.objects.exists())
+
+    @override_settings(INGEST_QUEUE=False)
+    def test_preference_is_ignored_without_queue(self):
+        response = self.client.post(f"{API_PATH}/", data=self.incident_data(), format="json", **PREFER_ASYNC)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(IngestQueueItem.objects.exists())
+
+    def test_events_to_the_same_incident_are_applied_in_order(self):
+        incident = StatefulIncidentFactory(source=self.source)
+        path = f"{API_PATH}/{incident.pk}/events/"
+        self.client.post(path, data=self.event_data(), format="json", **PREFER_ASYNC)
+        self.client.post(path, data=self.event_data(type="END"), format="json", **PREFER_ASYNC)
+
+        self.assertEqual(process_batch(), 2)
+
+        self.assertEqual(list(incident.events.order_by("pk").values_list("type", flat=True)), ["OTH", "END"])
+        incident.refresh_from_db()
+        self.assertFalse(incident.open)
+        results = IngestQueueItem.objects.values_list("result__status", flat=True)
+        self.assertEqual(list(results), [201, 201])
+
+    def test_event_that_is_invalid_for_the_incident_is_only_recorded(self):
+        incident = StatefulIncidentFactory(source=self.source)
+        path = f"{API_PATH}/{incident.pk}/events/"
+        self.client.post(path, data=self.event_data(type="STA"), format="json", **PREFER_ASYNC)
+        incident.create_first_event()
+
+        process_batch()
+
+        # Source systems may post any event, only the incident is left as it is
+        self.assertEqual(incident.events.filter(type="STA").count(), 2)
+        self.assertEqual(IngestQueueItem.objects.get().result["status"], 201)
+
+    def test_events_to_missing_incident_are_not_queued(self):
+        response = self.client.post(f"{API_PATH}/0/events/", data=self.event_data(), format="json", **PREFER_ASYNC)
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_other_users_cannot_see_queued_items(self):
+        response = self.client.post(f"{API_PATH}/", data=self.incident_data(), format="json", **PREFER_ASYNC)
+        self.client.force_authenticate(user=SourceUserFactory())
+
+        response = self.client.get(f"{API_PATH}/queue/{response.data['pk']}/")
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_old_results_are_deleted(self):
+        self.client.post(f"{API_PATH}/", data=self.incident_data(), format="json", **PREFER_ASYNC)
+        self.client.post(f"{API_PATH}/", data=self.incident_data(), format="json", **PREFER_ASYNC)
+        process_batch()
+        IngestQueueItem.objects.filter(pk=IngestQueueItem.objects.first().pk).update(
+            processed=timezone.now() - timedelta(days=2)
+        )
+
+        self.assertEqual(delete_processed(), 1)
+        self.assertEqual(IngestQueueItem.objects.count(), 1)
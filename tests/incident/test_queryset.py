@@ -4,12 +4,14 @@ from django.utils import timezone
 from argus.auth.factories import PersonUserFactory
 from argus.util.testing import disconnect_signals, connect_signals
 from argus.incident.factories import (
+    IncidentTagRelationFactory,
     SourceSystemFactory,
     SourceUserFactory,
     StatefulIncidentFactory,
     StatelessIncidentFactory,
+    TagFactory,
 )
-from argus.incident.models import Incident, Event
+from argus.incident.models import Incident, IncidentTagRelation, Event
 
 
 class IncidentQuerySetTestCase(TestCase):
@@ -124,3 +126,112 @@ class IncidentQuerySetUpdatingTestCase(TestCase):
         qs.reopen(self.user, description="Bar")
         result = set(e.incident for e in Event.objects.filter(type=Event.Type.REOPEN, description="Bar"))
         self.assertEqual(result, set(qs.all()))
+
+
+class IncidentTagIndexTestCase(TestCase):
+    def setUp(self):
+        disconnect_signals()
+        self.user = PersonUserFactory()
+        source = SourceSystemFactory(user=SourceUserFactory())
+        self.incident1 = StatefulIncidentFactory(source=source)
+        self.incident2 = StatefulIncidentFactory(source=source)
+        self.incident3 = StatefulIncidentFactory(source=source)
+        self.object1 = TagFactory(key="object", value="1")
+        self.object2 = TagFactory(key="object", value="2")
+        self.oslo = TagFactory(key="location", value="Oslo")
+        self.tag(self.incident1, self.object1, self.oslo)
+        self.tag(self.incident2, self.object2, self.oslo)
+        self.tag(self.incident3, self.object1)
+
+    def tearDown(self):
+        connect_signals()
+
+    def tag(self, incident, *tags):
+        for tag_ in tags:
+            IncidentTagRelationFactory(incident=incident, tag=tag_, added_by=self.user)
+
+    def test_tag_index_is_updated_when_tags_are_added(self):
+        self.incident1.refresh_from_db()
+        self.assertEqual(self.incident1.tag_index, ["location=Oslo", "object=1"])
+
+    def test_tag_index_is_updated_when_tags_are_removed(self):
+        IncidentTagRelation.objects.filter(incident=self.incident1, tag=self.oslo).delete()
+        self.incident1.refresh_from_db()
+        self.assertEqual(self.incident1.tag_index, ["object=1"])
+
+    def test_tag_index_is_updated_when_a_tag_is_changed(self):
+        self.oslo.value = "Bergen"
+        self.oslo.save()
+        self.incident2.refresh_from_db()
+        self.assertEqual(self.incident2.tag_index, ["location=Bergen", "object=2"])
+
+    def test_saving_a_stale_incident_keeps_the_tag_index(self):
+        # self.incident1 was loaded before it was tagged
+        self.incident1.description = "changed"
+        self.incident1.save()
+        self.incident1.refresh_from_db()
+        self.assertEqual(self.incident1.description, "changed")
+        self.assertEqual(self.incident1.tag_index, ["location=Oslo", "object=1"])
+
+    def test_from_tags_matches_all_keys(self):
+        result = Incident.objects.from_tags("object=1", "location=Oslo")
+        self.assertEqual(result.get(), self.incident1)
+
+    def test_from_tags_matches_any_value_of_the_same_key(self):
+        result = Incident.objects.from_tags("object=1", "object=2")
+        self.assertEqual(set(result), {self.incident1, self.incident2, self.incident3})
+        result = Incident.objects.from_tags("object=1", "object=2", "location=Oslo")
+        self.assertEqual(set(result), {self.incident1, self.incident2})
+
+    def test_from_tags_does_not_join_tags(self):
+        query = str(Incident.objects.from_tags("object=1", "object=2", "location=Oslo").query)
+        self.assertNotIn("JOIN", query)
+        self.assertNotIn("DISTINCT", query)
+
+
+class IncidentSearchTestCase(TestCase):
+    def setUp(self):
+        disconnect_signals()
+        self.user = PersonUserFactory()
+        source = SourceSystemFactory(user=SourceUserFactory())
+        self.disk = StatefulIncidentFactory(source=source, description="Disk full on sw1.example.org")
+        self.link = StatefulIncidentFactory(source=source, description="Link down")
+        self.quiet = StatefulIncidentFactory(source=source, description="Nothing to see")
+        self.link.create_ack(self.user, description="disk replaced, it's fine")
+
+    def tearDown(self):
+        connect_signals()
+
+    def test_search_matches_incident_description(self):
+        result = Incident.objects.search("link")
+        self.assertEqual(result.get(), self.link)
+
+    def test_search_matches_event_description(self):
+        result = Incident.objects.search("replaced")
+        self.assertEqual(result.get(), self.link)
+
+    def test_search_matches_start_of_words(self):
+        result = Incident.objects.search("dis")
+        self.assertEqual(set(result), {self.disk, self.link})
+
+    def test_search_needs_every_term(self):
+        result = Incident.objects.search("disk", "down")
+        self.assertEqual(result.get(), self.link)
+
+    def test_search_matches_host_names(self):
+        result = Incident.objects.search("sw1.example.org")
+        self.assertEqual(result.get(), self.disk)
+
+    def test_search_ranks_incident_and_event_matches_higher(self):
+        self.disk.create_ack(self.user, description="disk disk disk")
+        result = Incident.objects.search("disk").order_by("-search_rank")
+        self.assertEqual(list(result), [self.disk, self.link])
+
+    def test_search_is_not_confused_by_query_syntax(self):
+        self.assertFalse(Incident.objects.search("what's|up"))
+        result = Incident.objects.search("full!")
+        self.assertEqual(result.get(), self.disk)
+
+    def test_search_without_words_does_not_filter(self):
+        result = Incident.objects.search(" ", "&")
+        self.assertEqual(result.count(), 3)
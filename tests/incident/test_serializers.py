@@ -8,15 +8,21 @@ from rest_framework import serializers
 
 from argus.auth.factories import PersonUserFactory
 from argus.incident.factories import (
+    EventFactory,
     IncidentTagRelationFactory,
     SourceSystemFactory,
     SourceUserFactory,
     StatefulIncidentFactory,
+    StatelessIncidentFactory,
+    TagFactory,
 )
+from argus.incident.models import Event, Incident
 from argus.incident.serializers import (
     EventSerializer,
+    EventValuesSerializer,
     IncidentPureDeserializer,
     IncidentSerializer,
+    IncidentValuesSerializer,
     IncidentTagRelationSerializer,
     RequestAcknowledgementSerializer,
     TagSerializer,
@@ -350,3 +356,41 @@ class EventSerializerTests(TestCase):
         serializer = EventSerializer(data=data, context={"request": request})
         self.assertTrue(serializer.is_valid())
         self.assertTrue(serializer.validated_data["timestamp"])
+
+
+class ValuesSerializerTests(TestCase):
+    def setUp(self):
+        disconnect_signals()
+        self.user = PersonUserFactory()
+        source_user = SourceUserFactory()
+        self.source = SourceSystemFactory(user=source_user, base_url="https://example.org/")
+
+    def tearDown(self):
+        connect_signals()
+
+    def test_incident_values_serializer_gives_the_same_result_as_incident_serializer(self):
+        open_incident = StatefulIncidentFactory(source=self.source, details_url="incidents/1", metadata={"a": [1]})
+        IncidentTagRelationFactory(incident=open_incident, tag=TagFactory(key="a", value="b"), added_by=self.user)
+        open_incident.create_ack(self.user)
+        closed_incident = StatefulIncidentFactory(source=self.source, end_time=timezone.now())
+        stateless_incident = StatelessIncidentFactory(source=self.source, details_url="https://example.com/1")
+        incidents = Incident.objects.filter(pk__in=[open_incident.pk, closed_incident.pk, stateless_incident.pk])
+
+        expected = [IncidentSerializer(incident).data for incident in incidents]
+        result = IncidentValuesSerializer(IncidentValuesSerializer.get_values(incidents)).data
+
+        self.assertEqual(result, expected)
+        self.assertEqual([list(incident) for incident in result], [list(incident) for incident in expected])
+
+    def test_event_values_serializer_gives_the_same_result_as_event_serializer(self):
+        incident = StatefulIncidentFactory(source=self.source)
+        incident.create_first_event()
+        incident.create_ack(self.user, description="Ack")
+        EventFactory(incident=incident, type=Event.Type.OTHER)
+        events = incident.events.all()
+
+        expected = [EventSerializer(event).data for event in events]
+        result = EventValuesSerializer(EventValuesSerializer.get_values(events)).data
+
+        self.assertEqual(result, expected)
+        self.assertEqual([list(event) for event in result], [list(event) for event in expected])
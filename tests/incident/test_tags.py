@@ -0,0 +1,81 @@
+from django.test import TestCase, override_settings
+
+from argus.incident.factories import TagFactory
+from argus.incident.models import Tag
+from argus.incident.tags import _cache, forget_all_tags, resolve_tag_ids
+
+
+class ResolveTagIdsTests(TestCase):
+    def setUp(self):
+        forget_all_tags()
+
+    def tearDown(self):
+        forget_all_tags()
+
+    def test_creates_missing_tags(self):
+        tag_ids = resolve_tag_ids([("a", "1"), ("b", "2")])
+        self.assertEqual(set(tag_ids), {("a", "1"), ("b", "2")})
+        for (key, value), tag_id in tag_ids.items():
+            self.assertEqual(Tag.objects.get(pk=tag_id).representation, Tag.join(key, value))
+
+    def test_reuses_existing_tags(self):
+        tag = TagFactory(key="a", value="1")
+        tag_ids = resolve_tag_ids([("a", "1"), ("b", "2")])
+        self.assertEqual(tag_ids[("a", "1")], tag.pk)
+        self.assertEqual(Tag.objects.count(), 2)
+
+    def test_resolves_with_one_query_regardless_of_number_of_tags(self):
+        TagFactory(key="a", value="1")
+        with self.assertNumQueries(1):
+            resolve_tag_ids([("a", "1")] + [("b", str(i)) for i in range(20)])
+
+    def test_known_tags_need_no_queries(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            tag_ids = resolve_tag_ids([("a", "1")])
+        with self.assertNumQueries(0):
+            self.assertEqual(resolve_tag_ids([("a", "1")]), tag_ids)
+
+    def test_tags_are_not_cached_before_commit(self):
+        with self.captureOnCommitCallbacks(execute=False):
+            resolve_tag_ids([("a", "1")])
+        self.assertEqual(len(_cache), 0)
+
+    def test_deleted_tag_is_forgotten(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            tag_id = resolve_tag_ids([("a", "1")])[("a", "1")]
+        Tag.objects.get(pk=tag_id).delete()
+        new_tag_id = resolve_tag_ids([("a", "1")])[("a", "1")]
+        self.assertNotEqual(new_tag_id, tag_id)
+        self.assertTrue(Tag.objects.filter(pk=new_tag_id).exists())
+
+    def test_changed_tag_is_forgotten(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            tag_id = resolve_tag_ids([("a", "1")])[("a", "1")]
+        tag = Tag.objects.get(pk=tag_id)
+        tag.value = "2"
+        tag.save()
+        self.assertEqual(resolve_tag_ids([("a", "2")])[("a", "2")], tag_id)
+        self.assertNotEqual(resolve_tag_ids([("a", "1")])[("a", "1")], tag_id)
+
+    @override_settings(TAG_ID_CACHE_SIZE=2)
+    def test_cache_forgets_least_recently_used_tags(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            resolve_tag_ids([("a", "1"), ("a", "2")])
+        resolve_tag_ids([("a", "1")])
+        with self.captureOnCommitCallbacks(execute=True):
+            resolve_tag_ids([("a", "3")])
+        self.assertEqual(len(_cache), 2)
+        self.assertEqual(set(_cache.get_many([("a", "1"), ("a", "2"), ("a", "3")])), {("a", "1"), ("a", "3")})
+
+    @override_settings(TAG_ID_CACHE_MAX_AGE=0)
+    def test_old_tags_are_forgotten(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            resolve_tag_ids([("a", "1")])
+        with self.assertNumQueries(1):
+            resolve_tag_ids([("a", "1")])
+
+    @override_settings(TAG_ID_CACHE_SIZE=0)
+    def test_cache_can_be_turned_off(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            resolve_tag_ids([("a", "1")])
+        self.assertEqual(len(_cache), 0)
@@ -1,5 +1,7 @@
 import datetime
 
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils.timezone import now
 from django.test import TestCase, RequestFactory, override_settings, tag
@@ -204,6 +206,107 @@ class IncidentViewSetTestCase(APITestCase):
     def add_acknowledgement_with_incident_and_event(self):
         return AcknowledgementFactory()
 
+    def test_listing_incidents_uses_the_same_number_of_queries_regardless_of_history(self):
+        self.add_open_incident_with_start_event_and_tag()
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(path=API_PATH + "/")
+        for _ in range(5):
+            incident = self.add_open_incident_with_start_event_and_tag()
+            incident.create_ack(self.user)
+            EventFactory.create_batch(3, incident=incident)
+
+        with self.assertNumQueries(len(queries)):
+            response = self.client.get(path=API_PATH + "/")
+        self.assertEqual(len(response.data["results"]), 6)
+
+    def test_can_get_only_some_fields_of_incidents(self):
+        incident = self.add_open_incident_with_start_event_and_tag()
+
+        response = self.client.get(path=API_PATH + "/?fields=pk,level,description,open")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data["results"],
+            [{"pk": incident.pk, "level": incident.level, "description": incident.description, "open": True}],
+        )
+
+    def test_cannot_get_unknown_fields_of_incidents(self):
+        response = self.client.get(path=API_PATH + "/?fields=pk,nonsense")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_can_expand_events_and_acks_of_incidents(self):
+        incident = self.add_open_incident_with_start_event_and_tag()
+        ack = incident.create_ack(self.user)
+
+        response = self.client.get(path=API_PATH + "/?fields=pk&expand=events,acks")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        result = response.data["results"][0]
+        event_pks = set(incident.events.values_list("pk", flat=True))
+        self.assertEqual({event["pk"] for event in result["events"]}, event_pks)
+        self.assertEqual([ack_["pk"] for ack_ in result["acks"]], [ack.pk])
+        self.assertEqual(result["acks"][0]["event"]["type"]["value"], Event.Type.ACKNOWLEDGE)
+
+    def test_expanding_incidents_uses_the_same_number_of_queries_regardless_of_history(self):
+        self.add_open_incident_with_start_event_and_tag()
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(path=API_PATH + "/?expand=events,acks")
+        for _ in range(5):
+            incident = self.add_open_incident_with_start_event_and_tag()
+            incident.create_ack(self.user)
+
+        with self.assertNumQueries(len(queries)):
+            self.client.get(path=API_PATH + "/?expand=events,acks")
+
+    def test_get_incidents_again_without_changes_returns_not_modified(self):
+        self.add_open_incident_with_start_event_and_tag()
+        response = self.client.get(path=API_PATH + "/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        with self.assertNumQueries(3):
+            response = self.client.get(path=API_PATH + "/", HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_get_incidents_again_after_new_event_returns_incidents(self):
+        incident = self.add_open_incident_with_start_event_and_tag()
+        etag = self.client.get(path=API_PATH + "/")["ETag"]
+        self.add_event(incident.pk)
+
+        response = self.client.get(path=API_PATH + "/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+    @override_settings(INDELIBLE_INCIDENTS=False)
+    def test_get_deleted_incident_again_returns_not_found(self):
+        incident = self.add_open_incident_with_start_event_and_tag()
+        # Has the newest event and tag, so deleting the other changes no marker
+        self.add_open_incident_with_start_event_and_tag()
+        incident_path = reverse("v2:incident:incident-detail", args=[incident.pk])
+        event_path = f"{API_PATH}/{incident.pk}/events/{incident.start_event.pk}/"
+        incident_etag = self.client.get(path=incident_path)["ETag"]
+        event_etag = self.client.get(path=event_path)["ETag"]
+        self.client.delete(path=incident_path)
+
+        response = self.client.get(path=incident_path, HTTP_IF_NONE_MATCH=incident_etag)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.get(path=event_path, HTTP_IF_NONE_MATCH=event_etag)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_get_incident_again_without_changes_returns_not_modified(self):
+        incident = self.add_open_incident_with_start_event_and_tag()
+        incident_path = reverse("v2:incident:incident-detail", args=[incident.pk])
+        etag = self.client.get(path=incident_path)["ETag"]
+
+        response = self.client.get(path=incident_path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_different_filters_do_not_share_etag(self):
+        self.add_open_incident_with_start_event_and_tag()
+        etag = self.client.get(path=API_PATH + "/?open=true")["ETag"]
+
+        response = self.client.get(path=API_PATH + "/?open=false", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
     def test_can_get_all_incidents(self):
         self.add_open_incident_with_start_event_and_tag()
         incident_pks = list(Incident.objects.all().values_list("pk", flat=True))
@@ -337,6 +440,25 @@ class IncidentViewSetTestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(Incident.objects.get(pk=incident_pk).description, "new description")
 
+    def test_updating_incident_tags_updates_tag_index(self):
+        incident = self.add_open_incident_with_start_event_and_tag()
+        incident_path = reverse("v2:incident:incident-detail", args=[incident.pk])
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.patch(
+            path=incident_path,
+            data={
+                "tags": [{"tag": "c=d"}],
+                "description": "new description",
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        changed_incident = Incident.objects.get(pk=incident.pk)
+        self.assertEqual(changed_incident.tag_index, ["c=d"])
+        self.assertEqual(changed_incident.description, "new description")
+        self.assertEqual(list(Incident.objects.from_tags("c=d")), [incident])
+        self.assertFalse(Incident.objects.from_tags("a=b").exists())
+
     def test_can_get_all_acknowledgements_of_incident(self):
         ack = self.add_acknowledgement_with_incident_and_event()
         incident = ack.event.incident
@@ -1077,3 +1199,161 @@ class BulkTicketUrlViewSetTestCase(APITestCase):
 
         incident_1.refresh_from_db()
         self.assertEqual(incident_1.ticket_url, data["ticket_url"])
+
+
+class BulkIncidentViewSetTestCase(APITestCase):
+    def setUp(self):
+        disconnect_signals()
+        source_user = SourceUserFactory()
+        self.source = SourceSystemFactory(user=source_user)
+        self.client.force_authenticate(user=source_user)
+
+    def tearDown(self):
+        connect_signals()
+
+    def incident_data(self, **kwargs):
+        data = {
+            "start_time": "2021-08-04T09:13:55.908Z",
+            "description": "incident",
+            "level": 2,
+            "tags": [{"tag": "a=b"}, {"tag": "c=d"}],
+        }
+        data.update(kwargs)
+        return data
+
+    def test_can_bulk_create_incidents(self):
+        data = {"incidents": [self.incident_data(source_incident_id="1"), self.incident_data(end_time=None)]}
+
+        response = self.client.post(path=f"{API_PATH}/bulk/", data=data, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        stateful_changes = response.data["changes"]["0"]
+        self.assertEqual(stateful_changes["status"], status.HTTP_201_CREATED)
+        self.assertEqual(stateful_changes["errors"], None)
+        self.assertEqual(stateful_changes["incident"]["source_incident_id"], "1")
+        self.assertEqual(stateful_changes["incident"]["source"]["pk"], self.source.pk)
+        self.assertEqual({tag["tag"] for tag in stateful_changes["incident"]["tags"]}, {"a=b", "c=d"})
+
+        stateful = Incident.objects.get(pk=stateful_changes["incident"]["pk"])
+        self.assertEqual(stateful.tag_index, ["a=b", "c=d"])
+        self.assertEqual(stateful.events.get().type, Event.Type.INCIDENT_START)
+        stateless = Incident.objects.get(pk=response.data["changes"]["1"]["incident"]["pk"])
+        self.assertEqual(stateless.events.get().type, Event.Type.STATELESS)
+
+    def test_bulk_create_reuses_existing_tags(self):
+        tag = TagFactory(key="a", value="b")
+        data = {"incidents": [self.incident_data(), self.incident_data()]}
+
+        self.client.post(path=f"{API_PATH}/bulk/", data=data, format="json")
+
+        self.assertEqual(Tag.objects.filter(key="a").get(), tag)
+        self.assertEqual(IncidentTagRelation.objects.filter(tag=tag).count(), 2)
+
+    def test_can_partially_bulk_create_incidents(self):
+        StatefulIncidentFactory(source=self.source, source_incident_id="old")
+        data = {
+            "incidents": [
+                self.incident_data(source_incident_id="new"),
+                self.incident_data(level=None),
+                self.incident_data(source_incident_id="old"),
+                self.incident_data(source_incident_id="new"),
+            ]
+        }
+
+        response = self.client.post(path=f"{API_PATH}/bulk/", data=data, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        changes = response.data["changes"]
+        self.assertEqual(changes["0"]["status"], status.HTTP_201_CREATED)
+        for index in ("1", "2", "3"):
+            self.assertEqual(changes[index]["status"], status.HTTP_400_BAD_REQUEST)
+            self.assertEqual(changes[index]["incident"], None)
+            self.assertTrue(changes[index]["errors"])
+        self.assertEqual(Incident.objects.filter(source_incident_id="new").count(), 1)
+
+    def test_cannot_bulk_create_only_invalid_incidents(self):
+        data = {"incidents": [self.incident_data(start_time=None)]}
+
+        response = self.client.post(path=f"{API_PATH}/bulk/", data=data, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Incident.objects.exists())
+
+    def test_bulk_create_runs_the_same_number_of_queries_for_more_incidents(self):
+        data = {"incidents": [self.incident_data(description=str(i)) for i in range(2)]}
+        with CaptureQueriesContext(connection) as few:
+            self.client.post(path=f"{API_PATH}/bulk/", data=data, format="json")
+
+        data = {"incidents": [self.incident_data(description=str(i)) for i in range(20)]}
+        with self.assertNumQueries(len(few.captured_queries)):
+            self.client.post(path=f"{API_PATH}/bulk/", data=data, format="json")
+
+
+class IncidentUpsertTestCase(APITestCase):
+    def setUp(self):
+        disconnect_signals()
+        source_user = SourceUserFactory()
+        self.source = SourceSystemFactory(user=source_user)
+        self.client.force_authenticate(user=source_user)
+        self.path = f"{API_PATH}/mine/42/"
+
+    def tearDown(self):
+        connect_signals()
+
+    def incident_data(self, **kwargs):
+        data = {
+            "start_time": "2021-08-04T09:13:55.908Z",
+            "description": "incident",
+            "level": 2,
+            "tags": [{"tag": "a=b"}],
+        }
+        data.update(kwargs)
+        return data
+
+    def test_creates_missing_incident(self):
+        response = self.client.put(path=self.path, data=self.incident_data(), format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(response.data["open"])
+        incident = Incident.objects.get(pk=response.data["pk"])
+        self.assertEqual(incident.source, self.source)
+        self.assertEqual(incident.source_incident_id, "42")
+        self.assertEqual(incident.tag_index, ["a=b"])
+        self.assertEqual(incident.events.get().type, Event.Type.INCIDENT_START)
+
+    def test_repeated_request_returns_existing_incident(self):
+        first = self.client.put(path=self.path, data=self.incident_data(), format="json")
+        response = self.client.put(path=self.path, data=self.incident_data(), format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["pk"], first.data["pk"])
+        incident = Incident.objects.get(source=self.source)
+        self.assertEqual(incident.events.count(), 1)
+
+    def test_changes_existing_incident(self):
+        incident = StatefulIncidentFactory(source=self.source, source_incident_id="42", level=2, description="incident")
+
+        response = self.client.put(
+            path=self.path, data=self.incident_data(level=1, tags=[{"tag": "c=d"}]), format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["pk"], incident.pk)
+        incident.refresh_from_db()
+        self.assertEqual(incident.level, 1)
+        self.assertEqual(incident.tag_index, ["c=d"])
+        self.assertEqual(incident.events.filter(type=Event.Type.INCIDENT_CHANGE).count(), 2)
+
+    def test_source_incident_id_in_path_overrides_body(self):
+        response = self.client.put(path=self.path, data=self.incident_data(source_incident_id="7"), format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["source_incident_id"], "42")
+
+    def test_same_source_incident_id_of_other_source_is_another_incident(self):
+        other = StatefulIncidentFactory(source=SourceSystemFactory(), source_incident_id="42")
+
+        response = self.client.put(path=self.path, data=self.incident_data(), format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertNotEqual(response.data["pk"], other.pk)
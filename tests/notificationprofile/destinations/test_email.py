@@ -1,9 +1,14 @@
+from unittest.mock import patch
+
+from django.core import mail
 from django.test import TestCase, tag
 from rest_framework import status
 from rest_framework.test import APIClient, APIRequestFactory, APITestCase
 
 from argus.auth.factories import PersonUserFactory
+from argus.incident.factories import EventFactory
 from argus.notificationprofile.factories import DestinationConfigFactory, NotificationProfileFactory, TimeslotFactory
+from argus.notificationprofile.media import send_notification
 from argus.notificationprofile.media.email import EmailNotification
 from argus.notificationprofile.models import DestinationConfig, Media
 from argus.notificationprofile.serializers import RequestDestinationConfigSerializer
@@ -405,3 +410,25 @@ class EmailDestinationSendTests(TestCase):
 
         self.assertIn(email_address, email_addresses)
         self.assertNotIn(phone_number, email_addresses)
+
+    def test_send_notification_uses_one_connection_for_all_emails(self):
+        destinations = [PersonUserFactory().destinations.get() for _ in range(3)]
+        events = EventFactory.create_batch(2)
+        with patch("argus.notificationprofile.media.email.get_connection", wraps=mail.get_connection) as get_connection:
+            send_notification(destinations, *events)
+        get_connection.assert_called_once()
+        self.assertEqual(len(mail.outbox), 6)
+
+    def test_send_reports_success_if_only_some_addresses_failed(self):
+        destinations = [PersonUserFactory().destinations.get() for _ in range(2)]
+        event = EventFactory()
+        with patch.object(mail.EmailMultiAlternatives, "send", side_effect=[1, ConnectionRefusedError]):
+            with self.assertLogs("argus.notificationprofile.media.email", level="WARNING"):
+                self.assertTrue(EmailNotification.send(event, destinations))
+
+    def test_send_reports_failure_if_all_addresses_failed(self):
+        destinations = [PersonUserFactory().destinations.get() for _ in range(2)]
+        event = EventFactory()
+        with patch.object(mail.EmailMultiAlternatives, "send", side_effect=ConnectionRefusedError):
+            with self.assertLogs("argus.notificationprofile.media.email", level="ERROR"):
+                self.assertFalse(EmailNotification.send(event, destinations))
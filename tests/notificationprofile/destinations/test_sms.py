@@ -1,8 +1,10 @@
-from django.test import TestCase, tag
+from django.core import mail
+from django.test import TestCase, override_settings, tag
 from rest_framework import status
 from rest_framework.test import APIClient, APIRequestFactory, APITestCase
 
 from argus.auth.factories import PersonUserFactory
+from argus.incident.factories import EventFactory
 from argus.notificationprofile.factories import DestinationConfigFactory, NotificationProfileFactory
 from argus.notificationprofile.media.sms_as_email import SMSNotification
 from argus.notificationprofile.models import DestinationConfig, Media
@@ -354,3 +356,15 @@ class SMSDestinationSendTests(TestCase):
 
         self.assertIn(phone_number, phone_numbers)
         self.assertNotIn(email_address, phone_numbers)
+
+    @override_settings(SMS_GATEWAY_ADDRESS="sms@example.com")
+    def test_send_digest_sends_one_sms_about_all_events(self):
+        sms_destination = DestinationConfigFactory(
+            user=self.user1,
+            media=Media.objects.get_or_create(slug="sms")[0],
+            settings={"phone_number": "+4747474747"},
+        )
+        events = EventFactory.create_batch(3)
+        self.assertTrue(SMSNotification.send_digest(events, [sms_destination]))
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertTrue(mail.outbox[0].body.startswith("3 events:"))
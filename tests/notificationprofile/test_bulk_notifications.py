@@ -0,0 +1,72 @@
+from django.core import mail
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from argus.auth.factories import PersonUserFactory
+from argus.filter.factories import FilterFactory
+from argus.incident.factories import SourceSystemFactory, SourceUserFactory, StatefulIncidentFactory
+from argus.incident.models import Event, Incident
+from argus.notificationprofile import factories
+from argus.notificationprofile.media import bulk_send_notifications_to_users
+from argus.notificationprofile.models import OutboxNotification
+from argus.util.testing import connect_signals, disconnect_signals
+
+
+@override_settings(SEND_NOTIFICATIONS=True, NOTIFICATION_WORKERS=0)
+class BulkSendNotificationsTests(TestCase):
+    def setUp(self):
+        disconnect_signals()
+        self.source = SourceSystemFactory(user=SourceUserFactory())
+        self.incidents = StatefulIncidentFactory.create_batch(3, source=self.source)
+        self.user = PersonUserFactory()
+        self.destination = self.user.destinations.get()  # default email
+        timeslot = factories.TimeslotFactory(user=self.user)
+        factories.MaximalTimeRecurrenceFactory(timeslot=timeslot)
+        profile = factories.NotificationProfileFactory(user=self.user, timeslot=timeslot, active=True)
+        profile.filters.add(FilterFactory(user=self.user, filter={"sourceSystemIds": [self.source.id]}))
+        profile.destinations.add(self.destination)
+
+    def tearDown(self):
+        connect_signals()
+
+    def create_acks(self):
+        qs = Incident.objects.filter(pk__in=[incident.pk for incident in self.incidents])
+        return [ack.event for ack in qs.create_acks(self.user)]
+
+    def test_each_destination_gets_a_single_digest(self):
+        other_user = PersonUserFactory()
+        other_destination = other_user.destinations.get()
+        self.user.notification_profiles.get().destinations.add(other_destination)
+
+        bulk_send_notifications_to_users(self.create_acks())
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertTrue(all("3 events" in message.subject for message in mail.outbox))
+
+    def test_single_event_is_sent_as_usual(self):
+        event = self.create_acks()[0]
+        bulk_send_notifications_to_users([event])
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertTrue(mail.outbox[0].subject.endswith(str(event)))
+
+    @override_settings(SEND_NOTIFICATIONS=False)
+    def test_nothing_is_sent_when_notifications_are_turned_off(self):
+        bulk_send_notifications_to_users(self.create_acks())
+        self.assertFalse(mail.outbox)
+
+    @override_settings(NOTIFICATION_OUTBOX=True)
+    def test_outbox_gets_digest_notifications_that_are_due_now(self):
+        bulk_send_notifications_to_users(self.create_acks())
+        self.assertEqual(OutboxNotification.objects.filter(digest=True, destination=self.destination).count(), 3)
+        self.assertFalse(mail.outbox)
+
+    def test_bulk_event_endpoint_notifies(self):
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        data = {
+            "ids": [incident.pk for incident in self.incidents],
+            "event": {"timestamp": "2022-08-02T13:45:44.056Z", "type": Event.Type.CLOSE},
+        }
+        response = client.post(reverse("v2:incident:incident-events-bulk"), data, format="json")
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(len(mail.outbox), 1)
@@ -0,0 +1,90 @@
+import asyncio
+import threading
+
+from django.core import mail
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from argus.auth.factories import PersonUserFactory
+from argus.incident.factories import EventFactory
+from argus.notificationprofile.media import send_notification
+from argus.notificationprofile.media.base import NotificationMedium
+from argus.notificationprofile.media.concurrent import send_many
+
+
+class DummyMedium(NotificationMedium):
+    MEDIA_SLUG = "dummy"
+
+    @classmethod
+    def validate(cls, instance, dict, user):
+        return dict
+
+    @classmethod
+    def has_duplicate(cls, queryset, settings):
+        return False
+
+    @staticmethod
+    def get_label(destination):
+        return "dummy"
+
+
+class ThreadedMedium(DummyMedium):
+    threads = []
+
+    @classmethod
+    def send(cls, event, destinations, **kwargs):
+        if event == "fail":
+            raise ValueError("Failing on purpose")
+        cls.threads.append(threading.get_ident())
+        return True
+
+
+class AsyncMedium(DummyMedium):
+    CONCURRENCY_LIMIT = 2
+    running = 0
+    max_running = 0
+
+    @classmethod
+    def send(cls, event, destinations, **kwargs):
+        raise NotImplementedError
+
+    @classmethod
+    async def asend(cls, event, destinations, **kwargs):
+        cls.running += 1
+        cls.max_running = max(cls.max_running, cls.running)
+        await asyncio.sleep(0.01)
+        cls.running -= 1
+        return True
+
+
+class SendManyTests(SimpleTestCase):
+    def test_sync_media_are_sent_in_other_threads(self):
+        ThreadedMedium.threads = []
+        results = send_many([(ThreadedMedium, "event", [])] * 3)
+        self.assertEqual(results, [True, True, True])
+        self.assertNotIn(threading.get_ident(), ThreadedMedium.threads)
+
+    def test_failing_sends_are_returned_instead_of_raised(self):
+        results = send_many([(ThreadedMedium, "fail", []), (ThreadedMedium, "event", [])])
+        self.assertIsInstance(results[0], ValueError)
+        self.assertTrue(results[1])
+
+    def test_sends_to_a_medium_are_limited_by_its_concurrency_limit(self):
+        AsyncMedium.max_running = 0
+        results = send_many([(AsyncMedium, "event", [])] * 6)
+        self.assertEqual(results, [True] * 6)
+        self.assertEqual(AsyncMedium.max_running, 2)
+
+    @override_settings(NOTIFICATION_MEDIA_CONCURRENCY={"dummy": 1})
+    def test_concurrency_limit_can_be_set_per_medium(self):
+        AsyncMedium.max_running = 0
+        send_many([(AsyncMedium, "event", [])] * 3)
+        self.assertEqual(AsyncMedium.max_running, 1)
+
+
+@override_settings(NOTIFICATION_CONCURRENT_SEND=True)
+class ConcurrentSendNotificationTests(TestCase):
+    def test_send_notification_sends_to_every_destination(self):
+        destinations = [PersonUserFactory().destinations.select_related("media").get() for _ in range(2)]
+        events = EventFactory.create_batch(2)
+        send_notification(destinations, *events)
+        self.assertEqual(len(mail.outbox), 4)
@@ -5,6 +5,7 @@ from argus.filter.factories import FilterFactory
 from argus.incident.factories import EventFactory
 from argus.incident.models import create_fake_incident, get_or_create_default_instances, Event
 from argus.notificationprofile import factories
+from argus.notificationprofile.media import deduplicate_destinations
 from argus.notificationprofile.media import find_destinations_for_event
 from argus.notificationprofile.media import find_destinations_for_many_events
 from argus.notificationprofile.media import get_notification_media
@@ -166,6 +167,27 @@ class FindDestinationsTest(TestCase):
         self.assertNotIn(self.extra_destination1, destinations[event3])
         self.assertIn(self.extra_destination2, destinations[event3])
 
+    def test_find_destinations_for_event_sends_once_per_address(self):
+        address = self.user1_destination.settings["email_address"]
+        user3 = PersonUserFactory()
+        shared_destination = factories.DestinationConfigFactory(
+            user=user3,
+            media=Media.objects.get(slug="email"),
+            settings={"email_address": address, "synced": False},
+        )
+        np3 = factories.NotificationProfileFactory(user=user3, timeslot=self.timeslot, active=True)
+        np3.filters.add(*self.np1.filters.all())
+        np3.destinations.add(shared_destination)
+
+        incident = create_fake_incident()
+        event = incident.events.get(type=Event.Type.INCIDENT_START)
+        destinations = find_destinations_for_event(event)
+        self.assertEqual(destinations, {self.user1_destination})
+
+    def test_deduplicate_destinations_keeps_destinations_without_address(self):
+        destinations = {self.extra_destination1, self.extra_destination2, self.user1_destination}
+        self.assertEqual(deduplicate_destinations(destinations), destinations)
+
 
 class GetNotificationMediaTests(TestCase):
     def setUp(self):
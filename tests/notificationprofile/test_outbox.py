@@ -0,0 +1,135 @@
+from io import StringIO
+from unittest.mock import patch
+
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from argus.auth.factories import PersonUserFactory
+from argus.filter.factories import FilterFactory
+from argus.incident.models import Event, create_fake_incident, get_or_create_default_instances
+from argus.notificationprofile import factories
+from argus.notificationprofile.media.email import EmailNotification
+from argus.notificationprofile.models import OutboxNotification
+from argus.notificationprofile.outbox import dispatch_batch, queue_notification
+from argus.util.testing import connect_signals
+
+
+@override_settings(SEND_NOTIFICATIONS=True, NOTIFICATION_OUTBOX=True)
+class OutboxTests(TestCase):
+    def setUp(self):
+        # These tests need the signal that notifies on new events
+        connect_signals()
+
+        self.user = PersonUserFactory()
+        self.destination = self.user.destinations.get()  # default email
+        (_, _, argus_source) = get_or_create_default_instances()
+        timeslot = factories.TimeslotFactory(user=self.user)
+        factories.MaximalTimeRecurrenceFactory(timeslot=timeslot)
+        profile = factories.NotificationProfileFactory(user=self.user, timeslot=timeslot, active=True)
+        profile.filters.add(FilterFactory(user=self.user, filter={"sourceSystemIds": [argus_source.id]}))
+        profile.destinations.add(self.destination)
+
+    def test_saving_an_event_queues_notifications_instead_of_sending(self):
+        incident = create_fake_incident()
+        event = incident.events.get(type=Event.Type.INCIDENT_START)
+        outbox = OutboxNotification.objects.get()
+        self.assertEqual(outbox.event, event)
+        self.assertEqual(outbox.destination, self.destination)
+        self.assertFalse(mail.outbox)
+
+    def test_queue_notification_stores_every_pair_of_event_and_destination(self):
+        incident = create_fake_incident()
+        OutboxNotification.objects.all().delete()
+        events = list(incident.events.all())
+        other_destination = PersonUserFactory().destinations.get()
+        queue_notification([self.destination, other_destination], *events)
+        self.assertEqual(OutboxNotification.objects.count(), 2 * len(events))
+
+    def test_dispatch_batch_sends_and_removes_notifications(self):
+        create_fake_incident()
+        handled = dispatch_batch()
+        self.assertEqual(handled, 1)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, [self.destination.settings["email_address"]])
+        self.assertFalse(OutboxNotification.objects.exists())
+
+    def test_dispatch_batch_respects_batch_size(self):
+        for _ in range(3):
+            create_fake_incident()
+        self.assertEqual(dispatch_batch(batch_size=2), 2)
+        self.assertEqual(OutboxNotification.objects.count(), 1)
+
+    def test_dispatch_batch_skips_notifications_that_are_not_due(self):
+        create_fake_incident()
+        OutboxNotification.objects.update(send_after=timezone.now() + timezone.timedelta(minutes=5))
+        self.assertEqual(dispatch_batch(), 0)
+        self.assertFalse(mail.outbox)
+
+    def test_failed_notifications_are_kept_and_retried_later(self):
+        create_fake_incident()
+        with patch.object(EmailNotification, "send", return_value=False):
+            dispatch_batch()
+        outbox = OutboxNotification.objects.get()
+        self.assertEqual(outbox.attempts, 1)
+        self.assertTrue(outbox.last_error)
+        self.assertGreater(outbox.send_after, timezone.now())
+
+    def test_notifications_that_failed_too_often_are_not_retried(self):
+        create_fake_incident()
+        OutboxNotification.objects.update(attempts=3)
+        self.assertEqual(dispatch_batch(max_attempts=3), 0)
+        self.assertTrue(OutboxNotification.objects.exists())
+
+    def test_dispatch_notifications_command_drains_outbox(self):
+        for _ in range(3):
+            create_fake_incident()
+        out = StringIO()
+        call_command("dispatch_notifications", "--batch-size=2", "-v 2", stdout=out)
+        self.assertIn("Handled 3 notifications", out.getvalue())
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertFalse(OutboxNotification.objects.exists())
+
+
+@override_settings(SEND_NOTIFICATIONS=True, NOTIFICATION_OUTBOX=True)
+class OutboxDigestTests(TestCase):
+    def setUp(self):
+        connect_signals()
+
+        self.user = PersonUserFactory()
+        self.destination = self.user.destinations.get()  # default email
+        self.destination.coalesce_window = 60
+        self.destination.save()
+        (_, _, argus_source) = get_or_create_default_instances()
+        timeslot = factories.TimeslotFactory(user=self.user)
+        factories.MaximalTimeRecurrenceFactory(timeslot=timeslot)
+        profile = factories.NotificationProfileFactory(user=self.user, timeslot=timeslot, active=True)
+        profile.filters.add(FilterFactory(user=self.user, filter={"sourceSystemIds": [argus_source.id]}))
+        profile.destinations.add(self.destination)
+
+    def test_notifications_to_coalescing_destination_are_held_back_together(self):
+        before = timezone.now()
+        for _ in range(3):
+            create_fake_incident()
+        send_after = set(OutboxNotification.objects.values_list("send_after", flat=True))
+        self.assertEqual(len(send_after), 1)
+        self.assertGreaterEqual(send_after.pop(), before + timezone.timedelta(seconds=60))
+        self.assertEqual(dispatch_batch(), 0)
+
+    def test_held_back_notifications_are_sent_as_one_digest(self):
+        for _ in range(3):
+            create_fake_incident()
+        OutboxNotification.objects.update(send_after=timezone.now())
+        self.assertEqual(dispatch_batch(), 3)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn("3 events", mail.outbox[0].subject)
+        self.assertFalse(OutboxNotification.objects.exists())
+
+    def test_failed_digest_keeps_all_its_notifications(self):
+        for _ in range(2):
+            create_fake_incident()
+        OutboxNotification.objects.update(send_after=timezone.now())
+        with patch.object(EmailNotification, "send_digest", return_value=False):
+            dispatch_batch()
+        self.assertEqual(OutboxNotification.objects.filter(attempts=1).count(), 2)
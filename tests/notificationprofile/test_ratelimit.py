@@ -0,0 +1,119 @@
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from argus.auth.factories import PersonUserFactory
+from argus.filter.factories import FilterFactory
+from argus.incident.models import Incident, create_fake_incident, get_or_create_default_instances
+from argus.notificationprofile import factories
+from argus.notificationprofile.models import OutboxNotification
+from argus.notificationprofile.ratelimit import (
+    TokenBucket,
+    end_storm_if_over,
+    filter_rate_limited,
+    parse_rate,
+    record_events,
+    storm_is_ongoing,
+)
+from argus.util.testing import connect_signals
+
+
+class TokenBucketTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_parse_rate_understands_drf_style_rates(self):
+        self.assertEqual(parse_rate("10/min"), (10, 60))
+        self.assertEqual(parse_rate("5/s"), (5, 1))
+        self.assertEqual(parse_rate("100/hour"), (100, 3600))
+
+    def test_bucket_allows_up_to_capacity(self):
+        bucket = TokenBucket("test", "3/hour")
+        self.assertEqual([bucket.consume() for _ in range(4)], [True, True, True, False])
+
+    def test_bucket_refills_over_time(self):
+        bucket = TokenBucket("test", "2/min")
+        with patch("argus.notificationprofile.ratelimit.time.time", return_value=1000.0):
+            bucket.consume()
+            bucket.consume()
+            self.assertFalse(bucket.consume())
+        with patch("argus.notificationprofile.ratelimit.time.time", return_value=1030.0):
+            self.assertTrue(bucket.consume())
+            self.assertFalse(bucket.consume())
+
+
+class FilterRateLimitedTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.destination = PersonUserFactory().destinations.get()
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_no_limits_by_default(self):
+        for _ in range(10):
+            self.assertEqual(filter_rate_limited([self.destination]), [self.destination])
+
+    @override_settings(NOTIFICATION_DESTINATION_RATE_LIMIT="2/min")
+    def test_destination_limit_is_per_destination(self):
+        other_destination = PersonUserFactory().destinations.get()
+        filter_rate_limited([self.destination])
+        filter_rate_limited([self.destination])
+        with self.assertLogs("argus.notificationprofile.ratelimit", level="WARNING"):
+            allowed = filter_rate_limited([self.destination, other_destination])
+        self.assertEqual(allowed, [other_destination])
+
+    @override_settings(NOTIFICATION_MEDIA_RATE_LIMITS={"email": "1/min"})
+    def test_medium_limit_is_shared_by_all_destinations_of_the_medium(self):
+        other_destination = PersonUserFactory().destinations.get()
+        with self.assertLogs("argus.notificationprofile.ratelimit", level="WARNING"):
+            allowed = filter_rate_limited([self.destination, other_destination])
+        self.assertEqual(allowed, [self.destination])
+
+
+@override_settings(SEND_NOTIFICATIONS=True, NOTIFICATION_OUTBOX=True, NOTIFICATION_STORM_THRESHOLD="2/min")
+class NotificationStormTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        connect_signals()
+
+        self.user = PersonUserFactory()
+        self.destination = self.user.destinations.get()  # default email
+        (_, _, argus_source) = get_or_create_default_instances()
+        timeslot = factories.TimeslotFactory(user=self.user)
+        factories.MaximalTimeRecurrenceFactory(timeslot=timeslot)
+        profile = factories.NotificationProfileFactory(user=self.user, timeslot=timeslot, active=True)
+        profile.filters.add(FilterFactory(user=self.user, filter={"sourceSystemIds": [argus_source.id]}))
+        profile.destinations.add(self.destination)
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_storm_raises_an_incident_once(self):
+        self.assertFalse(record_events(2))
+        with self.assertLogs("argus.notificationprofile.ratelimit", level="ERROR"):
+            self.assertTrue(record_events(1))
+        self.assertTrue(record_events(1))
+        self.assertEqual(Incident.objects.filter(description__startswith="Notification storm").count(), 1)
+
+    def test_notifications_during_storm_are_held_for_a_digest(self):
+        with self.assertLogs("argus.notificationprofile.ratelimit", level="ERROR"):
+            for _ in range(4):
+                create_fake_incident()
+        held = OutboxNotification.objects.filter(digest=True)
+        self.assertEqual(held.count(), 2)
+        self.assertEqual(OutboxNotification.objects.filter(digest=False).count(), 2)
+
+    def test_storm_incident_is_ended_when_storm_is_over(self):
+        with self.assertLogs("argus.notificationprofile.ratelimit", level="ERROR"):
+            record_events(3)
+        incident = Incident.objects.get(description__startswith="Notification storm")
+        self.assertTrue(storm_is_ongoing())
+        cache.delete("argus:notification:storm")
+        end_storm_if_over()
+        incident.refresh_from_db()
+        self.assertFalse(incident.open)
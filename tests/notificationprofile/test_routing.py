@@ -0,0 +1,96 @@
+from django.test import TestCase, override_settings
+
+from argus.auth.factories import PersonUserFactory
+from argus.filter.factories import FilterFactory
+from argus.incident.factories import SourceSystemFactory
+from argus.incident.models import Event, create_fake_incident, get_or_create_default_instances
+from argus.notificationprofile import factories
+from argus.notificationprofile.routing import get_routing_table, invalidate_routing_table
+from argus.util.testing import disconnect_signals, connect_signals
+
+
+class RoutingTableTests(TestCase):
+    def setUp(self):
+        disconnect_signals()
+        invalidate_routing_table()
+
+        self.user = PersonUserFactory()
+        self.destination = self.user.destinations.get()  # default email
+        (_, _, argus_source) = get_or_create_default_instances()
+        self.filter = FilterFactory(user=self.user, filter={"sourceSystemIds": [argus_source.id]})
+        self.timeslot = factories.TimeslotFactory(user=self.user)
+        factories.MaximalTimeRecurrenceFactory(timeslot=self.timeslot)
+        self.profile = factories.NotificationProfileFactory(user=self.user, timeslot=self.timeslot, active=True)
+        self.profile.filters.add(self.filter)
+        self.profile.destinations.add(self.destination)
+
+        incident = create_fake_incident()
+        self.event = incident.events.select_related("incident__source").get(type=Event.Type.INCIDENT_START)
+
+    def tearDown(self):
+        connect_signals()
+
+    def test_table_is_reused_until_invalidated(self):
+        table = get_routing_table()
+        self.assertIs(get_routing_table(), table)
+        invalidate_routing_table()
+        self.assertIsNot(get_routing_table(), table)
+
+    @override_settings(NOTIFICATION_ROUTING_TABLE_MAX_AGE=0)
+    def test_table_older_than_max_age_is_rebuilt(self):
+        table = get_routing_table()
+        self.assertIsNot(get_routing_table(), table)
+
+    def test_table_only_contains_active_profiles(self):
+        factories.NotificationProfileFactory(user=self.user, timeslot=self.timeslot, active=False)
+        table = get_routing_table()
+        self.assertEqual([profile.pk for profile in table.profiles], [self.profile.pk])
+
+    def test_matching_profiles_does_not_query_for_profiles(self):
+        table = get_routing_table()
+        with self.assertNumQueries(0):
+            destinations = table.find_destinations_for_event(self.event)
+        self.assertEqual(destinations, {self.destination})
+
+    def test_matching_profiles_on_ack_state_needs_no_queries(self):
+        for _ in range(3):
+            profile = factories.NotificationProfileFactory(user=self.user, timeslot=self.timeslot, active=True)
+            profile.filters.add(FilterFactory(user=self.user, filter={"acked": True}))
+        table = get_routing_table()
+        # The ack state is stored on the incident
+        with self.assertNumQueries(0):
+            table.find_destinations_for_event(self.event)
+
+    def test_changing_a_filter_invalidates_the_table(self):
+        table = get_routing_table()
+        self.filter.filter = {"sourceSystemIds": [SourceSystemFactory().id]}
+        self.filter.save()
+        self.assertIsNot(get_routing_table(), table)
+        self.assertFalse(get_routing_table().find_destinations_for_event(self.event))
+
+    def test_deactivating_a_profile_invalidates_the_table(self):
+        get_routing_table()
+        self.profile.active = False
+        self.profile.save()
+        self.assertFalse(get_routing_table().find_destinations_for_event(self.event))
+
+    def test_adding_a_destination_to_a_profile_invalidates_the_table(self):
+        get_routing_table()
+        extra_destination = factories.DestinationConfigFactory(
+            user=self.user,
+            media_id="email",
+            settings={"email_address": "extra@example.com", "synced": False},
+        )
+        self.profile.destinations.add(extra_destination)
+        destinations = get_routing_table().find_destinations_for_event(self.event)
+        self.assertEqual(destinations, {self.destination, extra_destination})
+
+    def test_removing_the_time_recurrences_of_a_timeslot_invalidates_the_table(self):
+        get_routing_table()
+        self.timeslot.time_recurrences.all().delete()
+        self.assertFalse(get_routing_table().find_destinations_for_event(self.event))
+
+    def test_changing_the_fallback_filter_invalidates_the_table(self):
+        table = get_routing_table()
+        with self.settings(ARGUS_FALLBACK_FILTER={"maxlevel": 1}):
+            self.assertIsNot(get_routing_table(), table)
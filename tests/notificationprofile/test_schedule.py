@@ -0,0 +1,77 @@
+from datetime import time, timedelta
+import random
+
+from django.test import SimpleTestCase, TestCase, tag
+from django.utils.dateparse import parse_datetime
+from django.utils.timezone import make_aware
+
+from argus.auth.factories import PersonUserFactory
+from argus.notificationprofile.factories import TimeRecurrenceFactory, TimeslotFactory
+from argus.notificationprofile.models import TimeRecurrence
+from argus.notificationprofile.schedule import MICROSECONDS_PER_DAY, WeeklySchedule
+
+
+MONDAY = make_aware(parse_datetime("2019-11-25 00:00"))
+
+
+@tag("unittest")
+class WeeklyScheduleTests(SimpleTestCase):
+    def test_overlapping_and_adjacent_intervals_are_merged(self):
+        schedule = WeeklySchedule([(10, 20), (15, 30), (30, 40), (50, 60)])
+        self.assertEqual(schedule.starts, (10, 50))
+        self.assertEqual(schedule.ends, (40, 60))
+
+    def test_empty_intervals_are_dropped(self):
+        self.assertFalse(WeeklySchedule([(20, 10), (5, 5)]))
+
+    def test_end_of_time_recurrence_is_included(self):
+        recurrence = TimeRecurrence(days=[1], start=time(10), end=time(11))
+        schedule = WeeklySchedule.from_time_recurrences([recurrence])
+        self.assertTrue(schedule.contains(MONDAY.replace(hour=11)))
+        self.assertFalse(schedule.contains(MONDAY.replace(hour=11, microsecond=1)))
+        self.assertFalse(schedule.contains(MONDAY.replace(hour=9, minute=59, second=59)))
+
+    def test_whole_week_is_a_single_interval(self):
+        recurrence = TimeRecurrence(days=list(range(1, 8)), start=TimeRecurrence.DAY_START, end=TimeRecurrence.DAY_END)
+        schedule = WeeklySchedule.from_time_recurrences([recurrence])
+        self.assertEqual(schedule.starts, (0,))
+        self.assertEqual(schedule.ends, (7 * MICROSECONDS_PER_DAY,))
+
+    def test_schedule_agrees_with_time_recurrences(self):
+        rng = random.Random(1234)
+        for _ in range(20):
+            recurrences = [
+                TimeRecurrence(
+                    days=rng.sample(range(1, 8), rng.randint(1, 7)),
+                    start=time(rng.randrange(24), rng.randrange(60)),
+                    end=time(rng.randrange(24), rng.randrange(60)),
+                )
+                for _ in range(rng.randint(1, 4))
+            ]
+            schedule = WeeklySchedule.from_time_recurrences(recurrences)
+            timestamps = [MONDAY + timedelta(minutes=rng.randrange(7 * 24 * 60)) for _ in range(200)]
+            expected = [any(tr.timestamp_is_within(timestamp) for tr in recurrences) for timestamp in timestamps]
+            self.assertEqual(schedule.contains_many(timestamps), expected)
+
+
+@tag("database")
+class TimeslotScheduleTests(TestCase):
+    def setUp(self):
+        self.timeslot = TimeslotFactory(user=PersonUserFactory())
+        TimeRecurrenceFactory(timeslot=self.timeslot, days=[1], start=time(8), end=time(16))
+
+    def test_schedule_is_cached(self):
+        schedule = self.timeslot.get_schedule()
+        with self.assertNumQueries(0):
+            self.assertIs(self.timeslot.get_schedule(), schedule)
+
+    def test_schedule_is_rebuilt_when_a_time_recurrence_is_added(self):
+        self.assertFalse(self.timeslot.timestamp_is_within_time_recurrences(MONDAY.replace(hour=20)))
+        TimeRecurrenceFactory(timeslot=self.timeslot, days=[1], start=time(18), end=time(22))
+        self.assertTrue(self.timeslot.timestamp_is_within_time_recurrences(MONDAY.replace(hour=20)))
+
+    def test_schedule_is_rebuilt_when_timeslot_is_saved(self):
+        self.timeslot.get_schedule()
+        self.timeslot.time_recurrences.all().delete()
+        self.timeslot.save()
+        self.assertFalse(self.timeslot.get_schedule())
@@ -0,0 +1,97 @@
+import threading
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, override_settings
+
+from argus.notificationprofile.media import background_send_notification
+from argus.notificationprofile.workers import NotificationWorkerPool, get_worker_pool, shutdown_worker_pool
+
+
+class NotificationWorkerPoolTests(SimpleTestCase):
+    def setUp(self):
+        self.pool = NotificationWorkerPool(size=2, queue_size=2, queue_timeout=0.01)
+
+    def tearDown(self):
+        self.pool.shutdown(timeout=5)
+
+    def test_submitted_jobs_are_run_by_the_workers(self):
+        results = []
+        for number in range(5):
+            self.assertTrue(self.pool.submit(results.append, number))
+        self.pool.queue.join()
+        self.assertEqual(sorted(results), list(range(5)))
+        self.assertEqual(self.pool.stats()["processed"], 5)
+
+    def test_workers_survive_failing_jobs(self):
+        def fail():
+            raise ValueError("Failing on purpose")
+
+        results = []
+        with self.assertLogs("argus.notificationprofile.workers", level="ERROR"):
+            self.pool.submit(fail)
+            self.pool.submit(results.append, "ok")
+            self.pool.queue.join()
+        self.assertEqual(results, ["ok"])
+        self.assertEqual(self.pool.stats()["failed"], 1)
+
+    def test_submit_returns_false_when_queue_stays_full(self):
+        release = threading.Event()
+        started = threading.Semaphore(0)
+
+        def block():
+            started.release()
+            release.wait()
+
+        for _ in range(self.pool.size):
+            self.pool.submit(block)
+        for _ in range(self.pool.size):
+            self.assertTrue(started.acquire(timeout=5))
+        for _ in range(self.pool.queue_size):
+            self.assertTrue(self.pool.submit(block))
+        with self.assertLogs("argus.notificationprofile.workers", level="WARNING"):
+            self.assertFalse(self.pool.submit(block))
+        self.assertEqual(self.pool.queue_depth, self.pool.queue_size)
+        self.assertEqual(self.pool.stats()["overflowed"], 1)
+        release.set()
+
+    def test_shutdown_finishes_queued_jobs(self):
+        results = []
+        for number in range(2):
+            self.pool.submit(results.append, number)
+        self.pool.shutdown(timeout=5)
+        self.assertEqual(sorted(results), [0, 1])
+        self.assertFalse(self.pool.is_running)
+
+    def test_submit_after_shutdown_returns_false(self):
+        self.pool.start()
+        self.pool.shutdown(timeout=5)
+        self.assertFalse(self.pool.submit(print))
+
+
+class GetWorkerPoolTests(SimpleTestCase):
+    def tearDown(self):
+        shutdown_worker_pool(timeout=5)
+
+    @override_settings(NOTIFICATION_WORKERS=0)
+    def test_pool_is_turned_off_by_zero_workers(self):
+        self.assertIsNone(get_worker_pool())
+
+    @override_settings(NOTIFICATION_WORKERS=3, NOTIFICATION_QUEUE_SIZE=7)
+    def test_pool_is_shared_and_sized_by_settings(self):
+        pool = get_worker_pool()
+        self.assertIs(get_worker_pool(), pool)
+        self.assertEqual(pool.size, 3)
+        self.assertEqual(pool.queue_size, 7)
+
+    @override_settings(NOTIFICATION_WORKERS=0)
+    def test_background_send_notification_sends_inline_without_a_pool(self):
+        with patch("argus.notificationprofile.media.send_notification") as send:
+            self.assertFalse(background_send_notification([], "event"))
+        send.assert_called_once_with([], "event")
+
+    @override_settings(NOTIFICATION_WORKERS=1)
+    def test_background_send_notification_queues_on_the_pool(self):
+        done = threading.Event()
+        with patch("argus.notificationprofile.media.send_notification", side_effect=lambda *args: done.set()):
+            self.assertTrue(background_send_notification([], "event"))
+            self.assertTrue(done.wait(5))